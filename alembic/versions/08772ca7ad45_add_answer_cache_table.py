@@ -0,0 +1,44 @@
+"""add_answer_cache_table
+
+Revision ID: 08772ca7ad45
+Revises: b3e7f1a2c4d9
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "08772ca7ad45"
+down_revision: Union[str, None] = "b3e7f1a2c4d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "answer_cache",
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("vector_store_id", sa.String(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("context", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_answer_cache_vector_store_id", "answer_cache", ["vector_store_id"]
+    )
+    op.create_index("ix_answer_cache_expires_at", "answer_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_answer_cache_expires_at", table_name="answer_cache")
+    op.drop_index("ix_answer_cache_vector_store_id", table_name="answer_cache")
+    op.drop_table("answer_cache")
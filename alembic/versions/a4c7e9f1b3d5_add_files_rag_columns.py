@@ -0,0 +1,34 @@
+"""add_files_rag_columns
+
+Revision ID: a4c7e9f1b3d5
+Revises: f2a9c4e6b8d1
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a4c7e9f1b3d5"
+down_revision: Union[str, None] = "f2a9c4e6b8d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("rag_file_id", sa.String(), nullable=True))
+    op.add_column("files", sa.Column("rag_upload_name", sa.String(), nullable=True))
+    op.add_column("files", sa.Column("rag_chunks_count", sa.Integer(), nullable=True))
+    op.add_column(
+        "files",
+        sa.Column("rag_uploaded_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("files", "rag_uploaded_at")
+    op.drop_column("files", "rag_chunks_count")
+    op.drop_column("files", "rag_upload_name")
+    op.drop_column("files", "rag_file_id")
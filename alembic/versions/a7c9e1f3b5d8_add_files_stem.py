@@ -0,0 +1,40 @@
+"""add_files_stem
+
+Revision ID: a7c9e1f3b5d8
+Revises: e4a6c8f0b2d5
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a7c9e1f3b5d8"
+down_revision: Union[str, None] = "e4a6c8f0b2d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("stem", sa.String(), nullable=True))
+
+    # Path(system_key).stem: имя после последнего "/" без последнего
+    # расширения; точка в начале имени и в конце расширением не считается
+    op.execute(
+        r"""
+        UPDATE files
+        SET stem = regexp_replace(
+            regexp_replace(system_key, '^.*/', ''), '^(.+)\.[^.]+$', '\1'
+        )
+        """
+    )
+
+    op.alter_column("files", "stem", nullable=False)
+    op.create_index("ix_files_stem", "files", ["stem"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_stem", table_name="files")
+    op.drop_column("files", "stem")
@@ -0,0 +1,42 @@
+"""add_index_files_table
+
+Revision ID: b6d8f0a2c4e7
+Revises: a4c7e9f1b3d5
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "b6d8f0a2c4e7"
+down_revision: Union[str, None] = "a4c7e9f1b3d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "index_files",
+        sa.Column(
+            "index_id",
+            sa.Integer(),
+            sa.ForeignKey("indexes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "file_id",
+            sa.Integer(),
+            sa.ForeignKey("files.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("rag_file_id", sa.String(), nullable=True),
+    )
+    op.create_index("ix_index_files_file_id", "index_files", ["file_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_index_files_file_id", table_name="index_files")
+    op.drop_table("index_files")
@@ -0,0 +1,41 @@
+"""add_files_content_hash
+
+Revision ID: b9d1f3a5c7e0
+Revises: a7c9e1f3b5d8
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "b9d1f3a5c7e0"
+down_revision: Union[str, None] = "a7c9e1f3b5d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("content_sha256", sa.String(), nullable=True))
+    op.add_column("files", sa.Column("content_size", sa.BigInteger(), nullable=True))
+    op.add_column(
+        "files",
+        sa.Column(
+            "duplicate_of_id",
+            sa.Integer(),
+            sa.ForeignKey("files.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_files_org_id_content_sha256", "files", ["org_id", "content_sha256"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_org_id_content_sha256", table_name="files")
+    op.drop_column("files", "duplicate_of_id")
+    op.drop_column("files", "content_size")
+    op.drop_column("files", "content_sha256")
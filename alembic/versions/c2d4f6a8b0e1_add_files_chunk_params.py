@@ -0,0 +1,27 @@
+"""add_files_chunk_params
+
+Revision ID: c2d4f6a8b0e1
+Revises: b9d1f3a5c7e0
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c2d4f6a8b0e1"
+down_revision: Union[str, None] = "b9d1f3a5c7e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("rag_window_chars", sa.Integer(), nullable=True))
+    op.add_column("files", sa.Column("rag_overlap_chars", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "rag_overlap_chars")
+    op.drop_column("files", "rag_window_chars")
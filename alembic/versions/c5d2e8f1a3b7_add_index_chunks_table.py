@@ -0,0 +1,48 @@
+"""add_index_chunks_table
+
+Revision ID: c5d2e8f1a3b7
+Revises: 08772ca7ad45
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "c5d2e8f1a3b7"
+down_revision: Union[str, None] = "08772ca7ad45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "index_chunks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "index_id",
+            sa.Integer(),
+            sa.ForeignKey("indexes.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column(
+            "tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('russian', body)", persisted=True),
+        ),
+    )
+    op.create_index("ix_index_chunks_index_id", "index_chunks", ["index_id"])
+    op.create_index(
+        "ix_index_chunks_tsv", "index_chunks", ["tsv"], postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_index_chunks_tsv", table_name="index_chunks")
+    op.drop_index("ix_index_chunks_index_id", table_name="index_chunks")
+    op.drop_table("index_chunks")
@@ -0,0 +1,31 @@
+"""add_files_delete_attempts
+
+Revision ID: c8e0a2b4d6f9
+Revises: b6d8f0a2c4e7
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c8e0a2b4d6f9"
+down_revision: Union[str, None] = "b6d8f0a2c4e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "files",
+        sa.Column("delete_attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # Сборщик выбирает надгробия по статусу
+    op.create_index("ix_files_status", "files", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_status", table_name="files")
+    op.drop_column("files", "delete_attempts")
@@ -0,0 +1,25 @@
+"""add_files_multipart_upload_id
+
+Revision ID: d1f3b5c7e9a2
+Revises: c8e0a2b4d6f9
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d1f3b5c7e9a2"
+down_revision: Union[str, None] = "c8e0a2b4d6f9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("multipart_upload_id", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "multipart_upload_id")
@@ -0,0 +1,27 @@
+"""add_chat_summary
+
+Revision ID: d8a4f6b2c1e9
+Revises: c5d2e8f1a3b7
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d8a4f6b2c1e9"
+down_revision: Union[str, None] = "c5d2e8f1a3b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chats", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column("chats", sa.Column("summary_upto_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("chats", "summary_upto_id")
+    op.drop_column("chats", "summary")
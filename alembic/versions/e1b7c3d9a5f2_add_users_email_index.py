@@ -0,0 +1,24 @@
+"""add_users_email_index
+
+Revision ID: e1b7c3d9a5f2
+Revises: d8a4f6b2c1e9
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "e1b7c3d9a5f2"
+down_revision: Union[str, None] = "d8a4f6b2c1e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_email", "users", ["email"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email", table_name="users")
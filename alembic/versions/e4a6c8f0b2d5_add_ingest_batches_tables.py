@@ -0,0 +1,92 @@
+"""add_ingest_batches_tables
+
+Revision ID: e4a6c8f0b2d5
+Revises: d1f3b5c7e9a2
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "e4a6c8f0b2d5"
+down_revision: Union[str, None] = "d1f3b5c7e9a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingest_batches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("prefix", sa.String(), nullable=True),
+        sa.Column("window_chars", sa.Integer(), nullable=False),
+        sa.Column("overlap_chars", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("done", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("chunks", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("locked_by", sa.String(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.create_index("ix_ingest_batches_status", "ingest_batches", ["status"])
+
+    op.create_table(
+        "ingest_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "batch_id",
+            sa.Integer(),
+            sa.ForeignKey("ingest_batches.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("s3_key", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("rag_file_id", sa.String(), nullable=True),
+        sa.Column("chunks_count", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.UniqueConstraint(
+            "batch_id", "s3_key", name="uq_ingest_items_batch_id_s3_key"
+        ),
+    )
+    op.create_index(
+        "ix_ingest_items_batch_id_status", "ingest_items", ["batch_id", "status"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingest_items_batch_id_status", table_name="ingest_items")
+    op.drop_table("ingest_items")
+    op.drop_index("ix_ingest_batches_status", table_name="ingest_batches")
+    op.drop_table("ingest_batches")
@@ -0,0 +1,65 @@
+"""add_index_jobs_table
+
+Revision ID: f2a9c4e6b8d1
+Revises: e1b7c3d9a5f2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "f2a9c4e6b8d1"
+down_revision: Union[str, None] = "e1b7c3d9a5f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "index_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "org_id",
+            sa.Integer(),
+            sa.ForeignKey("organizations.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("file_ids", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("vector_store_id", sa.String(), nullable=True),
+        sa.Column(
+            "index_id",
+            sa.Integer(),
+            sa.ForeignKey("indexes.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("locked_by", sa.String(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.create_index("ix_index_jobs_status", "index_jobs", ["status"])
+    op.create_index("ix_index_jobs_org_id_status", "index_jobs", ["org_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_index_jobs_org_id_status", table_name="index_jobs")
+    op.drop_index("ix_index_jobs_status", table_name="index_jobs")
+    op.drop_table("index_jobs")
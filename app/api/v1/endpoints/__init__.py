@@ -6,6 +6,7 @@ from .settings import router as settings_router
 from .chats import router as chats_router
 from .files import router as files_router
 from .organizations import router as organizations_router
+from .ingest import router as ingest_router
 
 __all__ = [
     "rag_router",
@@ -16,4 +17,5 @@ __all__ = [
     "chats_router",
     "files_router",
     "organizations_router",
+    "ingest_router",
 ]
@@ -1,5 +1,5 @@
 import asyncio
-from pathlib import Path
+from collections import defaultdict
 from typing import Annotated
 
 import jwt
@@ -20,18 +20,29 @@ from sqlalchemy.sql import func
 
 from app.core.config import settings
 from app.core.dependencies import OrgMembership, require_org_admin
-from app.core.s3 import delete_s3_objects
+from app.core.file_gc import file_gc
 from app.core.ws import manager
-from app.db.models.file import File
+from app.db.models.file import (
+    FILE_DELETE_FAILED,
+    FILE_DELETING,
+    File,
+    key_stem,
+    tombstone_files,
+    update_statuses_by_key,
+)
+from app.db.models.index_chunk import delete_file_chunks
 from app.db.models.user import get_user
 from app.db.schemas.files import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
     FileListResponse,
     FileRecord,
+    ServiceStatusBatchResponse,
+    ServiceStatusBatchUpdate,
     ServiceStatusUpdate,
     StatusUpdate,
 )
 from app.db.session import get_db
-from rag.delete_file import delete_rag_file
 
 router = APIRouter()
 
@@ -82,6 +93,29 @@ async def _get_file_or_404(file_id: int, db: AsyncSession) -> File:
     return file
 
 
+async def _tombstone(
+    file_ids: list[int], org_id: int | None, db: AsyncSession
+) -> list[int]:
+    files = await tombstone_files(db, file_ids, org_id)
+    # Полнотекстовый поиск перестаёт находить файл сразу, не дожидаясь
+    # сборщика
+    await delete_file_chunks(db, files)
+    # Сборщик должен увидеть надгробия, поэтому фиксируем до его пробуждения
+    await db.commit()
+    file_gc.wake()
+    for file in files:
+        await manager.send(
+            file.user_id,
+            {
+                "type": "file_status",
+                "file_id": file.id,
+                "status": FILE_DELETING,
+                "error_message": None,
+            },
+        )
+    return [file.id for file in files]
+
+
 async def _apply_status(
     file: File, new_status: str, error_message: str | None, db: AsyncSession
 ) -> None:
@@ -125,23 +159,77 @@ async def update_file_status_by_key(
     body: ServiceStatusUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> dict:
-    result = await db.execute(select(File).where(File.system_key == body.system_key))
-    file = result.scalar_one_or_none()
-
-    if file is None:
-        stem = Path(body.system_key).stem
-        result = await db.execute(
-            select(File).where(File.system_key.like(f"%/{stem}.%"))
+    # Колбэки OCR приходят с ключами результатов (result/json-files/...),
+    # поэтому ищем по индексированному stem; точное совпадение ключа, затем
+    # оригинал раньше его копий. Удаляемые файлы не трогаем: колбэк,
+    # пришедший после DELETE, иначе снял бы надгробие и файл бы не удалился
+    result = await db.execute(
+        select(File)
+        .where(
+            File.stem == key_stem(body.system_key),
+            File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
         )
-        file = result.scalar_one_or_none()
+        .order_by(File.system_key != body.system_key, File.duplicate_of_id.is_not(None))
+        .limit(1)
+    )
+    file = result.scalar_one_or_none()
 
     if file is None:
         raise HTTPException(status_code=404, detail="File not found")
 
+    if body.rag_file_id is not None:
+        file.rag_file_id = body.rag_file_id
+        file.rag_upload_name = body.rag_upload_name
+        file.rag_chunks_count = body.rag_chunks_count
+        file.rag_window_chars = body.rag_window_chars
+        file.rag_overlap_chars = body.rag_overlap_chars
+        file.rag_uploaded_at = func.now()
+
     await _apply_status(file, body.status, body.error_message, db)
     return {"ok": True}
 
 
+@router.patch(
+    "/files/by-key/status/batch",
+    dependencies=[Depends(require_service_key)],
+    response_model=ServiceStatusBatchResponse,
+)
+async def update_file_statuses_by_key(
+    body: ServiceStatusBatchUpdate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> ServiceStatusBatchResponse:
+    """Many by-key status updates in one UPDATE.
+
+    Owners get one file_statuses WebSocket message with all their files
+    instead of a file_status message per file.
+    """
+    rows = await update_statuses_by_key(db, [u.model_dump() for u in body.updates])
+    await db.commit()
+
+    found = {row.stem for row in rows}
+    by_user: dict[int, list[dict]] = defaultdict(list)
+    for row in rows:
+        by_user[row.user_id].append(
+            {
+                "file_id": row.id,
+                "status": row.status,
+                "error_message": row.error_message,
+            }
+        )
+    await asyncio.gather(
+        *(
+            manager.send(user_id, {"type": "file_statuses", "files": files})
+            for user_id, files in by_user.items()
+        )
+    )
+    return ServiceStatusBatchResponse(
+        updated=len(rows),
+        not_found=[
+            u.system_key for u in body.updates if key_stem(u.system_key) not in found
+        ],
+    )
+
+
 @router.patch("/files/{file_id}/status")
 async def update_file_status(
     file_id: int,
@@ -154,6 +242,8 @@ async def update_file_status(
         raise HTTPException(
             status_code=403, detail="File does not belong to this organization"
         )
+    if file.status in (FILE_DELETING, FILE_DELETE_FAILED):
+        raise HTTPException(status_code=409, detail="File is being deleted")
     await _apply_status(file, body.status, body.error_message, db)
     return {"ok": True}
 
@@ -164,29 +254,26 @@ async def delete_file(
     membership: Annotated[OrgMembership, Depends(require_org_admin)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> dict:
+    """Mark the file deleting; app.core.file_gc removes it in the background."""
     file = await _get_file_or_404(file_id, db)
     if file.org_id is not None and file.org_id != membership.org_id:
         raise HTTPException(
             status_code=403, detail="File does not belong to this organization"
         )
-    stem = Path(file.system_key).stem
-
-    s3_keys = [
-        file.system_key,
-        f"result/txt-files/{stem}.txt",
-        f"result/json-files/{stem}.json",
-        f"result/pdf-files/{stem}.pdf",
-    ]
-    await asyncio.to_thread(delete_s3_objects, s3_keys)
+    # Владение проверено выше; файлы без организации тоже удаляются
+    await _tombstone([file_id], None, db)
+    return {"ok": True}
 
-    try:
-        await delete_rag_file(stem)
-    except Exception:
-        pass
 
-    await db.delete(file)
-    await db.commit()
-    return {"ok": True}
+@router.post("/files/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_files(
+    body: BulkDeleteRequest,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> BulkDeleteResponse:
+    """Mark many files deleting; ids of other organizations are ignored."""
+    marked = await _tombstone(body.file_ids, membership.org_id, db)
+    return BulkDeleteResponse(file_ids=marked)
 
 
 @router.websocket("/ws")
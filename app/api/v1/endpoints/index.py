@@ -1,56 +1,54 @@
 import asyncio
-from pathlib import Path
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.answer_cache import answer_cache
 from app.core.config import settings
 from app.core.dependencies import OrgMembership, require_org_admin, require_org_member
-from app.core.s3 import PRESIGNED_EXPIRES_IN, generate_upload_presigned_url
-from app.core.ws import manager
-from app.db.models.file import File
+from app.core.s3 import (
+    PRESIGNED_EXPIRES_IN,
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    generate_upload_presigned_url,
+    list_uploaded_parts,
+    make_upload_key,
+    presign_upload_parts,
+)
+from app.db.models.file import File, find_indexed_copy, key_stem
+from app.db.models.index_job import JOB_QUEUED, IndexJob, org_has_active_index_jobs
 from app.db.models.org_index import OrgIndex
 from app.db.schemas import (
     FilesResponse,
+    IndexJobRecord,
     IndexRecord,
     IndexesResponse,
     IndexRequest,
+    MultipartCompleteRequest,
+    MultipartPartsRequest,
+    MultipartPartsResponse,
+    MultipartUploadRequest,
+    MultipartUploadResponse,
     RagFileRecord,
     StatusResponse,
+    UploadedPart,
+    UploadedPartsResponse,
     UploadLinkRequest,
     UploadLinkResponse,
+    UploadLinksRequest,
+    UploadLinksResponse,
+    UploadPartUrl,
 )
-from app.db.session import get_db, AsyncSessionLocal
+from app.db.session import get_db
 
-from rag.get_files import get_files_names2ids
-from rag.create_index import create_index as create_index_from_rag
+from rag.delete_index import delete_index as delete_index_from_rag
+from rag.s3 import S3Error
 
 router = APIRouter()
 
-index_task = False
-
-
-async def _save_index_to_db(
-    org_id: int, name: str, vector_store_id: str
-) -> IndexRecord:
-    async with AsyncSessionLocal() as db:
-        index = OrgIndex(org_id=org_id, name=name, vector_store_id=vector_store_id)
-        db.add(index)
-        await db.commit()
-        await db.refresh(index)
-        return IndexRecord.model_validate(index)
-
-
-async def _get_chunks_names_for_ids(file_ids: list[int], org_id: int) -> list[str]:
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(File).where(File.id.in_(file_ids), File.org_id == org_id)
-        )
-        files = result.scalars().all()
-        return [f"{Path(f.system_key).stem}.chunks.jsonl" for f in files]
-
 
 @router.get("/indexes", status_code=200, response_model=IndexesResponse)
 async def get_indexes(
@@ -70,71 +68,63 @@ async def get_indexes(
 async def create_index(
     index_request: IndexRequest,
     membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
 ) -> int:
-    global index_task
-
-    if index_task:
-        raise HTTPException(status_code=409, detail="Index still running")
-
-    index_task = True
-    org_id = membership.org_id
-    user_id = membership.user.id
-
-    async def background_task() -> None:
-        global index_task
-        try:
-            await manager.send(
-                user_id,
-                {
-                    "type": "index_status",
-                    "status": "running",
-                    "name": index_request.name,
-                },
-            )
+    """Queue an index build; returns the job id, see /indexes/jobs/{job_id}.
 
-            chunks_names = await _get_chunks_names_for_ids(
-                index_request.file_ids, org_id
-            )
-            filenames2ids = await get_files_names2ids()
-            yandex_file_ids = [
-                filenames2ids[name] for name in chunks_names if name in filenames2ids
-            ]
-            if not yandex_file_ids:
-                raise ValueError("None of the selected files are indexed in Yandex")
+    The build itself runs in app.core.index_jobs workers; progress still
+    comes over the websocket as index_status messages.
+    """
+    job = IndexJob(
+        org_id=membership.org_id,
+        user_id=membership.user.id,
+        name=index_request.name,
+        file_ids=index_request.file_ids,
+        status=JOB_QUEUED,
+        attempts=0,
+    )
+    db.add(job)
+    await db.flush()
+    return job.id
 
-            result = await create_index_from_rag(index_request.name, yandex_file_ids)
-            saved = await _save_index_to_db(
-                org_id, result["name"], result["vector_store_id"]
-            )
 
-            await manager.send(
-                user_id,
-                {
-                    "type": "index_status",
-                    "status": "done",
-                    "index": {
-                        "id": saved.id,
-                        "name": saved.name,
-                        "created_at": saved.created_at.isoformat(),
-                    },
-                },
-            )
-        except Exception as e:
-            print(e)
-            await manager.send(
-                user_id,
-                {
-                    "type": "index_status",
-                    "status": "error",
-                    "error": str(e),
-                },
-            )
-        finally:
-            index_task = False
+@router.get("/indexes/jobs/{job_id}", status_code=200, response_model=IndexJobRecord)
+async def get_index_job(
+    job_id: int,
+    membership: Annotated[OrgMembership, Depends(require_org_member)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> IndexJobRecord:
+    job = await db.get(IndexJob, job_id)
+    if job is None or job.org_id != membership.org_id:
+        raise HTTPException(status_code=404, detail="Index job not found")
+    return IndexJobRecord.model_validate(job)
 
-    asyncio.create_task(background_task())
 
-    return 200
+@router.delete("/indexes/{index_id}", status_code=200)
+async def delete_index(
+    index_id: int,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> dict:
+    index = await db.get(OrgIndex, index_id)
+    if index is None or index.org_id != membership.org_id:
+        raise HTTPException(status_code=404, detail="Index not found")
+
+    vector_store_id = index.vector_store_id
+    # Сначала store, потом строка: если удаление не прошло, индекс остаётся
+    # в списке и его можно удалить повторно, а не висит в Yandex без ссылок
+    try:
+        await delete_index_from_rag(vector_store_id)
+    except Exception as e:
+        print(f"delete index {index_id}: {vector_store_id} not deleted: {e}")
+        raise HTTPException(
+            status_code=502, detail="Vector store not deleted, try again"
+        )
+
+    await db.delete(index)
+    await answer_cache.invalidate(db, vector_store_id)
+    await db.commit()
+    return {"ok": True}
 
 
 @router.get("/rag-files", status_code=200, response_model=FilesResponse)
@@ -153,18 +143,63 @@ async def get_rag_files(
     )
 
 
-@router.get(
-    "/indexes/status",
-    status_code=200,
-    dependencies=[Depends(require_org_admin)],
-)
-async def get_index_status() -> StatusResponse:
-    if index_task:
+@router.get("/indexes/status", status_code=200)
+async def get_index_status(
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> StatusResponse:
+    if await org_has_active_index_jobs(db, membership.org_id):
         return StatusResponse(status="still running")
     else:
         return StatusResponse(status="not running")
 
 
+def _new_file_values(membership: OrgMembership, filename: str, s3_key: str) -> dict:
+    return {
+        "user_id": membership.user.id,
+        "org_id": membership.org_id,
+        "original_filename": filename.strip(),
+        "system_key": s3_key,
+        "stem": key_stem(s3_key),
+        "s3_url": f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET_NAME}/{s3_key}",
+        "status": "pending_upload",
+    }
+
+
+def _duplicate_file_values(
+    membership: OrgMembership, filename: str, s3_key: str, original: File
+) -> dict:
+    """Row for a re-upload of `original`'s content: nothing is uploaded to
+    `s3_key`, the OCR results and the chunks file of `original` are shared."""
+    return {
+        **_new_file_values(membership, filename, s3_key),
+        "stem": original.stem,
+        "s3_url": original.s3_url,
+        "status": original.status,
+        "rag_file_id": original.rag_file_id,
+        "rag_upload_name": original.rag_upload_name,
+        "rag_chunks_count": original.rag_chunks_count,
+        "rag_window_chars": original.rag_window_chars,
+        "rag_overlap_chars": original.rag_overlap_chars,
+        "rag_uploaded_at": original.rag_uploaded_at,
+        "content_sha256": original.content_sha256,
+        "content_size": original.content_size,
+        "duplicate_of_id": original.duplicate_of_id or original.id,
+    }
+
+
+async def _get_multipart_file(
+    file_id: int, membership: OrgMembership, db: AsyncSession
+) -> tuple[File, str]:
+    """The org's file and the UploadId of its unfinished multipart upload."""
+    file = await db.get(File, file_id)
+    if file is None or file.org_id != membership.org_id:
+        raise HTTPException(status_code=404, detail="File not found")
+    if file.multipart_upload_id is None:
+        raise HTTPException(status_code=409, detail="No multipart upload in progress")
+    return file, file.multipart_upload_id
+
+
 @router.post(
     "/files/upload-link",
     status_code=200,
@@ -175,20 +210,38 @@ async def get_upload_link(
     membership: Annotated[OrgMembership, Depends(require_org_admin)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> UploadLinkResponse:
+    """Presigned PUT URL and a File row for one file.
+
+    With `sha256` (and preferably `size`) of the content, an indexed file
+    of the org with the same content is reused: the new row links its
+    OCR results and chunks file, is indexed at once, and upload_url is
+    None — OCR is not run again.
+    """
+    sha256 = body.sha256.lower() if body.sha256 else None
+    original = (
+        await find_indexed_copy(db, membership.org_id, sha256, body.size)
+        if sha256
+        else None
+    )
+
     try:
-        upload_url, s3_key = generate_upload_presigned_url(body.filename)
+        if original is None:
+            upload_url, s3_key = generate_upload_presigned_url(body.filename)
+        else:
+            upload_url, s3_key = None, make_upload_key(body.filename)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    s3_url = f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET_NAME}/{s3_key}"
-    file = File(
-        user_id=membership.user.id,
-        org_id=membership.org_id,
-        original_filename=body.filename.strip(),
-        system_key=s3_key,
-        s3_url=s3_url,
-        status="pending_upload",
-    )
+    if original is None:
+        file = File(
+            **_new_file_values(membership, body.filename, s3_key),
+            content_sha256=sha256,
+            content_size=body.size,
+        )
+    else:
+        file = File(
+            **_duplicate_file_values(membership, body.filename, s3_key, original)
+        )
     db.add(file)
     await db.flush()
     file_id = file.id
@@ -198,4 +251,174 @@ async def get_upload_link(
         s3_key=s3_key,
         file_id=file_id,
         expires_in=PRESIGNED_EXPIRES_IN,
+        duplicate_of_id=file.duplicate_of_id,
     )
+
+
+@router.post(
+    "/files/upload-links",
+    status_code=200,
+    response_model=UploadLinksResponse,
+)
+async def get_upload_links(
+    body: UploadLinksRequest,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> UploadLinksResponse:
+    """Presigned PUT URLs and File rows for many files at once."""
+    # Подпись локальная, но сотни подписей — заметная работа для event loop
+    try:
+        signed = await asyncio.to_thread(
+            lambda: [generate_upload_presigned_url(name) for name in body.filenames]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Все строки одним INSERT ... RETURNING; порядок RETURNING не
+    # гарантирован, поэтому сопоставляем по уникальному system_key
+    result = await db.execute(
+        insert(File)
+        .values(
+            [
+                _new_file_values(membership, name, s3_key)
+                for name, (_, s3_key) in zip(body.filenames, signed)
+            ]
+        )
+        .returning(File.system_key, File.id)
+    )
+    file_ids = dict(result.tuples().all())
+
+    return UploadLinksResponse(
+        links=[
+            UploadLinkResponse(
+                upload_url=upload_url,
+                s3_key=s3_key,
+                file_id=file_ids[s3_key],
+                expires_in=PRESIGNED_EXPIRES_IN,
+            )
+            for upload_url, s3_key in signed
+        ]
+    )
+
+
+@router.post(
+    "/files/multipart",
+    status_code=200,
+    response_model=MultipartUploadResponse,
+)
+async def create_multipart(
+    body: MultipartUploadRequest,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> MultipartUploadResponse:
+    """Start a multipart upload and presign URLs for parts 1..parts.
+
+    Parts are uploaded with PUT in parallel; the ETag header of each
+    response goes to /files/{file_id}/multipart/complete.
+    """
+    try:
+        s3_key = make_upload_key(body.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload_id = await create_multipart_upload(s3_key)
+    parts = await asyncio.to_thread(
+        presign_upload_parts, s3_key, upload_id, range(1, body.parts + 1)
+    )
+
+    file = File(
+        **_new_file_values(membership, body.filename, s3_key),
+        multipart_upload_id=upload_id,
+    )
+    db.add(file)
+    await db.flush()
+
+    return MultipartUploadResponse(
+        file_id=file.id,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        parts=[UploadPartUrl(part_number=n, url=url) for n, url in parts],
+        expires_in=PRESIGNED_EXPIRES_IN,
+    )
+
+
+@router.post(
+    "/files/{file_id}/multipart/parts",
+    status_code=200,
+    response_model=MultipartPartsResponse,
+)
+async def presign_multipart_parts(
+    file_id: int,
+    body: MultipartPartsRequest,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> MultipartPartsResponse:
+    """Fresh URLs for parts, e.g. when resuming after the old ones expired."""
+    file, upload_id = await _get_multipart_file(file_id, membership, db)
+    try:
+        parts = await asyncio.to_thread(
+            presign_upload_parts,
+            file.system_key,
+            upload_id,
+            body.part_numbers,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MultipartPartsResponse(
+        parts=[UploadPartUrl(part_number=n, url=url) for n, url in parts],
+        expires_in=PRESIGNED_EXPIRES_IN,
+    )
+
+
+@router.get(
+    "/files/{file_id}/multipart/parts",
+    status_code=200,
+    response_model=UploadedPartsResponse,
+)
+async def get_multipart_parts(
+    file_id: int,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> UploadedPartsResponse:
+    """Parts already in S3: to resume, upload only the missing ones."""
+    file, upload_id = await _get_multipart_file(file_id, membership, db)
+    parts = await list_uploaded_parts(file.system_key, upload_id)
+    return UploadedPartsResponse(
+        parts=[
+            UploadedPart(part_number=n, etag=etag, size=size) for n, etag, size in parts
+        ]
+    )
+
+
+@router.post("/files/{file_id}/multipart/complete", status_code=200)
+async def complete_multipart(
+    file_id: int,
+    body: MultipartCompleteRequest,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> dict:
+    file, upload_id = await _get_multipart_file(file_id, membership, db)
+    try:
+        await complete_multipart_upload(
+            file.system_key,
+            upload_id,
+            [(p.part_number, p.etag) for p in body.parts],
+        )
+    except S3Error as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    file.multipart_upload_id = None
+    return {"ok": True}
+
+
+@router.delete("/files/{file_id}/multipart", status_code=200)
+async def abort_multipart(
+    file_id: int,
+    membership: Annotated[OrgMembership, Depends(require_org_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> dict:
+    """Abort the upload: S3 drops the parts, the file row is deleted."""
+    file, upload_id = await _get_multipart_file(file_id, membership, db)
+    await abort_multipart_upload(file.system_key, upload_id)
+    await db.delete(file)
+    return {"ok": True}
@@ -0,0 +1,47 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import validate_admin_user
+from app.db.models.ingest_batch import IngestBatch, add_ingest_items
+from app.db.models.user import User
+from app.db.schemas import IngestBatchRecord, IngestBatchRequest
+from app.db.session import get_db
+from rag.upload_file import chunks_source_key
+
+router = APIRouter(dependencies=[Depends(validate_admin_user)])
+
+
+@router.post("/ingest/batches", response_model=IngestBatchRecord)
+async def create_ingest_batch(
+    body: IngestBatchRequest,
+    user: Annotated[User, Depends(validate_admin_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> IngestBatchRecord:
+    """Queue re-ingestion of OCR results; app.core.ingest runs it."""
+    batch = IngestBatch(
+        user_id=user.id,
+        prefix=body.prefix,
+        window_chars=body.window_chars,
+        overlap_chars=body.overlap_chars,
+    )
+    db.add(batch)
+    await db.flush()
+    if body.keys:
+        await add_ingest_items(db, batch.id, [chunks_source_key(k) for k in body.keys])
+    await db.commit()
+    await db.refresh(batch)
+    return IngestBatchRecord.model_validate(batch)
+
+
+@router.get("/ingest/batches/{batch_id}", response_model=IngestBatchRecord)
+async def get_ingest_batch(
+    batch_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> IngestBatchRecord:
+    batch = await db.scalar(select(IngestBatch).where(IngestBatch.id == batch_id))
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return IngestBatchRecord.model_validate(batch)
@@ -5,6 +5,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import validate_user
+from app.core.principal_cache import principal_cache
 from app.db.models.organization import Organization, UserOrganization
 from app.db.models.user import User, get_user
 from app.db.schemas.organizations import (
@@ -107,6 +108,7 @@ async def add_member(
 
     db.add(UserOrganization(user_id=target.id, org_id=org_id, role=body.role))
     await db.commit()
+    principal_cache.invalidate_membership(target.id, org_id)
     return {"ok": True}
 
 
@@ -131,6 +133,7 @@ async def update_member_role(
 
     uo.role = body.role
     await db.commit()
+    principal_cache.invalidate_membership(user_id, org_id)
     return {"ok": True}
 
 
@@ -151,4 +154,5 @@ async def remove_member(
 
     await db.delete(uo)
     await db.commit()
+    principal_cache.invalidate_membership(user_id, org_id)
     return {"ok": True}
@@ -1,105 +1,261 @@
-from typing import LiteralString
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any, Literal, LiteralString
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-
-from app.core.dependencies import OrgMembership, require_org_member, validate_user
-from app.db.models import (
-    User,
-    Chat,
-    create_users_activity,
-    MessageRole,
-    save_message,
-    UserHistory,
-    OrgIndex,
+
+from app.core.activity import activity_sink
+from app.core.answer_cache import answer_cache
+from app.core.chat_summary import schedule_summary_update
+from app.core.config import settings
+from app.core.dependencies import decode_access_token, validate_user
+from app.core.fulltext import make_lexical_search
+from app.core.security import oauth2_scheme
+from app.core.ws import manager
+from app.db.answer_context import (
+    NEW_CHAT_TITLE,
+    AnswerContext,
+    load_answer_context,
+    persist_turn,
 )
+from app.db.models import Chat, OrgIndex, User, UserHistory, UserSetting
 from app.db.schemas import AnswerResponse, RagQuestion, HistoryResponse, HistoryMessage
-from app.db.session import get_db
-from rag.main import get_answer
+from app.db.session import AsyncSessionLocal, get_db
+from rag.main import get_answer, stream_answer
 
-router = APIRouter(dependencies=[Depends(validate_user)])
+# Зависимости объявлены у каждой ручки: /answer проверяет пользователя
+# сам, одним запросом вместе с остальным контекстом
+router = APIRouter()
 
 tasks: dict[str, bool | tuple[str, LiteralString] | str] = {}
 
-
-async def update_users_activity(
-    user: User = Depends(validate_user), db: AsyncSession = Depends(get_db)
-) -> None:
-    await create_users_activity(db, user)
+# Держим ссылки на фоновые стримы, чтобы их не собрал GC до завершения
+_stream_tasks: set[asyncio.Task] = set()
 
 
-@router.post("/answer", status_code=200, response_model=AnswerResponse)
-async def get_answer_from_rag(
+async def _load_question_context(
     question_schema: RagQuestion,
-    membership: OrgMembership = Depends(require_org_member),
-    _: None = Depends(update_users_activity),
-    db: AsyncSession = Depends(get_db),
-) -> AnswerResponse:
-    # Validate index belongs to org
-    index = await db.get(OrgIndex, question_schema.index_id)
-    if not index or index.org_id != membership.org_id:
-        raise HTTPException(status_code=404, detail="Index not found")
+    token: str,
+    x_organization_id: int | None,
+    db: AsyncSession,
+) -> tuple[AnswerContext, OrgIndex, UserSetting]:
+    """Authorize the question and load everything needed to answer it.
 
-    chat = await db.get(Chat, question_schema.chat_id)
-    if not chat or chat.user_id != membership.user.id:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    Same checks as validate_user + require_org_member and the index/chat
+    ownership checks, but in a single round trip (see app.db.answer_context).
+    History is the chat summary plus every message it does not cover yet
+    (normally the last CHAT_HISTORY_WINDOW, at most CHAT_HISTORY_MAX_MESSAGES).
+    """
+    email = decode_access_token(token)
+    if x_organization_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="X-Organization-ID header is required",
+        )
 
-    result = await db.execute(
-        select(User)
-        .options(joinedload(User.settings))
-        .where(User.id == membership.user.id)
+    ctx = await load_answer_context(
+        db,
+        email,
+        x_organization_id,
+        question_schema.index_id,
+        question_schema.chat_id,
+        settings.CHAT_HISTORY_WINDOW,
+        settings.CHAT_HISTORY_MAX_MESSAGES,
     )
-    user_with_settings = result.scalar_one()
-    user_settings = user_with_settings.settings
-
-    history_result = await db.execute(
-        select(UserHistory)
-        .where(
-            UserHistory.user_id == membership.user.id,
-            UserHistory.chat_id == question_schema.chat_id,
+    if ctx is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        .order_by(UserHistory.created_at)
-    )
-    dialog_history = [
-        {"role": row.role, "content": row.content}
-        for row in history_result.scalars().all()
-    ]
+    if ctx.role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this organization",
+        )
+    index, user_settings = ctx.index, ctx.settings
+    if index is None:
+        raise HTTPException(status_code=404, detail="Index not found")
+    if ctx.chat_title is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    if user_settings is None:
+        raise HTTPException(status_code=404, detail="User settings not found")
 
-    if chat.title == "Новый чат":
-        chat.title = question_schema.question[:500]
-        await db.flush()
+    if settings.CHAT_HISTORY_WINDOW <= 0:
+        ctx.chat_summary = None
+    return ctx, index, user_settings
 
-    await save_message(
-        db,
-        membership.user,
-        MessageRole.user,
-        question_schema.question,
-        chat_id=question_schema.chat_id,
+
+def _new_title(ctx: AnswerContext, question: str) -> str | None:
+    return question[:500] if ctx.chat_title == NEW_CHAT_TITLE else None
+
+
+@router.post("/answer", status_code=200, response_model=AnswerResponse)
+async def get_answer_from_rag(
+    question_schema: RagQuestion,
+    token: str = Depends(oauth2_scheme),
+    x_organization_id: int | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+) -> AnswerResponse:
+    ctx, index, user_settings = await _load_question_context(
+        question_schema, token, x_organization_id, db
     )
+    activity_sink.record(ctx.user.id)
 
     answer, context = await get_answer(
         vector_store_id=index.vector_store_id,
         question=question_schema.question,
         temp=user_settings.temperature,
         prompt=user_settings.prompt,
-        dialog_history=dialog_history,
+        dialog_history=ctx.history,
+        cache=answer_cache.bind(db),
+        chat_id=question_schema.chat_id,
+        k=user_settings.count_vector,
+        count_fulltext=user_settings.count_fulltext,
+        lexical_search=make_lexical_search(db, index.id),
+        summary=ctx.chat_summary,
     )
 
-    await save_message(
+    await persist_turn(
         db,
-        membership.user,
-        MessageRole.assistant,
-        answer,
-        chat_id=question_schema.chat_id,
+        ctx.user.id,
+        question_schema.chat_id,
+        question=question_schema.question,
+        answer=answer,
         context=context,
+        title=_new_title(ctx, question_schema.question),
     )
 
     await db.commit()
+    schedule_summary_update(question_schema.chat_id)
     return AnswerResponse(answer=answer, context=context)
 
 
+async def _answer_events(
+    question_schema: RagQuestion,
+    user: User,
+    index_id: int,
+    vector_store_id: str,
+    user_settings: UserSetting,
+    dialog_history: list[dict[str, Any]],
+    summary: str | None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Stream answer events and persist the assembled answer when done.
+
+    Events: {"type": "context"}, {"type": "delta"}*, then {"type": "done"}
+    or {"type": "error"}.
+    """
+    parts: list[str] = []
+    context = ""
+
+    # Сессия запроса к этому моменту уже закрыта — работаем в отдельной
+    async with AsyncSessionLocal() as db:
+        try:
+            async for kind, text in stream_answer(
+                vector_store_id=vector_store_id,
+                question=question_schema.question,
+                temp=user_settings.temperature,
+                prompt=user_settings.prompt,
+                dialog_history=dialog_history,
+                cache=answer_cache.bind(db),
+                chat_id=question_schema.chat_id,
+                k=user_settings.count_vector,
+                count_fulltext=user_settings.count_fulltext,
+                lexical_search=make_lexical_search(db, index_id),
+                summary=summary,
+            ):
+                if kind == "context":
+                    context = text
+                    yield {"type": "context", "context": text}
+                else:
+                    parts.append(text)
+                    yield {"type": "delta", "delta": text}
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+            return
+
+        answer = "".join(parts).strip()
+        await persist_turn(
+            db,
+            user.id,
+            question_schema.chat_id,
+            answer=answer,
+            context=context,
+        )
+        await db.commit()
+
+    schedule_summary_update(question_schema.chat_id)
+    yield {"type": "done", "answer": answer, "context": context}
+
+
+@router.post("/answer/stream", status_code=200, response_model=None)
+async def stream_answer_from_rag(
+    question_schema: RagQuestion,
+    transport: Literal["sse", "ws"] = "sse",
+    token: str = Depends(oauth2_scheme),
+    x_organization_id: int | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse | dict:
+    """Stream the answer as Server-Sent Events or over the /ws channel.
+
+    With transport=ws the call returns immediately and events are pushed
+    to the user's WebSocket connections as {"type": "answer_stream", ...}.
+    """
+    ctx, index, user_settings = await _load_question_context(
+        question_schema, token, x_organization_id, db
+    )
+    activity_sink.record(ctx.user.id)
+
+    await persist_turn(
+        db,
+        ctx.user.id,
+        question_schema.chat_id,
+        question=question_schema.question,
+        title=_new_title(ctx, question_schema.question),
+    )
+    await db.commit()
+
+    events = _answer_events(
+        question_schema,
+        ctx.user,
+        index.id,
+        index.vector_store_id,
+        user_settings,
+        ctx.history,
+        ctx.chat_summary,
+    )
+
+    if transport == "ws":
+        user_id = ctx.user.id
+        chat_id = question_schema.chat_id
+
+        async def forward() -> None:
+            async for event in events:
+                await manager.send(
+                    user_id, {"type": "answer_stream", "chat_id": chat_id, **event}
+                )
+
+        task = asyncio.create_task(forward())
+        _stream_tasks.add(task)
+        task.add_done_callback(_stream_tasks.discard)
+        return {"ok": True}
+
+    async def sse() -> AsyncIterator[str]:
+        async for event in events:
+            data = json.dumps(event, ensure_ascii=False)
+            yield f"event: {event['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history", status_code=200, response_model=HistoryResponse)
 async def get_history(
     chat_id: int,
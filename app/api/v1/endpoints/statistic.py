@@ -1,10 +1,20 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import validate_user
+from app.core.activity import activity_sink
+from app.core.answer_cache import answer_cache
+from app.core.dependencies import validate_admin_user, validate_user
+from app.core.file_gc import file_gc
+from app.core.index_jobs import index_job_worker
+from app.core.ingest import ingest_runner
+from app.core.principal_cache import principal_cache
 from app.db.models.review import create_review
 from app.db.schemas import Review
 from app.db.session import get_db
+from rag import s3 as rag_s3
+from rag.clients import registry as yandex_clients
+from rag.main import rewrite_stats, speculative_stats
+from rag.poller import build_poller
 
 router = APIRouter(dependencies=[Depends(validate_user)])
 
@@ -13,3 +23,20 @@ router = APIRouter(dependencies=[Depends(validate_user)])
 async def push_review(review: Review, db: AsyncSession = Depends(get_db)) -> int:
     await create_review(db, review)
     return 200
+
+
+@router.get("/metrics", status_code=200, dependencies=[Depends(validate_admin_user)])
+async def get_metrics() -> dict:
+    return {
+        "yandex_clients": yandex_clients.stats(),
+        "answer_cache": answer_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "activity": activity_sink.stats(),
+        "index_jobs": index_job_worker.stats(),
+        "index_builds": build_poller.stats(),
+        "file_gc": file_gc.stats(),
+        "ingest": ingest_runner.stats(),
+        "s3": rag_s3.stats(),
+        "rewrite": rewrite_stats,
+        "speculative_search": speculative_stats,
+    }
@@ -9,6 +9,7 @@ from app.api.v1.endpoints import (
     chats_router,
     files_router,
     organizations_router,
+    ingest_router,
 )
 
 api_router = APIRouter()
@@ -20,3 +21,4 @@ api_router.include_router(settings_router, tags=["Settings endpoints"])
 api_router.include_router(chats_router, tags=["Chat endpoints"])
 api_router.include_router(files_router, tags=["Files endpoints"])
 api_router.include_router(organizations_router, tags=["Organizations"])
+api_router.include_router(ingest_router, tags=["Ingest endpoints"])
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import UTC, datetime
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db.models import UsersActivity
+from app.db.session import AsyncSessionLocal
+
+
+class ActivitySink:
+    """Buffered writer for users_activity.
+
+    record() only puts the event into an in-memory queue; a background
+    task bulk-inserts the queue every ACTIVITY_FLUSH_INTERVAL_MS or as soon
+    as ACTIVITY_BATCH_SIZE events are waiting. When the queue is full new
+    events are dropped and counted — activity is statistics, not data we
+    are allowed to slow requests down for.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[tuple[int, datetime]] = asyncio.Queue(
+            maxsize=settings.ACTIVITY_QUEUE_SIZE
+        )
+        self._task: asyncio.Task | None = None
+        # Пачка, которая копится, и пачка, которая пишется прямо сейчас:
+        # stop() не должен потерять ни ту, ни другую
+        self._batch: list[tuple[int, datetime]] = []
+        self._inflight: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def record(self, user_id: int) -> None:
+        # Время фиксируем в момент события, а не записи; колонка без таймзоны
+        created_at = datetime.now(UTC).replace(tzinfo=None)
+        try:
+            self._queue.put_nowait((user_id, created_at))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None:
+            await self._inflight
+        batch, self._batch = self._batch, []
+        await self._flush(batch)
+        while not self._queue.empty():
+            await self._flush(self._drain())
+
+    def _drain(self) -> list[tuple[int, datetime]]:
+        batch: list[tuple[int, datetime]] = []
+        while len(batch) < settings.ACTIVITY_BATCH_SIZE and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        interval = settings.ACTIVITY_FLUSH_INTERVAL_MS / 1000
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + interval
+            # Копим пачку до дедлайна или до полного размера
+            while len(self._batch) < settings.ACTIVITY_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                self._batch.append(item)
+
+            batch, self._batch = self._batch, []
+            self._inflight = asyncio.create_task(self._flush(batch))
+            await asyncio.shield(self._inflight)
+
+    async def _flush(self, batch: list[tuple[int, datetime]]) -> None:
+        if not batch:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    insert(UsersActivity),
+                    [
+                        {"user_id": user_id, "created_at": created_at}
+                        for user_id, created_at in batch
+                    ],
+                )
+                await db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            self.dropped += len(batch)
+            print(f"activity: failed to write {len(batch)} events: {e}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+
+activity_sink = ActivitySink()
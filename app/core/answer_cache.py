@@ -0,0 +1,105 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models.answer_cache import (
+    delete_cached_answers,
+    get_cached_answer,
+    prune_answer_cache,
+    put_cached_answer,
+)
+from rag.cache import TTLCache
+
+# Чистим таблицу от просроченных и лишних записей раз в столько вставок
+_PRUNE_EVERY = 100
+
+
+class _BoundAnswerCache:
+    """AnswerCache (see rag.answer_cache) bound to one DB session."""
+
+    def __init__(self, owner: "TwoTierAnswerCache", db: AsyncSession) -> None:
+        self._owner = owner
+        self._db = db
+
+    async def get(self, key: str) -> tuple[str, str] | None:
+        return await self._owner.get(self._db, key)
+
+    async def set(
+        self, key: str, vector_store_id: str, answer: str, context: str
+    ) -> None:
+        await self._owner.set(self._db, key, vector_store_id, answer, context)
+
+
+class TwoTierAnswerCache:
+    """Answer cache with an in-process LRU tier over a shared Postgres tier.
+
+    The LRU tier has a short TTL of its own: invalidation only reaches the
+    local tier of the worker that performed it, other workers drop their
+    copies when the LRU entry expires.
+    """
+
+    def __init__(self) -> None:
+        self._lru: TTLCache[str, tuple[str, str, str]] = TTLCache(
+            maxsize=settings.ANSWER_CACHE_LRU_SIZE,
+            ttl=settings.ANSWER_CACHE_LRU_TTL_SECONDS,
+        )
+        self.db_hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    def bind(self, db: AsyncSession) -> _BoundAnswerCache | None:
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+        return _BoundAnswerCache(self, db)
+
+    async def get(self, db: AsyncSession, key: str) -> tuple[str, str] | None:
+        local = self._lru.get(key)
+        if local is not None:
+            _, answer, context = local
+            return answer, context
+
+        cached = await get_cached_answer(db, key)
+        if cached is None:
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        # Следующий запрос этого воркера обойдётся без Postgres
+        self._lru.set(key, cached)
+        _, answer, context = cached
+        return answer, context
+
+    async def set(
+        self,
+        db: AsyncSession,
+        key: str,
+        vector_store_id: str,
+        answer: str,
+        context: str,
+    ) -> None:
+        self._lru.set(key, (vector_store_id, answer, context))
+        await put_cached_answer(
+            db,
+            key,
+            vector_store_id,
+            answer,
+            context,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        )
+        self._puts += 1
+        if self._puts % _PRUNE_EVERY == 0:
+            await prune_answer_cache(db, settings.ANSWER_CACHE_MAX_ROWS)
+
+    async def invalidate(self, db: AsyncSession, vector_store_id: str) -> None:
+        self._lru.discard_where(lambda _, v: v[0] == vector_store_id)
+        await delete_cached_answers(db, vector_store_id)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "lru_size": len(self._lru),
+            "lru_hits": self._lru.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+answer_cache = TwoTierAnswerCache()
@@ -0,0 +1,68 @@
+import asyncio
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.db.models import Chat, UserHistory
+from app.db.session import AsyncSessionLocal
+from rag.summarize import summarize_dialog
+
+# Чаты, для которых сводка уже пересчитывается, и ссылки на задачи от GC
+_running: set[int] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+def schedule_summary_update(chat_id: int) -> None:
+    """Fold messages that left the history window into the chat summary.
+
+    Runs in the background after a turn is saved; the answer path only
+    reads chats.summary plus the last CHAT_HISTORY_WINDOW messages.
+    """
+    if settings.CHAT_HISTORY_WINDOW <= 0 or chat_id in _running:
+        return
+    _running.add(chat_id)
+    task = asyncio.create_task(_update_summary(chat_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _update_summary(chat_id: int) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            chat = await db.get(Chat, chat_id)
+            if chat is None:
+                return
+            summary, upto_id = chat.summary, chat.summary_upto_id
+            result = await db.execute(
+                select(UserHistory.id, UserHistory.role, UserHistory.content)
+                .where(
+                    UserHistory.chat_id == chat_id,
+                    UserHistory.id > func.coalesce(upto_id, 0),
+                )
+                .order_by(UserHistory.id)
+            )
+            rows = result.all()
+
+        to_fold = rows[: -settings.CHAT_HISTORY_WINDOW]
+        if not to_fold:
+            return
+
+        # Сессию на время вызова LLM не держим
+        new_summary = await summarize_dialog(
+            summary, [{"role": r.role.value, "content": r.content} for r in to_fold]
+        )
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Chat)
+                .where(
+                    Chat.id == chat_id,
+                    Chat.summary_upto_id.is_not_distinct_from(upto_id),
+                )
+                .values(summary=new_summary, summary_upto_id=to_fold[-1].id)
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"chat summary: chat {chat_id}: {e}")
+    finally:
+        _running.discard(chat_id)
@@ -21,5 +21,57 @@ class Settings(BaseSettings):
 
     CLOUD_FUNCTION_API_KEY: str
 
+    # Кэш пользователей и ролей в организациях для проверки доступа
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Кэш ответов: LRU в процессе + общая таблица answer_cache в Postgres
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    ANSWER_CACHE_MAX_ROWS: int = 50_000
+    ANSWER_CACHE_LRU_SIZE: int = 512
+    ANSWER_CACHE_LRU_TTL_SECONDS: int = 300
+
+    # Сколько последних сообщений чата идёт в промпт как есть; более ранние
+    # сворачиваются в chats.summary. 0 — вся история, без сводки
+    CHAT_HISTORY_WINDOW: int = 6
+    # Сообщения, ещё не свёрнутые в сводку, идут в промпт все, но не больше
+    # стольких последних: предел на случай, если сводка долго не обновляется
+    CHAT_HISTORY_MAX_MESSAGES: int = 40
+
+    # Буферизованная запись users_activity (см. app/core/activity.py)
+    ACTIVITY_QUEUE_SIZE: int = 10_000
+    ACTIVITY_BATCH_SIZE: int = 500
+    ACTIVITY_FLUSH_INTERVAL_MS: int = 500
+
+    # Очередь сборки индексов (таблица index_jobs, см. app/core/index_jobs.py)
+    INDEX_JOB_CONCURRENCY: int = 2
+    INDEX_JOBS_PER_ORG: int = 1
+    INDEX_JOB_LEASE_SECONDS: int = 60
+    INDEX_JOB_HEARTBEAT_SECONDS: float = 15.0
+    INDEX_JOB_IDLE_SECONDS: float = 2.0
+    INDEX_JOB_MAX_ATTEMPTS: int = 3
+
+    # Фоновое удаление файлов (см. app/core/file_gc.py)
+    FILE_GC_INTERVAL_SECONDS: float = 30.0
+    FILE_GC_BATCH_SIZE: int = 200
+    FILE_GC_CONCURRENCY: int = 4
+    FILE_GC_RETRY_SECONDS: int = 60
+    FILE_GC_MAX_ATTEMPTS: int = 5
+    FILE_GC_SWEEP_INTERVAL_SECONDS: float = 3600.0
+    FILE_GC_ORPHAN_MIN_AGE_SECONDS: int = 86400
+
+    # Пакетная загрузка чанков (таблицы ingest_*, см. app/core/ingest.py).
+    # INGEST_PROCESSES = 0 — по числу ядер
+    INGEST_CONCURRENCY: int = 16
+    INGEST_S3_CONCURRENCY: int = 8
+    INGEST_UPLOAD_CONCURRENCY: int = 4
+    INGEST_PROCESSES: int = 0
+    INGEST_MAX_ATTEMPTS: int = 4
+    INGEST_RETRY_SECONDS: float = 2.0
+    INGEST_LEASE_SECONDS: int = 120
+    INGEST_REPORT_SECONDS: float = 15.0
+    INGEST_IDLE_SECONDS: float = 5.0
+
 
 settings = Settings()
@@ -8,6 +8,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import settings
+from app.core.principal_cache import principal_cache
 from app.core.security import oauth2_scheme
 from app.db.models.organization import UserOrganization
 from app.db.models.user import User, get_user
@@ -29,10 +30,8 @@ class OrgMembership:
         return self.role == "owner"
 
 
-async def validate_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
+def decode_access_token(token: str) -> str:
+    """Email (sub) of a valid access token; raises 401 otherwise."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,23 +42,40 @@ async def validate_user(
         payload = jwt.decode(
             token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
         )
+    except InvalidTokenError:
+        raise credentials_exception
 
-        email = payload.get("sub")
-        if not isinstance(email, str) or not email:
-            raise credentials_exception
+    email = payload.get("sub")
+    if not isinstance(email, str) or not email:
+        raise credentials_exception
 
-        token_type = payload.get("type")
-        if token_type != "access":
-            raise credentials_exception
+    token_type = payload.get("type")
+    if token_type != "access":
+        raise credentials_exception
 
-        user = await get_user(db, email)
-        if user is None:
-            raise credentials_exception
+    return email
 
-        return user
 
-    except InvalidTokenError:
-        raise credentials_exception
+async def validate_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> User:
+    email = decode_access_token(token)
+
+    cached = principal_cache.get_user(email)
+    if cached is not None:
+        return cached
+
+    user = await get_user(db, email)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    principal_cache.put_user(user)
+    return user
 
 
 async def validate_admin_user(user: Annotated[User, Depends(validate_user)]) -> User:
@@ -81,20 +97,23 @@ async def require_org_member(
             detail="X-Organization-ID header is required",
         )
 
-    result = await db.execute(
-        select(UserOrganization).where(
-            UserOrganization.user_id == user.id,
-            UserOrganization.org_id == x_organization_id,
-        )
-    )
-    uo = result.scalar_one_or_none()
-    if uo is None:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this organization",
+    role = principal_cache.get_role(user.id, x_organization_id)
+    if role is None:
+        result = await db.execute(
+            select(UserOrganization.role).where(
+                UserOrganization.user_id == user.id,
+                UserOrganization.org_id == x_organization_id,
+            )
         )
-
-    return OrgMembership(user=user, org_id=x_organization_id, role=uo.role)
+        role = result.scalar_one_or_none()
+        if role is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not a member of this organization",
+            )
+        principal_cache.put_role(user.id, x_organization_id, role)
+
+    return OrgMembership(user=user, org_id=x_organization_id, role=role)
 
 
 async def require_org_admin(
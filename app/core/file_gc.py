@@ -0,0 +1,299 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, select, text, update
+
+from app.core.config import settings
+from app.core.s3 import (
+    S3_RESULT_PREFIXES,
+    app_s3,
+    delete_s3_objects,
+    file_s3_keys,
+    s3_url_key,
+)
+from app.core.ws import manager
+from app.db.models.file import (
+    FILE_DELETE_FAILED,
+    FILE_DELETING,
+    File,
+    key_stem,
+    live_stems,
+)
+from app.db.models.index_file import get_file_stores, get_stem_stores
+from app.db.session import AsyncSessionLocal
+from rag.delete_file import delete_rag_file
+
+
+def _s3_keys(f: File) -> list[str]:
+    if key_stem(f.system_key) == f.stem:
+        return file_s3_keys(f.system_key)
+    # Копия: своего объекта нет, исходник — объект оригинала из s3_url
+    return file_s3_keys(s3_url_key(f.s3_url))
+
+
+@dataclass
+class _Batch:
+    """Claimed tombstones and what is needed to delete them."""
+
+    files: list[File]
+    # stem, которыми ещё пользуются живые копии
+    shared: set[str]
+    keys: dict[int, list[str]]
+    memberships: list[list[tuple[str, str | None]]]
+
+
+class FileGarbageCollector:
+    """Background deletion of files marked FILE_DELETING.
+
+    DELETE /files only puts a tombstone on the row. This loop claims up to
+    FILE_GC_BATCH_SIZE tombstones in a short transaction (FOR UPDATE SKIP
+    LOCKED, so several workers can run it), removes their S3 objects with
+    batched DeleteObjects, the Yandex file and its store memberships
+    outside any transaction, and then deletes the rows in a second one.
+    Failed files are retried with exponential backoff and marked
+    FILE_DELETE_FAILED after FILE_GC_MAX_ATTEMPTS. Every
+    FILE_GC_SWEEP_INTERVAL_SECONDS one worker also removes OCR results in
+    S3 that no file row refers to.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._last_sweep = 0.0
+        self.deleted = 0
+        self.retried = 0
+        self.failed = 0
+        self.orphans_deleted = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Start a pass now instead of waiting for the interval."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.collect() >= settings.FILE_GC_BATCH_SIZE:
+                    pass
+                if (
+                    loop.time() - self._last_sweep
+                    >= settings.FILE_GC_SWEEP_INTERVAL_SECONDS
+                ):
+                    self._last_sweep = loop.time()
+                    await self.sweep_orphans()
+            except Exception as e:
+                print(f"file gc: {e}")
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.FILE_GC_INTERVAL_SECONDS
+                )
+            except TimeoutError:
+                pass
+
+    async def collect(self) -> int:
+        """One batch of tombstones; returns how many files were taken."""
+        batch = await self._claim()
+        if batch is None:
+            return 0
+        files, shared, keys = batch.files, batch.shared, batch.keys
+
+        # Удаления в S3 и Yandex — вне транзакций: медленный или зависший
+        # запрос не держит ни соединение, ни блокировки строк
+        failed_keys = set(
+            await delete_s3_objects(
+                list(dict.fromkeys(k for ks in keys.values() for k in ks))
+            )
+        )
+        semaphore = asyncio.Semaphore(settings.FILE_GC_CONCURRENCY)
+        rag_errors = await asyncio.gather(
+            *(
+                self._remove_from_rag(f, pairs, semaphore, f.stem in shared)
+                for f, pairs in zip(files, batch.memberships)
+            )
+        )
+
+        done: list[File] = []
+        gave_up: list[tuple[File, str]] = []
+        async with AsyncSessionLocal() as db:
+            for f, rag_error in zip(files, rag_errors):
+                s3_failed = [k for k in keys[f.id] if k in failed_keys]
+                if not s3_failed and rag_error is None:
+                    done.append(f)
+                    continue
+                error = rag_error or f"S3: {', '.join(s3_failed)}"
+                # Попытка уже засчитана при захвате
+                last = f.delete_attempts + 1 >= settings.FILE_GC_MAX_ATTEMPTS
+                await db.execute(
+                    update(File)
+                    .where(File.id == f.id, File.status == FILE_DELETING)
+                    .values(
+                        status=FILE_DELETE_FAILED if last else FILE_DELETING,
+                        error_message=error,
+                        status_changed_at=func.now(),
+                    )
+                )
+                if last:
+                    gave_up.append((f, error))
+                else:
+                    self.retried += 1
+
+            if done:
+                await db.execute(delete(File).where(File.id.in_([f.id for f in done])))
+            await db.commit()
+
+        self.failed += len(gave_up)
+        for f, error in gave_up:
+            await self._notify(f, FILE_DELETE_FAILED, error)
+        self.deleted += len(done)
+        for f in done:
+            await self._notify(f, "deleted", None)
+        return len(files)
+
+    async def _claim(self) -> _Batch | None:
+        """Take a batch of tombstones in one short transaction.
+
+        The claim counts as an attempt and restarts the backoff, so until the
+        batch is finished other workers skip it even without row locks.
+        """
+        # Повторная попытка — не раньше, чем через RETRY * 2^попыток секунд
+        waited = func.extract("epoch", func.now() - File.status_changed_at)
+        backoff = settings.FILE_GC_RETRY_SECONDS * func.power(2, File.delete_attempts)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(File)
+                .where(
+                    File.status == FILE_DELETING,
+                    waited >= backoff,
+                )
+                .order_by(File.status_changed_at)
+                .limit(settings.FILE_GC_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            files = list(result.scalars().all())
+            if not files:
+                return None
+
+            # Копии делят с оригиналом stem: исходник, результаты OCR и файл
+            # чанков удаляются только вместе с последней живой строкой
+            ids = [f.id for f in files]
+            shared = await live_stems(db, {f.stem for f in files}, ids)
+            keys = {f.id: [] if f.stem in shared else _s3_keys(f) for f in files}
+
+            memberships = []
+            for f in files:
+                if f.stem in shared:
+                    # Общий файл чанков убираем только из индексов этой
+                    # строки, в которых нет живых копий
+                    pairs = await get_file_stores(db, f.id, f.org_id, untracked=False)
+                    keep = await get_stem_stores(db, f.stem, ids)
+                    pairs = [(vs, rid) for vs, rid in pairs if vs not in keep]
+                else:
+                    pairs = await get_file_stores(db, f.id, f.org_id)
+                memberships.append(pairs)
+
+            await db.execute(
+                update(File)
+                .where(File.id.in_(ids))
+                .values(
+                    delete_attempts=File.delete_attempts + 1,
+                    status_changed_at=func.now(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return _Batch(files, shared, keys, memberships)
+
+    @staticmethod
+    async def _remove_from_rag(
+        f: File,
+        memberships: list[tuple[str, str | None]],
+        semaphore: asyncio.Semaphore,
+        shared: bool,
+    ) -> str | None:
+        # Каждый индекс убираем с тем id, который он получил: после
+        # перезагрузки (app.core.ingest) старые индексы держат прежний файл
+        async with semaphore:
+            try:
+                await delete_rag_file(
+                    f.stem,
+                    [f.rag_file_id] if f.rag_file_id else [],
+                    memberships,
+                    keep_file=shared,
+                )
+            except Exception as e:
+                return str(e)
+        return None
+
+    @staticmethod
+    async def _notify(f: File, status: str, error_message: str | None) -> None:
+        await manager.send(
+            f.user_id,
+            {
+                "type": "file_status",
+                "file_id": f.id,
+                "status": status,
+                "error_message": error_message,
+            },
+        )
+
+    async def sweep_orphans(self) -> int:
+        """Delete OCR results whose source file no longer has a row."""
+        async with AsyncSessionLocal() as db:
+            # Один сборщик на все процессы: остальные пропускают проход
+            locked = await db.scalar(
+                select(func.pg_try_advisory_xact_lock(text("hashtext('file_gc')")))
+            )
+            if not locked:
+                return 0
+            result = await db.execute(select(File.stem))
+            stems = set(result.scalars().all())
+
+            # Свежие объекты не трогаем: строка файла могла появиться уже
+            # после того, как мы прочитали stems
+            modified_before = datetime.now(UTC) - timedelta(
+                seconds=settings.FILE_GC_ORPHAN_MIN_AGE_SECONDS
+            )
+
+            s3 = app_s3()
+            orphans = [
+                key
+                for prefix in S3_RESULT_PREFIXES
+                async for key, modified in s3.list_objects(
+                    settings.S3_BUCKET_NAME, prefix
+                )
+                if modified < modified_before and key_stem(key) not in stems
+            ]
+            if not orphans:
+                return 0
+            failed = await delete_s3_objects(orphans)
+
+        deleted = len(orphans) - len(failed)
+        self.orphans_deleted += deleted
+        print(f"file gc: deleted {deleted} orphaned S3 objects")
+        return deleted
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "deleted": self.deleted,
+            "retried": self.retried,
+            "failed": self.failed,
+            "orphans_deleted": self.orphans_deleted,
+        }
+
+
+file_gc = FileGarbageCollector()
@@ -0,0 +1,57 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.index_chunk import add_index_chunks, search_index_chunks
+from app.db.session import AsyncSessionLocal
+from rag.hits import LexicalSearch, SearchHit
+from rag.upload_file import load_chunks
+
+# Сколько OCR-файлов одновременно читаем из S3 при наполнении индекса
+_LOAD_CONCURRENCY = 4
+
+
+def make_lexical_search(db: AsyncSession, index_id: int) -> LexicalSearch:
+    """Full-text leg for rag.main.get_answer bound to one index."""
+
+    async def search(query: str, limit: int) -> list[SearchHit]:
+        rows = await search_index_chunks(db, index_id, query, limit)
+        return [
+            SearchHit(filename=filename, text=body, score=rank)
+            for filename, body, rank in rows
+        ]
+
+    return search
+
+
+async def index_files_fulltext(
+    index_id: int, sources: list[tuple[str, int | None, int | None]]
+) -> None:
+    """Chunk the OCR output of files and store it for full-text search.
+
+    `sources` are (stem, window_chars, overlap_chars): the parameters the
+    chunks in the vector store were cut with (files.rag_window_chars and
+    rag_overlap_chars), None for the defaults. rag.upload_file.load_chunks
+    cuts the same OCR JSON into the same chunks, so both legs of the hybrid
+    search see the same text.
+    """
+    semaphore = asyncio.Semaphore(_LOAD_CONCURRENCY)
+
+    async def load(stem: str, window: int | None, overlap: int | None) -> list[str]:
+        params = {}
+        if window is not None and overlap is not None:
+            params = {"window_chars": window, "overlap_chars": overlap}
+        async with semaphore:
+            try:
+                chunks = await load_chunks(f"{stem}.json", **params)
+            except Exception as e:
+                print(f"fulltext: skip {stem}: {e}")
+                return []
+            return [c["body"] for c in chunks]
+
+    loaded = await asyncio.gather(*(load(*source) for source in sources))
+
+    async with AsyncSessionLocal() as db:
+        for (stem, _, _), bodies in zip(sources, loaded):
+            await add_index_chunks(db, index_id, f"{stem}.chunks.jsonl", bodies)
+        await db.commit()
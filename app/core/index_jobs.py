@@ -0,0 +1,265 @@
+import asyncio
+import os
+import socket
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.core.answer_cache import answer_cache
+from app.core.config import settings
+from app.core.fulltext import index_files_fulltext
+from app.core.ws import manager
+from app.db.models.file import FILE_DELETE_FAILED, FILE_DELETING, File
+from app.db.models.index_file import IndexFile
+from app.db.models.index_job import (
+    JOB_DONE,
+    JOB_ERROR,
+    IndexJob,
+    claim_index_job,
+    heartbeat_index_job,
+    update_index_job,
+)
+from app.db.models.org_index import OrgIndex
+from app.db.schemas import IndexRecord
+from app.db.session import AsyncSessionLocal
+from rag.backends import LOCAL_STORE_PREFIX, default_backend
+from rag.create_index import start_index
+from rag.poller import build_poller
+
+
+class JobLost(Exception):
+    """The lease expired and another worker took the job over."""
+
+
+async def _get_rag_files(
+    file_ids: list[int], org_id: int
+) -> dict[str, tuple[int, str | None, int | None, int | None]]:
+    """Chunk file name -> (files.id, Yandex file id saved at ingest or None,
+    window_chars and overlap_chars it was chunked with)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                File.id,
+                File.stem,
+                File.rag_upload_name,
+                File.rag_file_id,
+                File.rag_window_chars,
+                File.rag_overlap_chars,
+            ).where(
+                File.id.in_(file_ids),
+                File.org_id == org_id,
+                File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
+            )
+        )
+        return {
+            upload_name or f"{stem}.chunks.jsonl": (id_, rag_file_id, window, overlap)
+            for id_, stem, upload_name, rag_file_id, window, overlap in result.all()
+        }
+
+
+async def _save_index_to_db(
+    org_id: int, name: str, vector_store_id: str, members: dict[int, str | None]
+) -> IndexRecord:
+    """Save the index and which files it was built from (see IndexFile)."""
+    async with AsyncSessionLocal() as db:
+        index = OrgIndex(org_id=org_id, name=name, vector_store_id=vector_store_id)
+        db.add(index)
+        await db.flush()
+        db.add_all(
+            IndexFile(index_id=index.id, file_id=file_id, rag_file_id=rag_file_id)
+            for file_id, rag_file_id in members.items()
+        )
+        # Индекс пересобран поверх того же vector store — старые ответы невалидны
+        await answer_cache.invalidate(db, vector_store_id)
+        await db.commit()
+        await db.refresh(index)
+        return IndexRecord.model_validate(index)
+
+
+class IndexJobWorker:
+    """Background loop that builds indexes from the index_jobs table.
+
+    Every uvicorn worker runs INDEX_JOB_CONCURRENCY of these loops; jobs
+    are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+    processes can share the table. At most INDEX_JOBS_PER_ORG jobs of one
+    organization build at the same time.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task] = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def _lease(self) -> timedelta:
+        return timedelta(seconds=settings.INDEX_JOB_LEASE_SECONDS)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        for n in range(settings.INDEX_JOB_CONCURRENCY):
+            self._tasks.append(asyncio.create_task(self._run(f"{self._prefix}:{n}")))
+
+    async def stop(self) -> None:
+        # Незавершённые задачи не помечаем ошибкой: по истечении аренды их
+        # подхватит другой воркер и продолжит опрос vector store
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, worker_id: str) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    job = await claim_index_job(
+                        db, worker_id, self._lease, settings.INDEX_JOBS_PER_ORG
+                    )
+            except Exception as e:
+                print(f"index jobs: claim failed: {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(settings.INDEX_JOB_IDLE_SECONDS)
+                continue
+
+            await self._process(job, worker_id)
+
+    async def _heartbeat(self, job_id: int, worker_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            if not await heartbeat_index_job(db, job_id, worker_id):
+                raise JobLost(job_id)
+
+    async def _update(self, job_id: int, worker_id: str, **values: object) -> None:
+        async with AsyncSessionLocal() as db:
+            await update_index_job(db, job_id, worker_id, **values)
+
+    async def _process(self, job: IndexJob, worker_id: str) -> None:
+        try:
+            if job.attempts > settings.INDEX_JOB_MAX_ATTEMPTS:
+                raise RuntimeError(f"Gave up after {job.attempts - 1} attempts")
+
+            rag_files = await _get_rag_files(job.file_ids, job.org_id)
+            names2ids = {name: rid for name, (_, rid, _, _) in rag_files.items() if rid}
+            indexed_names = list(rag_files)
+            vector_store_id = job.vector_store_id
+            resumed = vector_store_id is not None
+            if vector_store_id is None:
+                names2ids = await default_backend().resolve_file_ids(
+                    rag_files, names2ids
+                )
+                if not names2ids:
+                    raise ValueError("None of the selected files are indexed in Yandex")
+                indexed_names = list(names2ids)
+
+                vector_store_id = await start_index(job.name, list(names2ids.values()))
+                # Запоминаем сразу: после рестарта продолжим опрос, а не
+                # создадим второй vector store
+                await self._update(job.id, worker_id, vector_store_id=vector_store_id)
+
+            build = build_poller.watch(
+                vector_store_id, len(indexed_names), started=not resumed
+            )
+            eta = build_poller.eta(vector_store_id)
+            await manager.send(
+                job.user_id,
+                {
+                    "type": "index_status",
+                    "status": "running",
+                    "name": job.name,
+                    "job_id": job.id,
+                    "eta_seconds": None if eta is None else round(eta),
+                },
+            )
+
+            # Статус опрашивает общий build_poller; здесь только продлеваем аренду
+            while True:
+                try:
+                    status = await asyncio.wait_for(
+                        asyncio.shield(build),
+                        settings.INDEX_JOB_HEARTBEAT_SECONDS,
+                    )
+                    break
+                except TimeoutError:
+                    await self._heartbeat(job.id, worker_id)
+
+            if status != "completed":
+                raise RuntimeError(f"Vector store build {status}")
+
+            # Id файлов Yandex храним только для индексов Yandex: по ним
+            # удаление файла точечно убирает его из vector store
+            remote = not vector_store_id.startswith(LOCAL_STORE_PREFIX)
+            members = {
+                rag_files[name][0]: names2ids.get(name) if remote else None
+                for name in indexed_names
+            }
+            saved = await _save_index_to_db(
+                job.org_id, job.name, vector_store_id, members
+            )
+            await self._update(
+                job.id, worker_id, status=JOB_DONE, index_id=saved.id, error=None
+            )
+            self.completed += 1
+
+            await manager.send(
+                job.user_id,
+                {
+                    "type": "index_status",
+                    "status": "done",
+                    "job_id": job.id,
+                    "index": {
+                        "id": saved.id,
+                        "name": saved.name,
+                        "created_at": saved.created_at.isoformat(),
+                    },
+                },
+            )
+
+            # Полнотекстовая часть гибридного поиска; индекс уже рабочий
+            # и без неё, поэтому ошибки здесь не портят статус. Режем с
+            # параметрами загруженного файла чанков; локальный бэкенд сам
+            # режет OCR с параметрами по умолчанию
+            try:
+                await index_files_fulltext(
+                    saved.id,
+                    [
+                        (
+                            name.removesuffix(".chunks.jsonl"),
+                            *(rag_files[name][2:] if remote else (None, None)),
+                        )
+                        for name in indexed_names
+                    ],
+                )
+            except Exception as e:
+                print(f"fulltext: index {saved.id}: {e}")
+        except JobLost:
+            print(f"index jobs: job {job.id} was taken over by another worker")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(e)
+            self.failed += 1
+            try:
+                await self._update(job.id, worker_id, status=JOB_ERROR, error=str(e))
+            except Exception as db_error:
+                print(f"index jobs: cannot mark job {job.id} failed: {db_error}")
+            await manager.send(
+                job.user_id,
+                {
+                    "type": "index_status",
+                    "status": "error",
+                    "job_id": job.id,
+                    "error": str(e),
+                },
+            )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+index_job_worker = IndexJobWorker()
@@ -0,0 +1,457 @@
+"""Batch re-ingestion of OCR results: chunk them again and upload to Yandex.
+
+A trigger runs rag.upload_file for one S3 key; re-ingesting a collection
+(e.g. with new chunk parameters) is an ingest batch instead. Batches come
+from POST /ingest/batches or from the command line:
+
+    python -m app.core.ingest --prefix result/json-files/
+    python -m app.core.ingest --keys a.json b.json --window-chars 600
+    python -m app.core.ingest --resume 12
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import httpx
+import openai
+from sqlalchemy import func, or_, select, update
+
+from app.core.config import settings
+from app.db.models.file import File, key_stem
+from app.db.models.index_file import rag_file_in_use
+from app.db.models.ingest_batch import (
+    BATCH_DONE,
+    BATCH_ERROR,
+    BATCH_RUNNING,
+    IngestBatch,
+    add_ingest_items,
+    claim_ingest_batch,
+    finish_ingest_item,
+    heartbeat_ingest_batch,
+    pending_ingest_keys,
+)
+from app.db.session import AsyncSessionLocal
+from rag import s3 as rag_s3_clients
+from rag.clients import get_client
+from rag.clients import registry as yandex_clients
+from rag.config import settings as rag_settings
+from rag.delete_file import delete_rag_file
+from rag.s3 import S3Error, rag_s3
+from rag.upload_file import (
+    chunks_jsonl_from_bytes,
+    chunks_source_key,
+    make_upload_name,
+    s3_get_bytes,
+    upload_chunks_jsonl_bytes,
+)
+
+
+class BatchLost(Exception):
+    """The lease expired and another worker took the batch over."""
+
+
+def _is_transient(e: BaseException) -> bool:
+    """Worth retrying: network errors, throttling, 5xx, a crashed pool."""
+    if isinstance(e, S3Error):
+        return e.status_code == 429 or e.status_code >= 500
+    return isinstance(
+        e,
+        (
+            httpx.TransportError,
+            openai.APIConnectionError,
+            openai.RateLimitError,
+            openai.InternalServerError,
+            BrokenProcessPool,
+        ),
+    )
+
+
+class IngestRunner:
+    """Runs ingest batches (see app.db.models.ingest_batch).
+
+    Up to INGEST_CONCURRENCY keys are in flight at once. Downloads from
+    S3 and uploads to the Files API have their own limits
+    (INGEST_S3_CONCURRENCY, INGEST_UPLOAD_CONCURRENCY), and parsing and
+    chunking run in a process pool of INGEST_PROCESSES, so a batch uses
+    every core while the event loop only waits on I/O. Transient errors
+    are retried with exponential backoff and jitter, up to
+    INGEST_MAX_ATTEMPTS. Every INGEST_REPORT_SECONDS the runner extends
+    its lease on the batch and prints docs/s and chunks/s.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:ingest"
+        self.batch_id: int | None = None
+        self._run_started = 0.0
+        self._run_docs = 0
+        self._run_chunks = 0
+        self.docs = 0
+        self.chunks = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def _lease(self) -> timedelta:
+        return timedelta(seconds=settings.INGEST_LEASE_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Недоделанный пакет подхватят после истечения аренды
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._shutdown_pool()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: форк процесса с работающим event loop и пулами
+            # соединений ненадёжен
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.INGEST_PROCESSES or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    batch = await claim_ingest_batch(db, self.worker_id, self._lease)
+            except Exception as e:
+                print(f"ingest: claim failed: {e}")
+                batch = None
+
+            if batch is None:
+                await asyncio.sleep(settings.INGEST_IDLE_SECONDS)
+                continue
+
+            try:
+                await self.run_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ingest: batch {batch.id} failed: {e}")
+
+    async def run_batch(self, batch: IngestBatch) -> None:
+        """Process the pending items of a batch claimed by this runner."""
+        self.batch_id = batch.id
+        self._run_started = time.monotonic()
+        self._run_docs = self._run_chunks = 0
+        try:
+            if batch.prefix is not None and batch.total == 0:
+                keys = [
+                    key
+                    async for key in rag_s3().list_keys(
+                        rag_settings.RAG_BUCKET_NAME, batch.prefix
+                    )
+                    if key.endswith(".json")
+                ]
+                async with AsyncSessionLocal() as db:
+                    batch.total = await add_ingest_items(db, batch.id, keys)
+                    await db.commit()
+
+            async with AsyncSessionLocal() as db:
+                pending = await pending_ingest_keys(db, batch.id)
+            print(
+                f"ingest: batch {batch.id}: {len(pending)} of {batch.total} keys to go"
+            )
+
+            keys_iter = iter(pending)
+            s3_semaphore = asyncio.Semaphore(settings.INGEST_S3_CONCURRENCY)
+            upload_semaphore = asyncio.Semaphore(settings.INGEST_UPLOAD_CONCURRENCY)
+
+            async def worker() -> None:
+                # Общий итератор: каждый ключ достаётся одному воркеру
+                for key in keys_iter:
+                    await self._ingest(batch, key, s3_semaphore, upload_semaphore)
+
+            workers = asyncio.gather(
+                *(
+                    worker()
+                    for _ in range(min(settings.INGEST_CONCURRENCY, len(pending)))
+                )
+            )
+            try:
+                while True:
+                    try:
+                        await asyncio.wait_for(
+                            asyncio.shield(workers), settings.INGEST_REPORT_SECONDS
+                        )
+                        break
+                    except TimeoutError:
+                        await self._heartbeat(batch.id)
+                        self._report(batch)
+            finally:
+                if not workers.done():
+                    workers.cancel()
+                    await asyncio.gather(workers, return_exceptions=True)
+
+            await self._update(
+                batch.id, status=BATCH_DONE, finished_at=func.now(), error=None
+            )
+            self._report(batch, final=True)
+        except BatchLost:
+            print(f"ingest: batch {batch.id} was taken over by another worker")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._update(
+                batch.id, status=BATCH_ERROR, finished_at=func.now(), error=str(e)
+            )
+            raise
+        finally:
+            self.batch_id = None
+
+    async def _ingest(
+        self,
+        batch: IngestBatch,
+        s3_key: str,
+        s3_semaphore: asyncio.Semaphore,
+        upload_semaphore: asyncio.Semaphore,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        upload_name = make_upload_name(s3_key)
+        for attempt in range(1, settings.INGEST_MAX_ATTEMPTS + 1):
+            try:
+                async with s3_semaphore:
+                    raw = await s3_get_bytes(s3_key)
+                jsonl, chunks_count = await loop.run_in_executor(
+                    self._executor(),
+                    chunks_jsonl_from_bytes,
+                    raw,
+                    s3_key,
+                    batch.window_chars,
+                    batch.overlap_chars,
+                )
+                del raw
+                async with upload_semaphore:
+                    file_id = await upload_chunks_jsonl_bytes(
+                        get_client(), jsonl, upload_name
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # Процесс пула упал (например, OOM) — пул пересоздаём
+                    self._shutdown_pool()
+                if attempt < settings.INGEST_MAX_ATTEMPTS and _is_transient(e):
+                    self.retried += 1
+                    delay = settings.INGEST_RETRY_SECONDS * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay * random.uniform(1.0, 1.5))
+                    continue
+                print(f"ingest: {s3_key}: {e}")
+                self.failed += 1
+                await self._finish(batch, s3_key, attempt, error=str(e))
+                return
+
+            await self._finish(
+                batch, s3_key, attempt, chunks_count, file_id, upload_name
+            )
+            self.docs += 1
+            self.chunks += chunks_count
+            self._run_docs += 1
+            self._run_chunks += chunks_count
+            return
+
+    async def _finish(
+        self,
+        batch: IngestBatch,
+        s3_key: str,
+        attempts: int,
+        chunks_count: int | None = None,
+        rag_file_id: str | None = None,
+        upload_name: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        superseded: list[str] = []
+        async with AsyncSessionLocal() as db:
+            if rag_file_id is not None:
+                result = await db.execute(
+                    select(File.rag_file_id)
+                    .where(
+                        File.stem == key_stem(s3_key),
+                        File.rag_file_id.is_not(None),
+                        File.rag_file_id != rag_file_id,
+                    )
+                    .distinct()
+                )
+                # Прежнюю загрузку, по которой уже строились индексы, не
+                # трогаем: они держат её, пока их не пересоберут, а id
+                # остаётся в index_files (по нему их чистит file_gc)
+                for old_id in result.scalars().all():
+                    if old_id is not None and not await rag_file_in_use(db, old_id):
+                        superseded.append(old_id)
+                # Те же поля, что триггер передаёт в PATCH /files/by-key/status
+                await db.execute(
+                    update(File)
+                    .where(File.stem == key_stem(s3_key))
+                    .values(
+                        rag_file_id=rag_file_id,
+                        rag_upload_name=upload_name,
+                        rag_chunks_count=chunks_count,
+                        rag_window_chars=batch.window_chars,
+                        rag_overlap_chars=batch.overlap_chars,
+                        rag_uploaded_at=func.now(),
+                    )
+                )
+            await finish_ingest_item(
+                db, batch.id, s3_key, attempts, chunks_count, rag_file_id, error
+            )
+        if superseded:
+            try:
+                await delete_rag_file(key_stem(s3_key), superseded, memberships=[])
+            except Exception as e:
+                print(f"ingest: superseded {superseded} of {s3_key} not deleted: {e}")
+
+    async def _heartbeat(self, batch_id: int) -> None:
+        async with AsyncSessionLocal() as db:
+            if not await heartbeat_ingest_batch(db, batch_id, self.worker_id):
+                raise BatchLost(batch_id)
+
+    async def _update(self, batch_id: int, **values: object) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IngestBatch)
+                .where(
+                    IngestBatch.id == batch_id,
+                    IngestBatch.locked_by == self.worker_id,
+                )
+                .values(**values)
+            )
+            await db.commit()
+
+    def _rates(self) -> tuple[float, float]:
+        elapsed = max(time.monotonic() - self._run_started, 1e-9)
+        return self._run_docs / elapsed, self._run_chunks / elapsed
+
+    def _report(self, batch: IngestBatch, final: bool = False) -> None:
+        docs_rate, chunks_rate = self._rates()
+        print(
+            f"ingest: batch {batch.id}{' done' if final else ''}: "
+            f"{self._run_docs} docs, {self._run_chunks} chunks in this run, "
+            f"{docs_rate:.2f} docs/s, {chunks_rate:.1f} chunks/s"
+        )
+
+    def stats(self) -> dict[str, int | float | None]:
+        docs_rate, chunks_rate = self._rates() if self.batch_id else (0.0, 0.0)
+        return {
+            "batch_id": self.batch_id,
+            "docs": self.docs,
+            "chunks": self.chunks,
+            "failed": self.failed,
+            "retried": self.retried,
+            "docs_per_second": round(docs_rate, 2),
+            "chunks_per_second": round(chunks_rate, 1),
+        }
+
+
+ingest_runner = IngestRunner()
+
+
+async def _create_batch(
+    keys: list[str] | None, prefix: str | None, window_chars: int, overlap_chars: int
+) -> IngestBatch:
+    """A batch already claimed by ingest_runner, so the server does not take it."""
+    async with AsyncSessionLocal() as db:
+        batch = IngestBatch(
+            prefix=prefix,
+            window_chars=window_chars,
+            overlap_chars=overlap_chars,
+            status=BATCH_RUNNING,
+            locked_by=ingest_runner.worker_id,
+            heartbeat_at=func.now(),
+            started_at=func.now(),
+        )
+        db.add(batch)
+        await db.flush()
+        if keys:
+            await add_ingest_items(db, batch.id, [chunks_source_key(k) for k in keys])
+        await db.commit()
+        await db.refresh(batch)
+        return batch
+
+
+async def _take_over_batch(batch_id: int) -> IngestBatch | None:
+    """Claim a batch to resume it, unless another runner holds a live lease."""
+    lease = timedelta(seconds=settings.INGEST_LEASE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(IngestBatch)
+            .where(
+                IngestBatch.id == batch_id,
+                or_(
+                    IngestBatch.status != BATCH_RUNNING,
+                    IngestBatch.heartbeat_at < func.now() - lease,
+                ),
+            )
+            .values(
+                status=BATCH_RUNNING,
+                locked_by=ingest_runner.worker_id,
+                heartbeat_at=func.now(),
+                finished_at=None,
+            )
+            .returning(IngestBatch)
+        )
+        batch = result.scalar_one_or_none()
+        await db.commit()
+        return batch
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        if args.resume is not None:
+            batch = await _take_over_batch(args.resume)
+            if batch is None:
+                raise SystemExit(f"Batch {args.resume} not found or is running")
+        else:
+            batch = await _create_batch(
+                args.keys, args.prefix, args.window_chars, args.overlap_chars
+            )
+            print(f"ingest: created batch {batch.id}")
+        await ingest_runner.run_batch(batch)
+    finally:
+        ingest_runner._shutdown_pool()
+        await yandex_clients.aclose()
+        await rag_s3_clients.aclose_all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-chunk OCR results from S3 and upload them to Yandex"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--prefix", help="all *.json under this S3 prefix")
+    source.add_argument("--keys", nargs="+", help="OCR JSON names or S3 keys")
+    source.add_argument("--resume", type=int, metavar="BATCH_ID")
+    parser.add_argument("--window-chars", type=int, default=400)
+    parser.add_argument("--overlap-chars", type=int, default=50)
+    args = parser.parse_args()
+    if not 0 <= args.overlap_chars < args.window_chars:
+        parser.error("need 0 <= --overlap-chars < --window-chars")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
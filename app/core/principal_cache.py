@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.db.models.user import User
+from rag.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class _Principal:
+    id: int
+    email: str
+    is_admin: bool
+
+
+class PrincipalCache:
+    """In-process TTL cache of authenticated users and their org roles.
+
+    Saves validate_user / require_org_member their lookups on every
+    request. Role changes invalidate the local entry immediately; other
+    workers see them within PRINCIPAL_CACHE_TTL_SECONDS. Users are only
+    created through the API, so user entries have no invalidation: edits
+    made directly in the database (is_admin, removal) take effect when the
+    entry expires. Only positive answers are cached, so a newly added user
+    or member is never refused.
+    """
+
+    def __init__(self) -> None:
+        self._users: TTLCache[str, _Principal] = TTLCache(
+            settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+        self._roles: TTLCache[tuple[int, int], str] = TTLCache(
+            settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+
+    def get_user(self, email: str) -> User | None:
+        principal = self._users.get(email)
+        if principal is None:
+            return None
+        # Каждому запросу — свой transient-объект, не привязанный к сессии
+        return User(id=principal.id, email=principal.email, is_admin=principal.is_admin)
+
+    def put_user(self, user: User) -> None:
+        self._users.set(user.email, _Principal(user.id, user.email, user.is_admin))
+
+    def get_role(self, user_id: int, org_id: int) -> str | None:
+        return self._roles.get((user_id, org_id))
+
+    def put_role(self, user_id: int, org_id: int, role: str) -> None:
+        self._roles.set((user_id, org_id), role)
+
+    def invalidate_membership(self, user_id: int, org_id: int) -> None:
+        self._roles.pop((user_id, org_id))
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {"users": self._users.stats(), "roles": self._roles.stats()}
+
+
+principal_cache = PrincipalCache()
@@ -1,35 +1,63 @@
 from __future__ import annotations
 
 import uuid
-from typing import TYPE_CHECKING
-
-import boto3
+from collections.abc import Iterable
+from pathlib import Path
 
 from app.core.config import settings
-
-if TYPE_CHECKING:
-    from mypy_boto3_s3 import S3Client
+from rag.s3 import AsyncS3, get_s3
 
 S3_UPLOAD_PREFIX = "incoming"
 PRESIGNED_EXPIRES_IN = 3600
+# Ограничения S3 на multipart: номера частей 1..10000
+MULTIPART_MAX_PARTS = 10_000
+UPLOAD_CONTENT_TYPE = "application/pdf"
+# Результаты OCR-конвейера: result/<kind>/<stem>.<ext>
+S3_RESULT_PREFIXES = (
+    "result/txt-files/",
+    "result/json-files/",
+    "result/pdf-files/",
+)
 
 
-def make_s3_client() -> S3Client:
-    return boto3.client(
-        service_name="s3",
-        endpoint_url=settings.S3_ENDPOINT_URL,
-        aws_access_key_id=settings.S3_ACCESS_KEY,
-        aws_secret_access_key=settings.S3_SECRET_KEY,
+def app_s3() -> AsyncS3:
+    """Async client for the upload bucket (S3_* settings), see rag.s3."""
+    return get_s3(
+        "app",
+        settings.S3_ENDPOINT_URL,
+        settings.S3_ACCESS_KEY,
+        settings.S3_SECRET_KEY,
     )
 
 
-def delete_s3_objects(keys: list[str]) -> None:
-    client = make_s3_client()
-    for key in keys:
-        try:
-            client.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=key)
-        except Exception:
-            pass
+async def delete_s3_objects(keys: list[str]) -> list[str]:
+    """Delete keys with DeleteObjects; returns the keys that were not deleted.
+
+    Missing keys count as deleted. Up to rag.s3.DELETE_BATCH keys per request.
+    """
+    return await app_s3().delete_objects(settings.S3_BUCKET_NAME, keys)
+
+
+def file_s3_keys(system_key: str) -> list[str]:
+    """The uploaded object and everything the OCR pipeline made from it."""
+    stem = Path(system_key).stem
+    return [
+        system_key,
+        f"result/txt-files/{stem}.txt",
+        f"result/json-files/{stem}.json",
+        f"result/pdf-files/{stem}.pdf",
+    ]
+
+
+def s3_url_key(s3_url: str) -> str:
+    """Object key of a files.s3_url."""
+    return s3_url.removeprefix(f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET_NAME}/")
+
+
+def make_upload_key(filename: str) -> str:
+    if not filename or not filename.strip():
+        raise ValueError("filename is required")
+    return f"{S3_UPLOAD_PREFIX}/{uuid.uuid4().hex}_{filename.strip()}"
 
 
 def generate_upload_presigned_url(filename: str) -> tuple[str, str]:
@@ -37,19 +65,60 @@ def generate_upload_presigned_url(filename: str) -> tuple[str, str]:
     Генерирует presigned URL для загрузки файла в S3 (PUT).
     Возвращает (upload_url, s3_key).
     """
-    if not filename or not filename.strip():
-        raise ValueError("filename is required")
-
-    s3_key = f"{S3_UPLOAD_PREFIX}/{uuid.uuid4().hex}_{filename.strip()}"
-    client = make_s3_client()
+    s3_key = make_upload_key(filename)
     # ContentType должен совпадать с заголовком, который шлёт фронт при PUT, иначе 403.
-    url = client.generate_presigned_url(
-        "put_object",
-        Params={
-            "Bucket": settings.S3_BUCKET_NAME,
-            "Key": s3_key,
-            "ContentType": "application/pdf",
-        },
-        ExpiresIn=PRESIGNED_EXPIRES_IN,
+    url = app_s3().presign(
+        "PUT",
+        settings.S3_BUCKET_NAME,
+        s3_key,
+        PRESIGNED_EXPIRES_IN,
+        headers={"Content-Type": UPLOAD_CONTENT_TYPE},
     )
     return url, s3_key
+
+
+async def create_multipart_upload(s3_key: str) -> str:
+    """Start a multipart upload; returns its UploadId."""
+    return await app_s3().create_multipart_upload(
+        settings.S3_BUCKET_NAME, s3_key, UPLOAD_CONTENT_TYPE
+    )
+
+
+def presign_upload_parts(
+    s3_key: str, upload_id: str, part_numbers: Iterable[int]
+) -> list[tuple[int, str]]:
+    """Presigned PUT URLs for parts; signing is local, no requests to S3."""
+    s3 = app_s3()
+    urls = []
+    for n in part_numbers:
+        if not 1 <= n <= MULTIPART_MAX_PARTS:
+            raise ValueError(f"part number must be 1..{MULTIPART_MAX_PARTS}")
+        url = s3.presign(
+            "PUT",
+            settings.S3_BUCKET_NAME,
+            s3_key,
+            PRESIGNED_EXPIRES_IN,
+            params={"partNumber": str(n), "uploadId": upload_id},
+        )
+        urls.append((n, url))
+    return urls
+
+
+async def list_uploaded_parts(
+    s3_key: str, upload_id: str
+) -> list[tuple[int, str, int]]:
+    """(part number, ETag, size) of parts already uploaded — to resume."""
+    return await app_s3().list_parts(settings.S3_BUCKET_NAME, s3_key, upload_id)
+
+
+async def complete_multipart_upload(
+    s3_key: str, upload_id: str, parts: list[tuple[int, str]]
+) -> None:
+    """Assemble the object from (part number, ETag) pairs."""
+    await app_s3().complete_multipart_upload(
+        settings.S3_BUCKET_NAME, s3_key, upload_id, parts
+    )
+
+
+async def abort_multipart_upload(s3_key: str, upload_id: str) -> None:
+    await app_s3().abort_multipart_upload(settings.S3_BUCKET_NAME, s3_key, upload_id)
@@ -0,0 +1,213 @@
+"""Everything /answer needs from Postgres in one round trip, and back in one.
+
+load_answer_context replaces the separate user, membership, index, chat,
+settings and history queries with a single SELECT; persist_turn writes
+the messages and the chat title with one statement (a data-modifying CTE).
+Activity goes through app.core.activity, off the request path.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import and_, func, insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    Chat,
+    MessageRole,
+    OrgIndex,
+    User,
+    UserHistory,
+    UserOrganization,
+    UserSetting,
+)
+
+NEW_CHAT_TITLE = "Новый чат"
+
+
+@dataclass
+class AnswerContext:
+    """Result of load_answer_context; None fields mean "not found/allowed"."""
+
+    user: User
+    role: str | None
+    index: OrgIndex | None
+    chat_title: str | None
+    chat_summary: str | None
+    settings: UserSetting | None
+    history: list[dict[str, Any]] = field(default_factory=list)
+
+
+async def load_answer_context(
+    db: AsyncSession,
+    email: str,
+    org_id: int,
+    index_id: int,
+    chat_id: int,
+    history_window: int,
+    history_cap: int,
+) -> AnswerContext | None:
+    """User by email with membership in org_id, the index (if it belongs to
+    the org), the chat (if it belongs to the user), settings and the chat
+    history. None if no such user.
+
+    With history_window > 0 the history is every message after
+    chats.summary_upto_id: the summary is folded in the background and may
+    lag behind, and the messages it has not reached yet must still go to
+    the prompt. With 0 (no summary) it is the whole chat. Either way at most
+    the last max(history_cap, history_window) messages.
+
+    Returned ORM objects are transient: they are not attached to `db`.
+    """
+    recent = (
+        select(UserHistory.id, UserHistory.role, UserHistory.content)
+        .where(UserHistory.chat_id == chat_id)
+        .order_by(UserHistory.id.desc())
+        .limit(max(history_cap, history_window))
+    )
+    if history_window > 0:
+        summary_upto_id = (
+            select(Chat.summary_upto_id).where(Chat.id == chat_id).scalar_subquery()
+        )
+        recent = recent.where(UserHistory.id > func.coalesce(summary_upto_id, 0))
+    recent_sq = recent.subquery()
+
+    history = select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "role", recent_sq.c.role, "content", recent_sq.c.content
+                    ),
+                    recent_sq.c.id,
+                )
+            ),
+            literal_column("'[]'::json"),
+            type_=JSON,
+        )
+    ).scalar_subquery()
+
+    stmt = (
+        select(
+            User.id,
+            User.email,
+            User.is_admin,
+            UserOrganization.role,
+            OrgIndex.id.label("index_id"),
+            OrgIndex.name.label("index_name"),
+            OrgIndex.vector_store_id,
+            Chat.id.label("chat_id"),
+            Chat.title.label("chat_title"),
+            Chat.summary.label("chat_summary"),
+            UserSetting.id.label("settings_id"),
+            UserSetting.prompt,
+            UserSetting.temperature,
+            UserSetting.count_vector,
+            UserSetting.count_fulltext,
+            history.label("history"),
+        )
+        .select_from(User)
+        .outerjoin(
+            UserOrganization,
+            and_(
+                UserOrganization.user_id == User.id,
+                UserOrganization.org_id == org_id,
+            ),
+        )
+        .outerjoin(OrgIndex, and_(OrgIndex.id == index_id, OrgIndex.org_id == org_id))
+        .outerjoin(Chat, and_(Chat.id == chat_id, Chat.user_id == User.id))
+        .outerjoin(UserSetting, UserSetting.user_id == User.id)
+        .where(User.email == email)
+    )
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        return None
+
+    index = None
+    if row.index_id is not None:
+        index = OrgIndex(
+            id=row.index_id,
+            org_id=org_id,
+            name=row.index_name,
+            vector_store_id=row.vector_store_id,
+        )
+
+    user_settings = None
+    if row.settings_id is not None:
+        user_settings = UserSetting(
+            id=row.settings_id,
+            user_id=row.id,
+            prompt=row.prompt,
+            temperature=row.temperature,
+            count_vector=row.count_vector,
+            count_fulltext=row.count_fulltext,
+        )
+
+    has_chat = row.chat_id is not None
+    return AnswerContext(
+        user=User(id=row.id, email=row.email, is_admin=row.is_admin),
+        role=row.role,
+        index=index,
+        chat_title=row.chat_title if has_chat else None,
+        chat_summary=row.chat_summary if has_chat else None,
+        settings=user_settings,
+        # История относится к чату только если чат принадлежит пользователю
+        history=row.history if has_chat else [],
+    )
+
+
+async def persist_turn(
+    db: AsyncSession,
+    user_id: int,
+    chat_id: int,
+    question: str | None = None,
+    answer: str | None = None,
+    context: str | None = None,
+    title: str | None = None,
+) -> None:
+    """Save the question and/or the answer and, if given, the title of a
+    still untitled chat — in one statement.
+
+    The question gets the smaller id, so it sorts before the answer.
+    """
+    messages = []
+    if question is not None:
+        messages.append(
+            {
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "role": MessageRole.user,
+                "content": question,
+                "context": None,
+            }
+        )
+    if answer is not None:
+        messages.append(
+            {
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "role": MessageRole.assistant,
+                "content": answer,
+                "context": context,
+            }
+        )
+
+    statements: list[Any] = []
+    if messages:
+        statements.append(insert(UserHistory).values(messages))
+    if title is not None:
+        statements.append(
+            update(Chat)
+            .where(Chat.id == chat_id, Chat.title == NEW_CHAT_TITLE)
+            .values(title=title)
+        )
+    if not statements:
+        return
+
+    # Остальные запросы — data-modifying CTE при первом: Postgres выполняет
+    # их все, даже если на них никто не ссылается
+    stmt, *rest = statements
+    for i, extra in enumerate(rest):
+        stmt = stmt.add_cte(extra.cte(f"write_{i}"))
+    await db.execute(stmt)
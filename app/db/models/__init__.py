@@ -7,6 +7,11 @@ from .user_history import UserHistory, MessageRole, save_message
 from .file import File
 from .organization import Organization, UserOrganization
 from .org_index import OrgIndex
+from .answer_cache import AnswerCacheEntry
+from .index_chunk import IndexChunk
+from .index_job import IndexJob
+from .index_file import IndexFile
+from .ingest_batch import IngestBatch, IngestItem
 
 __all__ = [
     "create_user",
@@ -25,4 +30,10 @@ __all__ = [
     "Organization",
     "UserOrganization",
     "OrgIndex",
+    "AnswerCacheEntry",
+    "IndexChunk",
+    "IndexJob",
+    "IndexFile",
+    "IngestBatch",
+    "IngestItem",
 ]
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import DateTime, String, Text, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class AnswerCacheEntry(Base):
+    __tablename__ = "answer_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    vector_store_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    answer: Mapped[str] = mapped_column(Text, nullable=False)
+    context: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+
+
+async def get_cached_answer(db: AsyncSession, key: str) -> tuple[str, str, str] | None:
+    """(vector_store_id, answer, context) of a live entry."""
+    result = await db.execute(
+        select(
+            AnswerCacheEntry.vector_store_id,
+            AnswerCacheEntry.answer,
+            AnswerCacheEntry.context,
+        ).where(
+            AnswerCacheEntry.key == key,
+            AnswerCacheEntry.expires_at > func.now(),
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return row.vector_store_id, row.answer, row.context
+
+
+async def put_cached_answer(
+    db: AsyncSession,
+    key: str,
+    vector_store_id: str,
+    answer: str,
+    context: str,
+    ttl_seconds: int,
+) -> None:
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+    stmt = insert(AnswerCacheEntry).values(
+        key=key,
+        vector_store_id=vector_store_id,
+        answer=answer,
+        context=context,
+        expires_at=expires_at,
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AnswerCacheEntry.key],
+            set_={
+                "answer": stmt.excluded.answer,
+                "context": stmt.excluded.context,
+                "created_at": func.now(),
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+    )
+
+
+async def delete_cached_answers(db: AsyncSession, vector_store_id: str) -> None:
+    await db.execute(
+        delete(AnswerCacheEntry).where(
+            AnswerCacheEntry.vector_store_id == vector_store_id
+        )
+    )
+
+
+async def prune_answer_cache(db: AsyncSession, max_rows: int) -> None:
+    """Drop expired entries and keep at most max_rows of the newest ones."""
+    await db.execute(
+        delete(AnswerCacheEntry).where(AnswerCacheEntry.expires_at <= func.now())
+    )
+    overflow = (
+        select(AnswerCacheEntry.key)
+        .order_by(AnswerCacheEntry.created_at.desc())
+        .offset(max_rows)
+        .scalar_subquery()
+    )
+    await db.execute(delete(AnswerCacheEntry).where(AnswerCacheEntry.key.in_(overflow)))
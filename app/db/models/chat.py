@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -20,6 +20,10 @@ class Chat(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
     )
+    # Краткое содержание сообщений до users_history.id == summary_upto_id
+    # включительно; ведётся в фоне, см. app.core.chat_summary
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+    summary_upto_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     def __repr__(self) -> str:
         return f"<Chat(id={self.id}, user_id={self.user_id}, title={self.title!r})>"
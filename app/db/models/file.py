@@ -1,14 +1,40 @@
+from collections.abc import Iterable, Sequence
 from datetime import datetime
+from pathlib import Path
+from typing import Any
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Row,
+    String,
+    case,
+    cast,
+    column,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.db import Base
 
+# Надгробие: строка остаётся, пока сборщик не удалит объекты S3 и файл в
+# Yandex; FILE_DELETE_FAILED — попытки кончились, нужен разбор вручную
+FILE_DELETING = "deleting"
+FILE_DELETE_FAILED = "delete_failed"
+
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index("ix_files_org_id_content_sha256", "org_id", "content_sha256"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
@@ -20,9 +46,12 @@ class File(Base):
     original_filename: Mapped[str] = mapped_column(String, nullable=False)
     display_name: Mapped[str | None] = mapped_column(String, nullable=True)
     system_key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    # Path(system_key).stem: по нему OCR и триггер загрузки находят файл
+    # (их ключи — result/json-files/{stem}.json и т. п.)
+    stem: Mapped[str] = mapped_column(String, nullable=False, index=True)
     s3_url: Mapped[str] = mapped_column(String, nullable=False)
     status: Mapped[str] = mapped_column(
-        String, nullable=False, default="pending_upload"
+        String, nullable=False, default="pending_upload", index=True
     )
     error_message: Mapped[str | None] = mapped_column(String, nullable=True)
     status_changed_at: Mapped[datetime] = mapped_column(
@@ -31,3 +60,172 @@ class File(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    # Файл чанков в Yandex Files API; заполняет триггер загрузки вместе со
+    # статусом indexed. У файлов, загруженных раньше, пусто
+    rag_file_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    rag_upload_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    rag_chunks_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rag_uploaded_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Параметры нарезки этого файла чанков: с ними полнотекстовая часть
+    # индекса режет тот же текст (app/core/fulltext.py). None — значения
+    # по умолчанию rag.upload_file
+    rag_window_chars: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rag_overlap_chars: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # UploadId незавершённой multipart-загрузки; None — загрузка одним PUT
+    # или уже собрана
+    multipart_upload_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Неудачные попытки сборщика удалить файл (см. app/core/file_gc.py)
+    delete_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # SHA-256 (hex) и размер содержимого, посчитанные клиентом до загрузки;
+    # по ним upload-link находит уже распознанную копию
+    content_sha256: Mapped[str | None] = mapped_column(String, nullable=True)
+    content_size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Копия без своей загрузки: stem, s3_url и rag_* взяты у этого файла, и
+    # результаты OCR в S3 и файл чанков в Yandex у них общие (см. file_gc)
+    duplicate_of_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("files.id", ondelete="SET NULL"), nullable=True
+    )
+
+
+def key_stem(key: str) -> str:
+    """File.stem for an upload key or any key derived from it by OCR."""
+    return Path(key).stem
+
+
+async def find_indexed_copy(
+    db: AsyncSession, org_id: int, content_sha256: str, content_size: int | None
+) -> File | None:
+    """The org's oldest indexed file with this content, if any."""
+    query = select(File).where(
+        File.org_id == org_id,
+        File.content_sha256 == content_sha256,
+        File.status == "indexed",
+    )
+    if content_size is not None:
+        query = query.where(File.content_size == content_size)
+    result = await db.execute(query.order_by(File.id).limit(1))
+    return result.scalar_one_or_none()
+
+
+async def live_stems(
+    db: AsyncSession, stems: Iterable[str], exclude_ids: Iterable[int]
+) -> set[str]:
+    """Stems still used by files outside `exclude_ids` that are not deleted.
+
+    A copy (duplicate_of_id) shares its stem, and so the OCR results and
+    the chunks file, with the original; they may only be removed with the
+    last live row.
+    """
+    result = await db.execute(
+        select(File.stem)
+        .where(
+            File.stem.in_(list(stems)),
+            File.id.not_in(list(exclude_ids)),
+            File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
+        )
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+
+async def tombstone_files(
+    db: AsyncSession, file_ids: Iterable[int], org_id: int | None
+) -> list[File]:
+    """Mark the org's files as deleting; the garbage collector removes them.
+
+    org_id None — ownership was checked by the caller; this also covers
+    files without an org. Returns the files that were marked now (not
+    already being deleted).
+    """
+    query = update(File).where(
+        File.id.in_(list(file_ids)), File.status != FILE_DELETING
+    )
+    if org_id is not None:
+        query = query.where(File.org_id == org_id)
+    result = await db.execute(
+        query.values(
+            status=FILE_DELETING,
+            error_message=None,
+            delete_attempts=0,
+            status_changed_at=func.now(),
+        ).returning(File)
+    )
+    return list(result.scalars().all())
+
+
+async def update_statuses_by_key(
+    db: AsyncSession, updates: Sequence[dict[str, Any]]
+) -> Sequence[Row[int, int, str, str, str | None]]:
+    """Apply service status callbacks to many files in one UPDATE.
+
+    Each update has `system_key`, `status`, `error_message` and optionally
+    the rag_* fields of ServiceStatusUpdate; files are matched by stem, as
+    the callbacks come with keys derived from the upload key. rag_* are
+    only overwritten where rag_file_id is given. For a stem given twice
+    the last update wins. Files being deleted are not touched. Returns
+    (id, user_id, stem, status, error_message) of the updated files.
+    """
+    by_stem = {key_stem(u["system_key"]): u for u in updates}
+    v = values(
+        column("stem", String),
+        column("status", String),
+        column("error_message", String),
+        column("rag_file_id", String),
+        column("rag_upload_name", String),
+        column("rag_chunks_count", Integer),
+        column("rag_window_chars", Integer),
+        column("rag_overlap_chars", Integer),
+        name="v",
+    ).data(
+        [
+            (
+                stem,
+                u["status"],
+                u.get("error_message"),
+                u.get("rag_file_id"),
+                u.get("rag_upload_name"),
+                u.get("rag_chunks_count"),
+                u.get("rag_window_chars"),
+                u.get("rag_overlap_chars"),
+            )
+            for stem, u in by_stem.items()
+        ]
+    )
+    has_rag = v.c.rag_file_id.is_not(None)
+    result = await db.execute(
+        update(File)
+        .where(
+            File.stem == v.c.stem,
+            # Иначе колбэк после DELETE снял бы надгробие (см. file_gc)
+            File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
+        )
+        .values(
+            status=v.c.status,
+            error_message=v.c.error_message,
+            status_changed_at=func.now(),
+            rag_file_id=case((has_rag, v.c.rag_file_id), else_=File.rag_file_id),
+            rag_upload_name=case(
+                (has_rag, v.c.rag_upload_name), else_=File.rag_upload_name
+            ),
+            # Столбец из одних NULL Postgres типизирует как text
+            rag_chunks_count=case(
+                (has_rag, cast(v.c.rag_chunks_count, Integer)),
+                else_=File.rag_chunks_count,
+            ),
+            rag_window_chars=case(
+                (has_rag, cast(v.c.rag_window_chars, Integer)),
+                else_=File.rag_window_chars,
+            ),
+            rag_overlap_chars=case(
+                (has_rag, cast(v.c.rag_overlap_chars, Integer)),
+                else_=File.rag_overlap_chars,
+            ),
+            rag_uploaded_at=case((has_rag, func.now()), else_=File.rag_uploaded_at),
+        )
+        .returning(File.id, File.user_id, File.stem, File.status, File.error_message)
+    )
+    return result.all()
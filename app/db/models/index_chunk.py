@@ -0,0 +1,122 @@
+import re
+from collections.abc import Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    delete,
+    exists,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.db.models.file import FILE_DELETE_FAILED, FILE_DELETING, File, live_stems
+from app.db.models.index_file import IndexFile
+from app.db.models.org_index import OrgIndex
+
+_FTS_CONFIG = "russian"
+_TERM_RE = re.compile(r"[^\W_]+")
+
+
+class IndexChunk(Base):
+    """Chunk text of an index, searchable with Postgres full-text search."""
+
+    __tablename__ = "index_chunks"
+    __table_args__ = (Index("ix_index_chunks_tsv", "tsv", postgresql_using="gin"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    index_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("indexes.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(f"to_tsvector('{_FTS_CONFIG}', body)", persisted=True)
+    )
+
+
+async def add_index_chunks(
+    db: AsyncSession, index_id: int, filename: str, bodies: list[str]
+) -> None:
+    if not bodies:
+        return
+    db.add_all(IndexChunk(index_id=index_id, filename=filename, body=b) for b in bodies)
+    await db.flush()
+
+
+async def delete_file_chunks(db: AsyncSession, files: Sequence[File]) -> None:
+    """Drop the full-text chunks of files being deleted from their indexes.
+
+    Chunks are per stem, and a copy (duplicate_of_id) shares the stem with
+    the original: an index keeps them while a live file with the stem is
+    its member. Indexes that predate index_files are cleared unless the
+    stem is still live in the org.
+    """
+    file_ids = [f.id for f in files]
+    live = await live_stems(db, {f.stem for f in files}, file_ids)
+    for f in files:
+        live_members = (
+            select(IndexFile.index_id)
+            .join(File, File.id == IndexFile.file_id)
+            .where(
+                File.stem == f.stem,
+                File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
+            )
+        )
+        in_indexes: ColumnElement[bool] = IndexChunk.index_id.in_(
+            select(IndexFile.index_id).where(IndexFile.file_id == f.id)
+        )
+        if f.stem not in live and f.org_id is not None:
+            in_indexes = or_(
+                in_indexes,
+                IndexChunk.index_id.in_(
+                    select(OrgIndex.id).where(
+                        OrgIndex.org_id == f.org_id,
+                        ~exists().where(IndexFile.index_id == OrgIndex.id),
+                    )
+                ),
+            )
+        await db.execute(
+            delete(IndexChunk).where(
+                IndexChunk.filename == f"{f.stem}.chunks.jsonl",
+                in_indexes,
+                IndexChunk.index_id.not_in(live_members),
+            )
+        )
+
+
+async def search_index_chunks(
+    db: AsyncSession, index_id: int, query: str, limit: int
+) -> list[tuple[str, str, float]]:
+    """Full-text search over the chunks of one index.
+
+    Terms of the query are OR-ed, so a natural-language question still
+    matches chunks containing only some of its words; ts_rank_cd orders
+    chunks with more (and closer) matching terms first.
+    """
+    terms = _TERM_RE.findall(query)
+    if not terms or limit <= 0:
+        return []
+
+    tsquery = func.to_tsquery(_FTS_CONFIG, " | ".join(terms))
+    rank = func.ts_rank_cd(IndexChunk.tsv, tsquery)
+    result = await db.execute(
+        select(IndexChunk.filename, IndexChunk.body, rank.label("rank"))
+        .where(IndexChunk.index_id == index_id, IndexChunk.tsv.op("@@")(tsquery))
+        .order_by(rank.desc())
+        .limit(limit)
+    )
+    return [(row.filename, row.body, float(row.rank)) for row in result.all()]
@@ -0,0 +1,85 @@
+from collections.abc import Iterable
+
+from sqlalchemy import ForeignKey, Integer, String, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+from app.db.models.file import FILE_DELETE_FAILED, FILE_DELETING, File
+from app.db.models.org_index import OrgIndex
+
+
+class IndexFile(Base):
+    """Which files an index was built from; filled by the index job worker.
+
+    rag_file_id is the Yandex file id the store got for the file (None for
+    local indexes). Indexes built before this table have no rows at all.
+    """
+
+    __tablename__ = "index_files"
+
+    index_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("indexes.id", ondelete="CASCADE"), primary_key=True
+    )
+    file_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("files.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    rag_file_id: Mapped[str | None] = mapped_column(String, nullable=True)
+
+
+async def get_file_stores(
+    db: AsyncSession, file_id: int, org_id: int | None, untracked: bool = True
+) -> list[tuple[str, str | None]]:
+    """(vector store, Yandex file id) pairs that may hold the file.
+
+    Pairs come from index_files, each with the id the store actually got:
+    after a re-ingest older indexes still hold the previous upload. If
+    `untracked`, the org's indexes that predate the table are added with
+    id None (they have no rows, so any of them may hold the file, under
+    an unknown id).
+    """
+    tracked = await db.execute(
+        select(OrgIndex.vector_store_id, IndexFile.rag_file_id)
+        .join(IndexFile, IndexFile.index_id == OrgIndex.id)
+        .where(IndexFile.file_id == file_id)
+    )
+    pairs: list[tuple[str, str | None]] = [(vs, rid) for vs, rid in tracked.all()]
+
+    if untracked and org_id is not None:
+        untracked_stores = await db.execute(
+            select(OrgIndex.vector_store_id).where(
+                OrgIndex.org_id == org_id,
+                ~exists().where(IndexFile.index_id == OrgIndex.id),
+            )
+        )
+        pairs.extend((vs, None) for vs in untracked_stores.scalars().all())
+
+    return list(dict.fromkeys(pairs))
+
+
+async def rag_file_in_use(db: AsyncSession, rag_file_id: str) -> bool:
+    """Whether some index was built with this Yandex file id."""
+    in_use = await db.scalar(
+        select(exists().where(IndexFile.rag_file_id == rag_file_id))
+    )
+    return bool(in_use)
+
+
+async def get_stem_stores(
+    db: AsyncSession, stem: str, exclude_ids: Iterable[int]
+) -> set[str]:
+    """Stores recorded for live files with this stem outside `exclude_ids`."""
+    result = await db.execute(
+        select(OrgIndex.vector_store_id)
+        .join(IndexFile, IndexFile.index_id == OrgIndex.id)
+        .join(File, File.id == IndexFile.file_id)
+        .where(
+            File.stem == stem,
+            File.id.not_in(list(exclude_ids)),
+            File.status.not_in((FILE_DELETING, FILE_DELETE_FAILED)),
+        )
+    )
+    return set(result.scalars().all())
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    JSON,
+    ColumnElement,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+# queued → building → done | error
+JOB_QUEUED = "queued"
+JOB_BUILDING = "building"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+
+class IndexJob(Base):
+    """Index build request, processed by app.core.index_jobs workers.
+
+    A building job holds a lease: the worker refreshes heartbeat_at while
+    it polls the vector store. A job whose lease has expired (the worker
+    died) is claimed again and resumes from vector_store_id if the store
+    was already created.
+    """
+
+    __tablename__ = "index_jobs"
+    __table_args__ = (Index("ix_index_jobs_org_id_status", "org_id", "status"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    org_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    file_ids: Mapped[list[int]] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(
+        String, nullable=False, default=JOB_QUEUED, index=True
+    )
+    vector_store_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    index_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("indexes.id", ondelete="SET NULL"), nullable=True
+    )
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    locked_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
+def _lease_alive(lease: timedelta) -> ColumnElement[bool]:
+    return IndexJob.heartbeat_at >= func.now() - lease
+
+
+async def claim_index_job(
+    db: AsyncSession, worker_id: str, lease: timedelta, per_org_limit: int
+) -> IndexJob | None:
+    """Take the oldest runnable job: queued, or building with an expired lease.
+
+    Rows are picked with FOR UPDATE SKIP LOCKED, so concurrent workers
+    never get the same job. The per-org limit is checked under an advisory
+    lock on the org, so two workers cannot both start the org's last slot.
+    Commits on success.
+    """
+    skipped: list[int] = []
+    while True:
+        result = await db.execute(
+            select(IndexJob)
+            .where(
+                (IndexJob.status == JOB_QUEUED)
+                | ((IndexJob.status == JOB_BUILDING) & ~_lease_alive(lease)),
+                IndexJob.id.not_in(skipped),
+            )
+            .order_by(IndexJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            await db.rollback()
+            return None
+
+        await db.execute(
+            select(
+                func.pg_advisory_xact_lock(text("hashtext('index_jobs')"), job.org_id)
+            )
+        )
+        running = await db.scalar(
+            select(func.count())
+            .select_from(IndexJob)
+            .where(
+                IndexJob.org_id == job.org_id,
+                IndexJob.status == JOB_BUILDING,
+                IndexJob.id != job.id,
+                _lease_alive(lease),
+            )
+        )
+        if running is not None and running >= per_org_limit:
+            # У организации нет свободного слота — смотрим следующую задачу
+            skipped.append(job.id)
+            continue
+
+        job.status = JOB_BUILDING
+        job.locked_by = worker_id
+        job.heartbeat_at = func.now()
+        job.attempts += 1
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+
+async def heartbeat_index_job(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """Extend the lease; False if the job was taken over by another worker."""
+    result = await db.execute(
+        update(IndexJob)
+        .where(IndexJob.id == job_id, IndexJob.locked_by == worker_id)
+        .values(heartbeat_at=func.now())
+    )
+    await db.commit()
+    return bool(result.rowcount)  # type: ignore[attr-defined]
+
+
+async def update_index_job(
+    db: AsyncSession, job_id: int, worker_id: str, **values: object
+) -> None:
+    await db.execute(
+        update(IndexJob)
+        .where(IndexJob.id == job_id, IndexJob.locked_by == worker_id)
+        .values(**values)
+    )
+    await db.commit()
+
+
+async def org_has_active_index_jobs(db: AsyncSession, org_id: int) -> bool:
+    result = await db.execute(
+        select(IndexJob.id)
+        .where(
+            IndexJob.org_id == org_id,
+            IndexJob.status.in_((JOB_QUEUED, JOB_BUILDING)),
+        )
+        .limit(1)
+    )
+    return result.first() is not None
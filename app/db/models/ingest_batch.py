@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+# queued → running → done | error
+BATCH_QUEUED = "queued"
+BATCH_RUNNING = "running"
+BATCH_DONE = "done"
+BATCH_ERROR = "error"
+
+# pending → done | error
+ITEM_PENDING = "pending"
+ITEM_DONE = "done"
+ITEM_ERROR = "error"
+
+
+class IngestBatch(Base):
+    """Re-ingestion of many OCR results, run by app.core.ingest.
+
+    The keys to process are ingest_items rows: listed once from `prefix`
+    or given explicitly. An item is marked done as soon as its chunks are
+    uploaded, so a batch taken over after a restart (its lease expired)
+    continues with the pending items only. Counters are kept on the batch
+    for progress and throughput reports.
+    """
+
+    __tablename__ = "ingest_batches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # None — запущен из командной строки
+    user_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    prefix: Mapped[str | None] = mapped_column(String, nullable=True)
+    window_chars: Mapped[int] = mapped_column(Integer, nullable=False)
+    overlap_chars: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(
+        String, nullable=False, default=BATCH_QUEUED, index=True
+    )
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    locked_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
+class IngestItem(Base):
+    __tablename__ = "ingest_items"
+    __table_args__ = (
+        UniqueConstraint("batch_id", "s3_key", name="uq_ingest_items_batch_id_s3_key"),
+        Index("ix_ingest_items_batch_id_status", "batch_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    batch_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("ingest_batches.id", ondelete="CASCADE"), nullable=False
+    )
+    s3_key: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default=ITEM_PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rag_file_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    chunks_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
+async def claim_ingest_batch(
+    db: AsyncSession, worker_id: str, lease: timedelta
+) -> IngestBatch | None:
+    """Take the oldest queued batch, or a running one whose lease expired.
+
+    FOR UPDATE SKIP LOCKED, as in claim_index_job. Commits on success.
+    """
+    result = await db.execute(
+        select(IngestBatch)
+        .where(
+            (IngestBatch.status == BATCH_QUEUED)
+            | (
+                (IngestBatch.status == BATCH_RUNNING)
+                & (IngestBatch.heartbeat_at < func.now() - lease)
+            )
+        )
+        .order_by(IngestBatch.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    batch = result.scalar_one_or_none()
+    if batch is None:
+        await db.rollback()
+        return None
+
+    batch.status = BATCH_RUNNING
+    batch.locked_by = worker_id
+    batch.heartbeat_at = func.now()
+    if batch.started_at is None:
+        batch.started_at = func.now()
+    await db.commit()
+    await db.refresh(batch)
+    return batch
+
+
+async def heartbeat_ingest_batch(
+    db: AsyncSession, batch_id: int, worker_id: str
+) -> bool:
+    """Extend the lease; False if the batch was taken over by another worker."""
+    result = await db.execute(
+        update(IngestBatch)
+        .where(IngestBatch.id == batch_id, IngestBatch.locked_by == worker_id)
+        .values(heartbeat_at=func.now())
+    )
+    await db.commit()
+    return bool(result.rowcount)  # type: ignore[attr-defined]
+
+
+async def add_ingest_items(db: AsyncSession, batch_id: int, keys: list[str]) -> int:
+    """Add keys to the batch (repeats are ignored) and update its total."""
+    if keys:
+        await db.execute(
+            insert(IngestItem)
+            .values([{"batch_id": batch_id, "s3_key": key} for key in keys])
+            .on_conflict_do_nothing(
+                index_elements=[IngestItem.batch_id, IngestItem.s3_key]
+            )
+        )
+    total = await db.scalar(
+        select(func.count())
+        .select_from(IngestItem)
+        .where(IngestItem.batch_id == batch_id)
+    )
+    await db.execute(
+        update(IngestBatch).where(IngestBatch.id == batch_id).values(total=total)
+    )
+    return total or 0
+
+
+async def pending_ingest_keys(db: AsyncSession, batch_id: int) -> list[str]:
+    result = await db.execute(
+        select(IngestItem.s3_key)
+        .where(IngestItem.batch_id == batch_id, IngestItem.status == ITEM_PENDING)
+        .order_by(IngestItem.id)
+    )
+    return list(result.scalars().all())
+
+
+async def finish_ingest_item(
+    db: AsyncSession,
+    batch_id: int,
+    s3_key: str,
+    attempts: int,
+    chunks_count: int | None = None,
+    rag_file_id: str | None = None,
+    error: str | None = None,
+) -> None:
+    """Mark the item done (or failed, if `error`) and count it on the batch.
+
+    Only a pending item is counted, so a duplicate finish cannot inflate
+    the counters.
+    """
+    result = await db.execute(
+        update(IngestItem)
+        .where(
+            IngestItem.batch_id == batch_id,
+            IngestItem.s3_key == s3_key,
+            IngestItem.status == ITEM_PENDING,
+        )
+        .values(
+            status=ITEM_ERROR if error else ITEM_DONE,
+            attempts=attempts,
+            chunks_count=chunks_count,
+            rag_file_id=rag_file_id,
+            error=error,
+        )
+    )
+    if result.rowcount:  # type: ignore[attr-defined]
+        counters = (
+            {"failed": IngestBatch.failed + 1}
+            if error
+            else {
+                "done": IngestBatch.done + 1,
+                "chunks": IngestBatch.chunks + (chunks_count or 0),
+            }
+        )
+        await db.execute(
+            update(IngestBatch).where(IngestBatch.id == batch_id).values(**counters)
+        )
+    await db.commit()
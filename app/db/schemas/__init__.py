@@ -1,11 +1,23 @@
 from .index import (
+    CompletedPart,
     FilesResponse,
+    IndexJobRecord,
     IndexRecord,
     IndexesResponse,
     IndexRequest,
+    MultipartCompleteRequest,
+    MultipartPartsRequest,
+    MultipartPartsResponse,
+    MultipartUploadRequest,
+    MultipartUploadResponse,
     RagFileRecord,
+    UploadedPart,
+    UploadedPartsResponse,
     UploadLinkRequest,
     UploadLinkResponse,
+    UploadLinksRequest,
+    UploadLinksResponse,
+    UploadPartUrl,
 )
 from .organizations import (
     AddMemberRequest,
@@ -28,7 +40,15 @@ from .review import Review
 from .settings import SettingModel
 from .tokens import Token
 from .user import UserCreate, UserGet
-from .files import FileRecord, FileListResponse, StatusUpdate, ServiceStatusUpdate
+from .ingest import IngestBatchRecord, IngestBatchRequest
+from .files import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    FileRecord,
+    FileListResponse,
+    StatusUpdate,
+    ServiceStatusUpdate,
+)
 
 __all__ = [
     "AnswerResponse",
@@ -40,11 +60,23 @@ __all__ = [
     "Review",
     "FilesResponse",
     "RagFileRecord",
+    "IndexJobRecord",
     "IndexRecord",
     "IndexesResponse",
     "IndexRequest",
     "UploadLinkRequest",
     "UploadLinkResponse",
+    "CompletedPart",
+    "MultipartCompleteRequest",
+    "MultipartPartsRequest",
+    "MultipartPartsResponse",
+    "MultipartUploadRequest",
+    "MultipartUploadResponse",
+    "UploadedPart",
+    "UploadedPartsResponse",
+    "UploadLinksRequest",
+    "UploadLinksResponse",
+    "UploadPartUrl",
     "SettingModel",
     "HistoryMessage",
     "HistoryResponse",
@@ -54,6 +86,10 @@ __all__ = [
     "FileListResponse",
     "StatusUpdate",
     "ServiceStatusUpdate",
+    "BulkDeleteRequest",
+    "BulkDeleteResponse",
+    "IngestBatchRecord",
+    "IngestBatchRequest",
     "OrgInfo",
     "OrganizationsResponse",
     "MemberInfo",
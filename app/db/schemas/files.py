@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class FileRecord(BaseModel):
@@ -13,6 +13,8 @@ class FileRecord(BaseModel):
     error_message: str | None
     status_changed_at: datetime
     created_at: datetime
+    # Файл загружен повторно и делит артефакты с этим файлом
+    duplicate_of_id: int | None = None
 
     class Config:
         from_attributes = True
@@ -31,3 +33,29 @@ class ServiceStatusUpdate(BaseModel):
     system_key: str
     status: str
     error_message: str | None = None
+    # Результат rag.upload_file.upload_file, передаётся вместе с indexed
+    rag_file_id: str | None = None
+    rag_upload_name: str | None = None
+    rag_chunks_count: int | None = None
+    # Параметры нарезки, с которыми он получен
+    rag_window_chars: int | None = None
+    rag_overlap_chars: int | None = None
+
+
+class ServiceStatusBatchUpdate(BaseModel):
+    updates: list[ServiceStatusUpdate] = Field(min_length=1, max_length=1000)
+
+
+class ServiceStatusBatchResponse(BaseModel):
+    updated: int
+    # Ключи, для которых не нашлось файла (или он удаляется)
+    not_found: list[str]
+
+
+class BulkDeleteRequest(BaseModel):
+    file_ids: list[int]
+
+
+class BulkDeleteResponse(BaseModel):
+    # Файлы, помеченные на удаление этим запросом
+    file_ids: list[int]
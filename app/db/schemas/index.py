@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RagFileRecord(BaseModel):
@@ -29,12 +29,85 @@ class IndexRequest(BaseModel):
     file_ids: list[int]
 
 
+class IndexJobRecord(BaseModel):
+    id: int
+    name: str
+    status: str
+    index_id: int | None
+    error: str | None
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class UploadLinkRequest(BaseModel):
     filename: str
+    # Посчитанные клиентом SHA-256 (hex) и размер файла: если в организации
+    # уже есть распознанный файл с тем же содержимым, загрузка не нужна
+    sha256: str | None = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+    size: int | None = Field(default=None, ge=0)
 
 
 class UploadLinkResponse(BaseModel):
-    upload_url: str
+    # None — содержимое уже есть (duplicate_of_id), загружать не нужно
+    upload_url: str | None
     s3_key: str
     file_id: int
     expires_in: int
+    duplicate_of_id: int | None = None
+
+
+class UploadLinksRequest(BaseModel):
+    filenames: list[str] = Field(min_length=1, max_length=500)
+
+
+class UploadLinksResponse(BaseModel):
+    links: list[UploadLinkResponse]
+
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+
+class MultipartUploadRequest(BaseModel):
+    filename: str
+    parts: int = Field(ge=1, le=10_000)
+
+
+class MultipartUploadResponse(BaseModel):
+    file_id: int
+    s3_key: str
+    upload_id: str
+    parts: list[UploadPartUrl]
+    expires_in: int
+
+
+class MultipartPartsRequest(BaseModel):
+    part_numbers: list[int] = Field(min_length=1, max_length=10_000)
+
+
+class MultipartPartsResponse(BaseModel):
+    parts: list[UploadPartUrl]
+    expires_in: int
+
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+    size: int
+
+
+class UploadedPartsResponse(BaseModel):
+    parts: list[UploadedPart]
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class MultipartCompleteRequest(BaseModel):
+    parts: list[CompletedPart] = Field(min_length=1, max_length=10_000)
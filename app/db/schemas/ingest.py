@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class IngestBatchRequest(BaseModel):
+    # Либо префикс в бакете RAG, либо список ключей (или имён OCR JSON)
+    prefix: str | None = None
+    keys: list[str] | None = Field(default=None, min_length=1)
+    window_chars: int = Field(default=400, gt=0)
+    overlap_chars: int = Field(default=50, ge=0)
+
+    @model_validator(mode="after")
+    def check(self) -> "IngestBatchRequest":
+        if (self.prefix is None) == (self.keys is None):
+            raise ValueError("Pass either prefix or keys")
+        if self.overlap_chars >= self.window_chars:
+            raise ValueError("overlap_chars must be less than window_chars")
+        return self
+
+
+class IngestBatchRecord(BaseModel):
+    id: int
+    status: str
+    prefix: str | None
+    window_chars: int
+    overlap_chars: int
+    total: int
+    done: int
+    failed: int
+    chunks: int
+    error: str | None
+    started_at: datetime | None
+    finished_at: datetime | None
+    created_at: datetime
+    updated_at: datetime
+
+    # Считаются по started_at и счётчикам, в БД не хранятся
+    docs_per_second: float | None = None
+    chunks_per_second: float | None = None
+
+    model_config = {"from_attributes": True}
+
+    @model_validator(mode="after")
+    def rates(self) -> "IngestBatchRecord":
+        # От первого запуска до конца (или последнего обновления счётчиков)
+        if self.started_at is not None:
+            end = self.finished_at or self.updated_at
+            elapsed = (end - self.started_at).total_seconds()
+            if elapsed > 0:
+                self.docs_per_second = round(self.done / elapsed, 2)
+                self.chunks_per_second = round(self.chunks / elapsed, 1)
+        return self
@@ -1,9 +1,37 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import v1_router
+from app.core.activity import activity_sink
+from app.core.file_gc import file_gc
+from app.core.index_jobs import index_job_worker
+from app.core.ingest import ingest_runner
+from rag import s3 as rag_s3
+from rag.clients import registry as yandex_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await yandex_clients.startup()
+    activity_sink.start()
+    index_job_worker.start()
+    file_gc.start()
+    ingest_runner.start()
+    try:
+        yield
+    finally:
+        await ingest_runner.stop()
+        await file_gc.stop()
+        await index_job_worker.stop()
+        await activity_sink.stop()
+        await yandex_clients.aclose()
+        await rag_s3.aclose_all()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
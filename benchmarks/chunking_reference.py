@@ -0,0 +1,95 @@
+"""The chunker as it was before page offsets, kept as the reference.
+
+chunk_text_window_overlap here re-finds `[PAGE n]` markers with a regex,
+scans all of them for every window and regex-strips each fragment — the
+benchmarks compare rag.upload_file against it, output and speed.
+"""
+
+import re
+from typing import List, Tuple
+
+from rag.config import settings
+
+
+def _extract_page_markers_with_pos(text: str) -> List[Tuple[int, int]]:
+    markers: List[Tuple[int, int]] = []
+    for m in settings.RAG_PAGE_MARK_RE.finditer(text):
+        markers.append((m.start(), int(m.group(1))))
+    return markers
+
+
+def _pages_for_slice(markers: List[Tuple[int, int]], start: int, end: int) -> List[int]:
+    pages_in: List[int] = []
+    seen = set()
+
+    for pos, page in markers:
+        if start <= pos < end:
+            if page not in seen:
+                seen.add(page)
+                pages_in.append(page)
+
+    if pages_in:
+        return pages_in
+
+    last_page = None
+    for pos, page in markers:
+        if pos < start:
+            last_page = page
+        else:
+            break
+
+    return [last_page] if last_page is not None else []
+
+
+def _pages_header(pages: List[int]) -> str:
+    if not pages:
+        return "PAGES: unknown"
+    if len(pages) == 1:
+        return f"PAGES: {pages[0]}"
+    return f"PAGES: {pages[0]}-{pages[-1]}"
+
+
+def _strip_page_markers(fragment: str) -> str:
+    cleaned = settings.RAG_PAGE_MARK_REMOVE_RE.sub("\n", fragment)
+    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    return cleaned.strip()
+
+
+def chunk_text_window_overlap(
+    marked_text: str,
+    window_chars: int,
+    overlap_chars: int,
+) -> List[dict[str, str]]:
+    window_chars = min(window_chars, settings.RAG_MAX_CHUNK_LEN)
+    step = window_chars - overlap_chars
+
+    markers = _extract_page_markers_with_pos(marked_text)
+
+    chunks: List[dict[str, str]] = []
+    n = len(marked_text)
+    start = 0
+
+    while start < n:
+        end = min(start + window_chars, n)
+
+        raw_fragment = marked_text[start:end]
+        cleaned_fragment = _strip_page_markers(raw_fragment)
+
+        if cleaned_fragment:
+            pages = _pages_for_slice(markers, start, end)
+            header = _pages_header(pages)
+
+            body = f"{header}\n{cleaned_fragment}".strip()
+
+            if len(body) > settings.RAG_MAX_CHUNK_LEN:
+                allowed = settings.RAG_MAX_CHUNK_LEN - len(header) - 1
+                trimmed = cleaned_fragment[: max(0, allowed)].rstrip()
+                body = f"{header}\n{trimmed}".strip()
+
+            chunks.append({"body": body})
+
+        if end == n:
+            break
+        start += step
+
+    return chunks
@@ -0,0 +1,81 @@
+"""Chunking speed on synthetic OCR documents of growing size.
+
+    pytest benchmarks --benchmark-group-by=param:pages
+
+Each size runs the offset chunker (rag.upload_file.chunk_pages) and the
+old marker-rescanning one (chunking_reference). test_matches_reference
+checks they agree and runs without pytest-benchmark as well.
+"""
+
+import importlib.util
+import json
+import random
+from typing import Any
+
+import pytest
+
+from rag.upload_file import (
+    build_marked_text,
+    chunk_pages,
+    parse_pages_from_bytes,
+)
+
+from .chunking_reference import chunk_text_window_overlap as reference_chunker
+
+SIZES = [10, 200, 2000]
+WINDOW_CHARS = 400
+OVERLAP_CHARS = 50
+needs_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None,
+    reason="pytest-benchmark is not installed",
+)
+
+_WORDS = (
+    "опись книга лист дело фонд Петергоф дворец парк фонтан инвентарь "
+    "предмет бронза мрамор картина рама зал каталог номер хранение"
+).split()
+
+
+def synthetic_ocr(pages: int, seed: int = 0) -> bytes:
+    """OCR JSON like the pipeline writes: several text blocks per page."""
+    rnd = random.Random(seed)
+    data = []
+    for page in range(1, pages + 1):
+        for _ in range(rnd.randint(1, 4)):
+            lines = [
+                " ".join(rnd.choices(_WORDS, k=rnd.randint(3, 12)))
+                for _ in range(rnd.randint(2, 10))
+            ]
+            data.append({"page": page, "text": "\n".join(lines)})
+    return json.dumps({"data": data}, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda n: f"pages={n}")
+def pages(request: pytest.FixtureRequest) -> list[dict]:
+    return parse_pages_from_bytes(synthetic_ocr(request.param), "synthetic.json")
+
+
+def test_matches_reference(pages: list[dict]) -> None:
+    assert chunk_pages(pages, WINDOW_CHARS, OVERLAP_CHARS) == reference_chunker(
+        build_marked_text(pages), WINDOW_CHARS, OVERLAP_CHARS
+    )
+
+
+@needs_benchmark
+def test_chunk_pages(benchmark: Any, pages: list[dict]) -> None:
+    benchmark(chunk_pages, pages, WINDOW_CHARS, OVERLAP_CHARS)
+
+
+@needs_benchmark
+def test_reference_chunker(benchmark: Any, pages: list[dict]) -> None:
+    if len(pages) > 200:
+        # Квадратичный: на больших документах считаем один раунд
+        benchmark.pedantic(
+            reference_chunker,
+            args=(build_marked_text(pages), WINDOW_CHARS, OVERLAP_CHARS),
+            rounds=1,
+        )
+    else:
+        benchmark(
+            reference_chunker, build_marked_text(pages), WINDOW_CHARS, OVERLAP_CHARS
+        )
@@ -0,0 +1,95 @@
+"""Cold start of the upload trigger (rag.trigger).
+
+    pytest benchmarks/test_trigger_coldstart.py -s
+
+Every run is a fresh interpreter (trigger_coldstart_run), as in a new
+function instance. test_import_footprint fails if a heavy SDK is pulled
+back into the import of rag.trigger and prints the slowest imports from
+`python -X importtime`; the benchmarks time the import alone and the
+whole cold start up to the first answer.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("openai", "botocore", "boto3", "numpy")
+needs_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None,
+    reason="pytest-benchmark is not installed",
+)
+
+# Обязательные настройки rag.config; в запусках ходим только в MockTransport
+_ENV = {
+    "RAG_YANDEX_API_KEY": "benchmark",
+    "RAG_YANDEX_FOLDER_ID": "benchmark",
+    "RAG_ACCESS_KEY": "benchmark",
+    "RAG_SECRET_KEY": "benchmark",
+}
+
+
+def _python(*args: str) -> subprocess.CompletedProcess[str]:
+    env = {**_ENV, **os.environ, "RAG_TRIGGER_STATUS_URL": ""}
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _cold_start() -> dict[str, Any]:
+    out = _python("-m", "benchmarks.trigger_coldstart_run").stdout
+    report: dict[str, Any] = json.loads(out.strip().splitlines()[-1])
+    return report
+
+
+def test_import_footprint() -> None:
+    code = (
+        "import sys, rag.trigger; "
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    proc = _python("-X", "importtime", "-c", code)
+    assert proc.stdout.strip() == "[]", f"rag.trigger imports {proc.stdout.strip()}"
+
+    # import time: self [us] | cumulative [us] | package
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    total = next(us for us, name in rows if name.strip() == "rag.trigger")
+    print(f"\nrag.trigger: {total / 1000:.1f} ms cumulative")
+    for us, name in sorted(rows, reverse=True)[:10]:
+        print(f"{us / 1000:8.1f} ms {name}")
+
+
+def test_cold_start_answers() -> None:
+    report = _cold_start()
+    assert report["heavy_loaded_by_import"] == []
+    for response in report["responses"]:
+        assert response["statusCode"] == 200
+        (result,) = json.loads(response["body"])["results"]
+        assert result["file_id"] == "file-coldstart"
+    # Тёплый вызов переиспользует цикл событий и клиентов
+    assert report["warm_request_ms"] < report["first_request_ms"]
+    print(f"\n{report}")
+
+
+@needs_benchmark
+def test_import_time(benchmark: Any) -> None:
+    benchmark.pedantic(_python, args=("-c", "import rag.trigger"), rounds=5)
+
+
+@needs_benchmark
+def test_first_request(benchmark: Any) -> None:
+    benchmark.pedantic(_cold_start, rounds=5)
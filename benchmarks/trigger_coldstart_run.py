@@ -0,0 +1,83 @@
+"""One cold start of rag.trigger, run in a fresh interpreter.
+
+    python -m benchmarks.trigger_coldstart_run
+
+S3 and Yandex AI are answered by an httpx.MockTransport, so the numbers
+are import and CPU time only. Prints a JSON report: which heavy SDKs were
+loaded by the import, import time, first (cold) and second (warm)
+invocation time.
+"""
+
+import json
+import sys
+import time
+from typing import Any
+
+started = time.perf_counter()
+
+import httpx  # noqa: E402
+
+HEAVY_MODULES = ("openai", "botocore", "boto3", "numpy")
+# Небольшой документ: 20 страниц, на нём и виден вклад холодного старта
+OCR_BODY = json.dumps(
+    {
+        "data": [
+            {"page": p, "text": f"Опись фонда, лист {p}. " * 40} for p in range(1, 21)
+        ]
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+
+
+def _respond(request: httpx.Request) -> httpx.Response:
+    if request.method == "GET":
+        return httpx.Response(200, content=OCR_BODY)
+    # files.create
+    return httpx.Response(
+        200,
+        json={
+            "id": "file-coldstart",
+            "object": "file",
+            "bytes": 0,
+            "created_at": 0,
+            "filename": "chunks.jsonl",
+            "purpose": "assistants",
+            "status": "processed",
+        },
+    )
+
+
+_init = httpx.AsyncClient.__init__
+
+
+def _mocked_init(self: httpx.AsyncClient, *args: Any, **kwargs: Any) -> None:
+    kwargs["transport"] = httpx.MockTransport(_respond)
+    _init(self, *args, **kwargs)
+
+
+httpx.AsyncClient.__init__ = _mocked_init  # type: ignore[method-assign]
+
+import_started = time.perf_counter()
+import rag.trigger  # noqa: E402
+
+imported = time.perf_counter()
+loaded_by_import = [m for m in HEAVY_MODULES if m in sys.modules]
+
+event = {"messages": [{"details": {"object_id": "data/chunks/coldstart.json"}}]}
+first = rag.trigger.handler(event, None)
+first_done = time.perf_counter()
+second = rag.trigger.handler(event, None)
+second_done = time.perf_counter()
+
+print(
+    json.dumps(
+        {
+            "heavy_loaded_by_import": loaded_by_import,
+            "import_ms": round((imported - import_started) * 1000, 1),
+            "first_request_ms": round((first_done - imported) * 1000, 1),
+            "warm_request_ms": round((second_done - first_done) * 1000, 1),
+            "total_ms": round((first_done - started) * 1000, 1),
+            "responses": [first, second],
+        }
+    )
+)
@@ -1,7 +1,27 @@
-from .main import get_answer
-from .get_files import get_files, get_files_names2ids
-from .get_indexes import get_indexes, get_indexes_names2ids
-from .create_index import create_index
+"""RAG over Yandex AI Studio.
+
+The public functions are imported on first access (PEP 562): the upload
+trigger (rag.trigger) imports only the modules it runs, not the whole
+answering stack with the OpenAI SDK.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .create_index import create_index
+    from .get_files import get_files, get_files_names2ids
+    from .get_indexes import get_indexes, get_indexes_names2ids
+    from .main import get_answer
+
+_EXPORTS = {
+    "get_answer": ".main",
+    "get_files": ".get_files",
+    "get_files_names2ids": ".get_files",
+    "get_indexes": ".get_indexes",
+    "get_indexes_names2ids": ".get_indexes",
+    "create_index": ".create_index",
+}
 
 __all__ = [
     "get_answer",
@@ -11,3 +31,12 @@ __all__ = [
     "get_indexes_names2ids",
     "create_index",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Protocol
+
+_WS_RE = re.compile(r"\s+")
+
+
+class AnswerCache(Protocol):
+    """Storage for finished answers, see app.core.answer_cache."""
+
+    async def get(self, key: str) -> tuple[str, str] | None: ...
+
+    async def set(
+        self, key: str, vector_store_id: str, answer: str, context: str
+    ) -> None: ...
+
+
+def normalize_question(question: str) -> str:
+    q = question.casefold().replace("ё", "е")
+    q = _WS_RE.sub(" ", q).strip()
+    return q.rstrip("?!.… ").strip()
+
+
+def make_answer_cache_key(
+    vector_store_id: str,
+    standalone_question: str,
+    prompt: str | None,
+    temperature: float,
+    variant: str = "",
+) -> str:
+    """Cache key; `variant` carries retrieval settings that change the answer."""
+    prompt_hash = hashlib.sha256((prompt or "").encode("utf-8")).hexdigest()
+    raw = json.dumps(
+        [
+            vector_store_id,
+            normalize_question(standalone_question),
+            prompt_hash,
+            round(temperature, 3),
+            variant,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
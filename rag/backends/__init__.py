@@ -0,0 +1,52 @@
+"""Vector index engines behind one interface, see base.VectorBackend.
+
+Store ids with the `local-` prefix belong to the local engine, everything
+else to Yandex AI Studio; new indexes go to RAG_VECTOR_BACKEND.
+"""
+
+from __future__ import annotations
+
+from ..config import settings
+from .base import LOCAL_STORE_PREFIX, VectorBackend
+from .yandex import YandexVectorBackend
+
+_backends: dict[str, VectorBackend] = {}
+
+
+def _get(kind: str) -> VectorBackend:
+    backend = _backends.get(kind)
+    if backend is None:
+        if kind == "local":
+            # numpy грузим только если локальный бэкенд действительно нужен
+            from .local import LocalVectorBackend
+
+            backend = LocalVectorBackend()
+        else:
+            backend = YandexVectorBackend()
+        _backends[kind] = backend
+    return backend
+
+
+def get_backend(vector_store_id: str) -> VectorBackend:
+    """Backend that owns an existing index."""
+    return _get("local" if vector_store_id.startswith(LOCAL_STORE_PREFIX) else "yandex")
+
+
+def default_backend() -> VectorBackend:
+    """Backend for new indexes."""
+    return _get(settings.RAG_VECTOR_BACKEND)
+
+
+def set_backend(kind: str, backend: VectorBackend) -> None:
+    """Replace a backend, e.g. a LocalVectorBackend with an offline embedder."""
+    _backends[kind] = backend
+
+
+__all__ = [
+    "LOCAL_STORE_PREFIX",
+    "VectorBackend",
+    "YandexVectorBackend",
+    "default_backend",
+    "get_backend",
+    "set_backend",
+]
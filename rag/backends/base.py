@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from ..hits import SearchHit
+
+# Индексы локального бэкенда отличаем от Yandex по префиксу id
+LOCAL_STORE_PREFIX = "local-"
+
+
+class VectorBackend(ABC):
+    """Vector index engine: build, search and delete indexes of chunk files.
+
+    `file_ids` are backend-specific; resolve_file_ids maps our chunk file
+    names (`<stem>.chunks.jsonl`) to them.
+    """
+
+    @abstractmethod
+    async def resolve_file_ids(
+        self, chunk_names: Iterable[str], known: Mapping[str, str] | None = None
+    ) -> dict[str, str]:
+        """Chunk file name -> backend file id, only for names the backend has.
+
+        `known` — Yandex file ids saved at ingest (files.rag_file_id) by
+        chunk name; backends look up only the names missing from it.
+        """
+
+    @abstractmethod
+    async def start_create(self, name: str, file_ids: list[str]) -> str:
+        """Start building an index; returns its vector_store_id at once."""
+
+    @abstractmethod
+    async def build_status(self, vector_store_id: str) -> str:
+        """in_progress — строится, completed — готов, failed — ошибка."""
+
+    async def build_statuses(self, vector_store_ids: list[str]) -> dict[str, str]:
+        """Statuses of several indexes; backends may do it in one request."""
+        statuses = await asyncio.gather(*map(self.build_status, vector_store_ids))
+        return dict(zip(vector_store_ids, statuses))
+
+    async def create(self, name: str, file_ids: list[str]) -> dict[str, Any]:
+        """Build an index and wait for it; returns name, vector_store_id, status."""
+        from ..poller import build_poller
+
+        vector_store_id = await self.start_create(name, file_ids)
+        status = await build_poller.watch(vector_store_id, len(file_ids))
+        return {"name": name, "vector_store_id": vector_store_id, "status": status}
+
+    @abstractmethod
+    async def search(
+        self, vector_store_id: str, query: str, limit: int
+    ) -> list[SearchHit]:
+        """Up to about `limit` hits for `query`; callers sort and trim."""
+
+    @abstractmethod
+    async def delete(self, vector_store_id: str) -> None: ...
@@ -0,0 +1,201 @@
+"""Local vector index: float32 embeddings in a memory-mapped matrix.
+
+Layout of one index under RAG_LOCAL_INDEX_PATH/<vector_store_id>/:
+    meta.json     — name, dim, count
+    vectors.f32   — count x dim row-major float32, rows L2-normalised
+    chunks.jsonl  — {"filename", "text"} per row
+
+Search is an exact brute-force dot product over the mmap, which is fast
+enough for org-sized indexes (tens of thousands of chunks).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import shutil
+import uuid
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только локальному бэкенду
+    np = None  # type: ignore[assignment]
+
+from ..clients import get_client
+from ..config import settings
+from ..hits import SearchHit
+from ..upload_file import load_chunks
+from .base import LOCAL_STORE_PREFIX, VectorBackend
+
+# (texts, "doc" | "query") -> one vector per text
+Embedder = Callable[[list[str], Literal["doc", "query"]], Awaitable[list[list[float]]]]
+# backend file id -> [(filename, text)]
+ChunkLoader = Callable[[str], Awaitable[list[tuple[str, str]]]]
+
+_EMBED_CONCURRENCY = 8
+
+
+async def yandex_embedder(
+    texts: list[str], kind: Literal["doc", "query"]
+) -> list[list[float]]:
+    """Embeddings from Yandex AI Studio, one request per text."""
+    client = get_client()
+    model = (
+        settings.RAG_EMBEDDING_DOC_MODEL
+        if kind == "doc"
+        else settings.RAG_EMBEDDING_QUERY_MODEL
+    )
+    semaphore = asyncio.Semaphore(_EMBED_CONCURRENCY)
+
+    async def embed(text: str) -> list[float]:
+        async with semaphore:
+            resp = await client.embeddings.create(
+                model=f"emb://{settings.RAG_YANDEX_FOLDER_ID}/{model}",
+                input=text,
+                encoding_format="float",
+            )
+        return resp.data[0].embedding
+
+    return list(await asyncio.gather(*(embed(t) for t in texts)))
+
+
+async def s3_chunk_loader(file_id: str) -> list[tuple[str, str]]:
+    """File ids of the local backend are chunk names: `<stem>.chunks.jsonl`."""
+    stem = file_id.removesuffix(".chunks.jsonl")
+    chunks = await load_chunks(f"{stem}.json")
+    return [(file_id, c["body"]) for c in chunks]
+
+
+@dataclass
+class _Store:
+    matrix: Any  # np.memmap, count x dim
+    chunks: list[tuple[str, str]]
+
+
+class LocalVectorBackend(VectorBackend):
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        embedder: Embedder = yandex_embedder,
+        loader: ChunkLoader = s3_chunk_loader,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("Local vector backend requires numpy")
+        self.root = Path(root or settings.RAG_LOCAL_INDEX_PATH)
+        self.embedder = embedder
+        self.loader = loader
+        self._stores: dict[str, _Store] = {}
+
+    def _path(self, vector_store_id: str) -> Path:
+        if not vector_store_id.startswith(LOCAL_STORE_PREFIX) or "/" in vector_store_id:
+            raise ValueError(f"Not a local vector store: {vector_store_id}")
+        return self.root / vector_store_id
+
+    async def resolve_file_ids(
+        self, chunk_names: Iterable[str], known: Mapping[str, str] | None = None
+    ) -> dict[str, str]:
+        # Id файлов Yandex здесь не нужны: чанки читаем из S3 по имени
+        return {name: name for name in chunk_names}
+
+    async def start_create(self, name: str, file_ids: list[str]) -> str:
+        # Локальный индекс строится сразу: к возврату он уже completed
+        loaded = await asyncio.gather(*(self.loader(fid) for fid in file_ids))
+        chunks = [chunk for file_chunks in loaded for chunk in file_chunks]
+        if not chunks:
+            raise ValueError("No chunks to index")
+
+        vectors = await self.embedder([text for _, text in chunks], "doc")
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+
+        vector_store_id = f"{LOCAL_STORE_PREFIX}{uuid.uuid4().hex}"
+        await asyncio.to_thread(
+            self._write, self._path(vector_store_id), name, matrix, chunks
+        )
+        print("Локальный индекс создан:", vector_store_id)
+        return vector_store_id
+
+    async def build_status(self, vector_store_id: str) -> str:
+        path = self._path(vector_store_id)
+        return "completed" if (path / "meta.json").exists() else "failed"
+
+    @staticmethod
+    def _write(
+        path: Path, name: str, matrix: Any, chunks: list[tuple[str, str]]
+    ) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.mkdir(parents=True)
+
+        mm = np.memmap(
+            tmp / "vectors.f32", dtype=np.float32, mode="w+", shape=matrix.shape
+        )
+        mm[:] = matrix
+        mm.flush()
+        del mm
+
+        with open(tmp / "chunks.jsonl", "w", encoding="utf-8") as f:
+            for filename, text in chunks:
+                f.write(
+                    json.dumps({"filename": filename, "text": text}, ensure_ascii=False)
+                )
+                f.write("\n")
+
+        meta = {"name": name, "dim": matrix.shape[1], "count": matrix.shape[0]}
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False))
+        # Индекс появляется целиком или не появляется вовсе
+        tmp.rename(path)
+
+    def _open(self, vector_store_id: str) -> _Store:
+        store = self._stores.get(vector_store_id)
+        if store is not None:
+            return store
+
+        path = self._path(vector_store_id)
+        meta = json.loads((path / "meta.json").read_text())
+        matrix = np.memmap(
+            path / "vectors.f32",
+            dtype=np.float32,
+            mode="r",
+            shape=(meta["count"], meta["dim"]),
+        )
+        with open(path / "chunks.jsonl", encoding="utf-8") as f:
+            chunks = [(row["filename"], row["text"]) for row in map(json.loads, f)]
+
+        store = _Store(matrix=matrix, chunks=chunks)
+        self._stores[vector_store_id] = store
+        return store
+
+    async def search(
+        self, vector_store_id: str, query: str, limit: int
+    ) -> list[SearchHit]:
+        store = self._open(vector_store_id)
+        if limit <= 0 or not store.chunks:
+            return []
+
+        [vector] = await self.embedder([query], "query")
+        q = np.asarray(vector, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        scores = store.matrix @ q
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            SearchHit(
+                filename=store.chunks[i][0],
+                text=store.chunks[i][1],
+                score=float(scores[i]),
+            )
+            for i in top
+        ]
+
+    async def delete(self, vector_store_id: str) -> None:
+        path = self._path(vector_store_id)
+        self._stores.pop(vector_store_id, None)
+        await asyncio.to_thread(shutil.rmtree, path, True)
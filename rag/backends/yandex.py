@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+
+import openai
+
+from ..clients import get_client
+from ..hits import SearchHit, hit_from_vector_store
+from .base import VectorBackend
+
+
+class YandexVectorBackend(VectorBackend):
+    """Vector stores of Yandex AI Studio (OpenAI-compatible API)."""
+
+    async def resolve_file_ids(
+        self, chunk_names: Iterable[str], known: Mapping[str, str] | None = None
+    ) -> dict[str, str]:
+        known = known or {}
+        names = list(chunk_names)
+        resolved = {name: known[name] for name in names if name in known}
+        missing = {name for name in names if name not in known}
+        if not missing:
+            return resolved
+
+        # Файлы, загруженные до появления files.rag_file_id: ищем по имени,
+        # листая все страницы, пока не найдём всё
+        async for f in get_client().files.list():
+            if f.filename in missing:
+                resolved[f.filename] = f.id
+                missing.discard(f.filename)
+                if not missing:
+                    break
+        return resolved
+
+    async def start_create(self, name: str, file_ids: list[str]) -> str:
+        print("Создаем поисковый индекс...")
+
+        vector_store = await get_client().vector_stores.create(
+            name=name,
+            # metadata={"key": "value"},
+            expires_after={"anchor": "last_active_at", "days": 30},
+            file_ids=file_ids,
+        )
+
+        print("Vector store создан:", vector_store.id)
+        return vector_store.id
+
+    async def build_status(self, vector_store_id: str) -> str:
+        vector_store = await get_client().vector_stores.retrieve(vector_store_id)
+        return vector_store.status
+
+    async def build_statuses(self, vector_store_ids: list[str]) -> dict[str, str]:
+        # Строящиеся индексы — самые новые, а list отдаёт новые первыми, так
+        # что обычно хватает одной страницы; остальные спрашиваем по одному
+        wanted = set(vector_store_ids)
+        page = await get_client().vector_stores.list(limit=100)
+        statuses: dict[str, str] = {
+            vs.id: vs.status for vs in page.data if vs.id in wanted
+        }
+        for vector_store_id in wanted - statuses.keys():
+            statuses[vector_store_id] = await self.build_status(vector_store_id)
+        return statuses
+
+    async def search(
+        self, vector_store_id: str, query: str, limit: int
+    ) -> list[SearchHit]:
+        # limit не передаём: сервис отдаёт свой топ, rag.main обрезает до k
+        s = await get_client().vector_stores.search(
+            vector_store_id=vector_store_id,
+            query=query,
+        )
+        return [hit_from_vector_store(h) for h in s.data or []]
+
+    async def delete(self, vector_store_id: str) -> None:
+        try:
+            await get_client().vector_stores.delete(vector_store_id)
+        except openai.NotFoundError:
+            # Уже удалён, например прошлой попыткой, у которой не закоммитилась БД
+            pass
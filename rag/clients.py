@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from .config import settings
+
+YANDEX_AI_BASE_URL = "https://ai.api.cloud.yandex.net/v1"
+YANDEX_ASSISTANT_BASE_URL = "https://rest-assistant.api.cloud.yandex.net/v1"
+
+
+class _ConnectionCounters:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections_opened = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        # httpcore сообщает о каждом новом TCP-соединении; всё остальное —
+        # запросы, ушедшие в уже открытое keep-alive соединение.
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(0, self.requests - self.connections_opened),
+        }
+
+
+class ClientRegistry:
+    """Process-wide AsyncOpenAI clients, one per base URL.
+
+    Clients are created lazily on first use, so the registry also works
+    outside FastAPI (e.g. in the upload trigger). The API opens them in
+    its lifespan hook and closes them on shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[str, AsyncOpenAI] = {}
+        self._counters: dict[str, _ConnectionCounters] = {}
+
+    def get(self, base_url: str) -> AsyncOpenAI:
+        client = self._clients.get(base_url)
+        if client is None:
+            client = self._create(base_url)
+            self._clients[base_url] = client
+        return client
+
+    def _create(self, base_url: str) -> AsyncOpenAI:
+        counters = self._counters.setdefault(base_url, _ConnectionCounters())
+        http_client = DefaultAsyncHttpxClient(
+            timeout=httpx.Timeout(settings.RAG_HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.RAG_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.RAG_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.RAG_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [counters.on_request]},
+        )
+        return AsyncOpenAI(
+            api_key=settings.RAG_YANDEX_API_KEY,
+            base_url=base_url,
+            project=settings.RAG_YANDEX_FOLDER_ID,
+            http_client=http_client,
+        )
+
+    async def startup(self) -> None:
+        for base_url in (YANDEX_AI_BASE_URL, YANDEX_ASSISTANT_BASE_URL):
+            self.get(base_url)
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.close()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {url: c.as_dict() for url, c in self._counters.items()}
+
+
+registry = ClientRegistry()
+
+
+def get_client(base_url: str = YANDEX_AI_BASE_URL) -> AsyncOpenAI:
+    return registry.get(base_url)
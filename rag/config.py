@@ -1,4 +1,5 @@
 import re
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -22,5 +23,61 @@ class Settings(BaseSettings):
     RAG_PAGE_MARK_RE: re.Pattern[str] = re.compile(r"\[PAGE\s+(\d+)\]")
     RAG_PAGE_MARK_REMOVE_RE: re.Pattern[str] = re.compile(r"\s*\[PAGE\s+\d+\]\s*\n?")
 
+    # Пул HTTP-соединений к Yandex AI (общий на процесс, см. rag/clients.py)
+    RAG_HTTP_TIMEOUT: float = 60.0
+    RAG_HTTP_MAX_CONNECTIONS: int = 100
+    RAG_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    RAG_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+
+    # Переформулировка запроса: локальный фильтр и кэш (см. rag/rewrite_gate.py)
+    RAG_REWRITE_GATING: bool = True
+    RAG_REWRITE_CACHE_SIZE: int = 1024
+    RAG_REWRITE_CACHE_TTL: float = 3600.0
+
+    # Спекулятивный поиск по исходному вопросу параллельно с переформулировкой
+    RAG_SPECULATIVE_SEARCH: bool = False
+    RAG_SPECULATIVE_REUSE_JACCARD: float = 0.8
+
+    # Упаковка контекста перед генерацией (см. rag/context_packer.py);
+    # бюджет 0 — без ограничения
+    RAG_CONTEXT_TOKEN_BUDGET: int = 6000
+    RAG_CHARS_PER_TOKEN: float = 3.5
+    RAG_CONTEXT_MIN_OVERLAP: int = 16
+
+    # Движок векторного индекса для новых индексов (см. rag/backends)
+    RAG_VECTOR_BACKEND: Literal["yandex", "local"] = "yandex"
+    RAG_LOCAL_INDEX_PATH: str = "data/local_indexes"
+    RAG_EMBEDDING_DOC_MODEL: str = "text-search-doc/latest"
+    RAG_EMBEDDING_QUERY_MODEL: str = "text-search-query/latest"
+
+    # Общий опрос статуса строящихся индексов (см. rag/poller.py)
+    RAG_POLL_INITIAL_INTERVAL: float = 2.0
+    RAG_POLL_MAX_INTERVAL: float = 30.0
+    RAG_POLL_BACKOFF: float = 1.5
+    RAG_POLL_JITTER: float = 0.2
+    RAG_POLL_HISTORY: int = 200
+
+    # Асинхронный клиент S3 (см. rag/s3.py)
+    RAG_S3_REGION: str = "ru-central1"
+    RAG_S3_TIMEOUT: float = 60.0
+    RAG_S3_MAX_CONNECTIONS: int = 50
+    RAG_S3_CONCURRENCY: int = 32
+
+    # Потоковая загрузка чанков (см. rag/upload_file.py): размер куска
+    # чтения из S3 и сколько JSONL держать в памяти до сброса на диск
+    RAG_INGEST_READ_BYTES: int = 256 * 1024
+    RAG_INGEST_SPOOL_BYTES: int = 8 * 1024 * 1024
+
+    # Триггер загрузки (см. rag/trigger.py): куда сообщать статус файла —
+    # полный URL PATCH /api/v1/files/by-key/status и ключ сервиса
+    # (CLOUD_FUNCTION_API_KEY бэкенда); без URL статус не отправляется
+    RAG_TRIGGER_STATUS_URL: str | None = None
+    RAG_TRIGGER_SERVICE_KEY: str | None = None
+    RAG_TRIGGER_WINDOW_CHARS: int = 400
+    RAG_TRIGGER_OVERLAP_CHARS: int = 50
+
+    # Сколько удалений в Yandex (files, vector_stores.files) идут одновременно
+    RAG_DELETE_CONCURRENCY: int = 8
+
 
 settings = Settings()
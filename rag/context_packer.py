@@ -0,0 +1,159 @@
+"""Shrink retrieved hits before they go into the prompt.
+
+Chunks are overlapping windows (see upload_file.chunk_text_window_overlap),
+so neighbouring hits of one file repeat the overlap text and come as
+separate sources. The packer glues such hits into one block, drops hits
+already contained in another one and greedily keeps the best blocks
+within a token budget.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from .config import settings
+from .hits import SearchHit
+
+_PAGES_RE = re.compile(r"^PAGES: (\d+)(?:-(\d+))?\n")
+
+
+@dataclass
+class _Block:
+    filename: str
+    pages: tuple[int, int] | None
+    body: str
+    score: float
+    # Лучшая позиция среди склеенных хитов — по ней блоки и упаковываем
+    rank: int
+    file_id: str | None
+
+    @property
+    def text(self) -> str:
+        if self.pages is None:
+            return self.body
+        first, last = self.pages
+        header = f"PAGES: {first}" if first == last else f"PAGES: {first}-{last}"
+        return f"{header}\n{self.body}"
+
+
+def _split_header(text: str) -> tuple[tuple[int, int] | None, str]:
+    m = _PAGES_RE.match(text)
+    if m is None:
+        return None, text
+    first = int(m.group(1))
+    last = int(m.group(2) or first)
+    return (first, last), text[m.end() :]
+
+
+def _merge_pages(
+    a: tuple[int, int] | None, b: tuple[int, int] | None
+) -> tuple[int, int] | None:
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    if min(len(left), len(right)) < min_overlap:
+        return 0
+    probe = right[:min_overlap]
+    i = left.find(probe, max(0, len(left) - len(right)))
+    while i != -1:
+        if right.startswith(left[i:]):
+            return len(left) - i
+        i = left.find(probe, i + 1)
+    return 0
+
+
+def _try_merge(a: _Block, b: _Block, min_overlap: int) -> str | None:
+    """Body of a and b glued together, or None if they do not overlap."""
+    if b.body in a.body:
+        return a.body
+    if a.body in b.body:
+        return b.body
+    n = _overlap(a.body, b.body, min_overlap)
+    if n:
+        return a.body + b.body[n:]
+    n = _overlap(b.body, a.body, min_overlap)
+    if n:
+        return b.body + a.body[n:]
+    return None
+
+
+def merge_hits(hits: list[SearchHit], min_overlap: int | None = None) -> list[_Block]:
+    """Merge overlapping hits of the same file; blocks come in rank order."""
+    if min_overlap is None:
+        min_overlap = settings.RAG_CONTEXT_MIN_OVERLAP
+
+    blocks: list[_Block] = []
+    for rank, h in enumerate(hits):
+        pages, body = _split_header(h.text)
+        block = _Block(h.filename, pages, body, h.score, rank, h.file_id)
+
+        # Новый блок может склеить два уже имеющихся, поэтому повторяем,
+        # пока находится с кем слиться
+        merged = True
+        while merged:
+            merged = False
+            for other in blocks:
+                if other.filename != block.filename:
+                    continue
+                merged_body = _try_merge(other, block, min_overlap)
+                if merged_body is None:
+                    continue
+                blocks.remove(other)
+                block = _Block(
+                    filename=block.filename,
+                    pages=_merge_pages(other.pages, block.pages),
+                    body=merged_body,
+                    score=max(other.score, block.score),
+                    rank=min(other.rank, block.rank),
+                    file_id=other.file_id or block.file_id,
+                )
+                merged = True
+                break
+        blocks.append(block)
+
+    blocks.sort(key=lambda b: b.rank)
+    return blocks
+
+
+def pack_context(
+    hits: list[SearchHit],
+    token_budget: int | None = None,
+    chars_per_token: float | None = None,
+) -> list[SearchHit]:
+    """Merged hits, best first, that fit into `token_budget` (0 — no limit).
+
+    Hits are expected best first (the retrieval order, which for hybrid
+    search is the fused one). If even the best block does not fit, it is
+    cut to the budget so the answer always has some context.
+    """
+    if token_budget is None:
+        token_budget = settings.RAG_CONTEXT_TOKEN_BUDGET
+    if chars_per_token is None:
+        chars_per_token = settings.RAG_CHARS_PER_TOKEN
+
+    blocks = merge_hits(hits)
+    budget_chars = int(token_budget * chars_per_token)
+
+    packed: list[SearchHit] = []
+    used = 0
+    for block in blocks:
+        text = block.text
+        if budget_chars > 0 and used + len(text) > budget_chars:
+            if packed:
+                continue
+            text = text[:budget_chars]
+        packed.append(
+            SearchHit(
+                filename=block.filename,
+                text=text,
+                score=block.score,
+                file_id=block.file_id,
+            )
+        )
+        used += len(text)
+    return packed
@@ -1,43 +1,87 @@
-from openai import AsyncOpenAI
+import asyncio
+from collections.abc import Iterable
 
+import openai
+
+from .backends import LOCAL_STORE_PREFIX
+from .clients import get_client
 from .config import settings
 
 
-def _make_client() -> AsyncOpenAI:
-    return AsyncOpenAI(
-        api_key=settings.RAG_YANDEX_API_KEY,
-        base_url="https://ai.api.cloud.yandex.net/v1",
-        project=settings.RAG_YANDEX_FOLDER_ID,
-    )
+async def _find_file_ids(upload_name: str) -> list[str]:
+    file_ids = []
+    async for f in get_client().files.list():
+        if f.filename == upload_name:
+            file_ids.append(f.id)
+    return file_ids
 
 
-async def delete_rag_file(stem: str) -> None:
-    """Find and delete chunks file from Yandex Files API and all vector stores.
+async def delete_rag_file(
+    stem: str,
+    file_ids: Iterable[str] = (),
+    memberships: Iterable[tuple[str, str | None]] | None = None,
+    keep_file: bool = False,
+) -> None:
+    """Delete a chunks file from Yandex Files API and from vector stores.
 
     stem = Path(system_key).stem, e.g. 'abc123_myfile'
     The corresponding chunks file is named '{stem}.chunks.jsonl'.
-    """
-    upload_name = f"{stem}.chunks.jsonl"
-    client = _make_client()
 
-    all_files = await client.files.list()
-    file_ids = [f.id for f in all_files.data if f.filename == upload_name]
+    file_ids — its Yandex ids if known (files.rag_file_id and the ids
+    recorded per index), otherwise it is looked up by name. memberships —
+    (vector store, file id) pairs to remove (see
+    app.db.models.index_file.get_file_stores); a pair with id None stands
+    for every id of the file, None for all stores of the folder. With
+    `keep_file` the file is only removed from the stores: other rows
+    still use it. Remote deletes go concurrently, at most
+    RAG_DELETE_CONCURRENCY at a time; "not found" is not an error, any
+    other failure is raised after all deletes have been tried.
+    """
+    client = get_client()
 
-    if not file_ids:
+    if memberships is not None:
+        memberships = list(memberships)
+    ids = set(file_ids)
+    ids.update(fid for _, fid in memberships or () if fid is not None)
+    if not ids:
+        ids.update(await _find_file_ids(f"{stem}.chunks.jsonl"))
+    if not ids:
         return
 
-    vector_stores = await client.vector_stores.list()
-    for vs in vector_stores.data:
-        vs_files = await client.vector_stores.files.list(vs.id)
-        for vsf in vs_files.data:
-            if vsf.id in file_ids:
-                try:
-                    await client.vector_stores.files.delete(vs.id, vsf.id)
-                except Exception:
-                    pass
-
-    for file_id in file_ids:
-        try:
-            await client.files.delete(file_id)
-        except Exception:
-            pass
+    if memberships is None:
+        memberships = [(vs.id, None) async for vs in client.vector_stores.list()]
+    pairs = {
+        (vs, fid)
+        for vs, rid in memberships
+        if not vs.startswith(LOCAL_STORE_PREFIX)
+        for fid in ([rid] if rid is not None else ids)
+    }
+
+    semaphore = asyncio.Semaphore(settings.RAG_DELETE_CONCURRENCY)
+
+    async def remove_from_store(vector_store_id: str, fid: str) -> None:
+        # Файла в этом store может и не быть — это не ошибка
+        async with semaphore:
+            try:
+                await client.vector_stores.files.delete(
+                    fid, vector_store_id=vector_store_id
+                )
+            except openai.NotFoundError:
+                pass
+
+    async def remove_file(fid: str) -> None:
+        async with semaphore:
+            try:
+                await client.files.delete(fid)
+            except openai.NotFoundError:
+                pass
+
+    results = await asyncio.gather(
+        *(remove_from_store(vs, fid) for vs, fid in pairs),
+        return_exceptions=True,
+    )
+    if not keep_file:
+        results += await asyncio.gather(*map(remove_file, ids), return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
@@ -0,0 +1,6 @@
+from .backends import get_backend
+
+
+async def delete_index(vector_store_id: str) -> None:
+    """Delete an index from whichever backend owns it."""
+    await get_backend(vector_store_id).delete(vector_store_id)
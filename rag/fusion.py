@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Sequence
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[T]],
+    key: Callable[[T], Hashable],
+    k: int = 60,
+) -> list[T]:
+    """Merge ranked lists with RRF: score(d) = sum(1 / (k + rank_i(d))).
+
+    Items are deduplicated by `key`; for duplicates the first occurrence
+    (from the earliest list) is kept. Ties keep the order of first appearance.
+    """
+    scores: dict[Hashable, float] = {}
+    items: dict[Hashable, T] = {}
+
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked, 1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+            items.setdefault(item_key, item)
+
+    order = sorted(scores, key=lambda item_key: scores[item_key], reverse=True)
+    return [items[item_key] for item_key in order]
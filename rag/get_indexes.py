@@ -1,6 +1,4 @@
-from openai import AsyncOpenAI
-
-from .config import settings
+from .clients import get_client
 
 
 async def get_indexes(to_sort: bool = False) -> list[str]:
@@ -9,11 +7,7 @@ async def get_indexes(to_sort: bool = False) -> list[str]:
     names = ['name1', 'name2', ..., 'nameN']
     По умолчанию возвращает в порядке создания индексов.
     """
-    client = AsyncOpenAI(
-        api_key=settings.RAG_YANDEX_API_KEY,
-        base_url="https://ai.api.cloud.yandex.net/v1",
-        project=settings.RAG_YANDEX_FOLDER_ID,
-    )
+    client = get_client()
 
     vector_stores = await client.vector_stores.list()
     names = []
@@ -31,11 +25,7 @@ async def get_indexes_names2ids(to_sort: bool = False) -> dict[str, str]:
     Возвращает словарь names2ids
     names = {'name1':'id1', 'name2':'id2', ...}
     """
-    client = AsyncOpenAI(
-        api_key=settings.RAG_YANDEX_API_KEY,
-        base_url="https://ai.api.cloud.yandex.net/v1",
-        project=settings.RAG_YANDEX_FOLDER_ID,
-    )
+    client = get_client()
 
     vector_stores = await client.vector_stores.list()
     res = {}
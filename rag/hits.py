@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class SearchHit:
+    """One retrieved chunk, whatever engine produced it."""
+
+    filename: str
+    text: str
+    score: float
+    file_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.filename, self.text
+
+
+# (query, limit) -> hits; e.g. full-text search over the index chunks in Postgres
+LexicalSearch = Callable[[str, int], Awaitable[list[SearchHit]]]
+
+
+def hit_from_vector_store(h: Any) -> SearchHit:
+    """Convert a vector_stores.search result item to SearchHit."""
+    return SearchHit(
+        filename=getattr(h, "filename", None) or "unknown",
+        text=h.content[0].text if getattr(h, "content", None) else "",
+        score=float(getattr(h, "score", 0.0) or 0.0),
+        file_id=getattr(h, "file_id", None),
+        attributes=dict(getattr(h, "attributes", None) or {}),
+    )
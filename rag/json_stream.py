@@ -0,0 +1,154 @@
+"""Incremental reading of one array field of a JSON object from a byte stream.
+
+OCR results are a single object `{"data": [...], ...}` that can run to
+hundreds of megabytes for an archival scan. iter_array_items yields the
+elements of one top-level array as they arrive, holding only the unread
+tail of the stream plus the element being decoded; other fields are
+decoded and dropped. Elements are decoded with json's own raw_decode, so
+values come out exactly as json.loads would give them.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import AsyncIterator
+from typing import Any
+
+_NON_WS = re.compile(r"[^ \t\n\r]")
+# Что может продолжать число: raw_decode на "1." или "2e" отдаёт 1 и 2
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_DECODER = json.JSONDecoder()
+
+
+class ArrayFieldMissing(ValueError):
+    """The object has no such field, or it is not an array."""
+
+
+class _Reader:
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self._chunks = chunks
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    async def fill(self, min_unread: int = 1) -> bool:
+        """Read until at least `min_unread` characters are unread."""
+        if self.eof:
+            return False
+        pieces = [self.buf[self.pos :]]
+        unread = len(pieces[0])
+        while unread < min_unread:
+            try:
+                data = await anext(self._chunks)
+            except StopAsyncIteration:
+                pieces.append(self._utf8.decode(b"", final=True))
+                self.eof = True
+                break
+            text = self._utf8.decode(data)
+            pieces.append(text)
+            unread += len(text)
+        self.buf = "".join(pieces)
+        self.pos = 0
+        return True
+
+    def error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    async def peek(self) -> str:
+        """Next non-whitespace character, not consumed; "" at the end."""
+        while True:
+            m = _NON_WS.search(self.buf, self.pos)
+            if m is not None:
+                self.pos = m.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not await self.fill():
+                return ""
+
+    async def expect(self, char: str) -> None:
+        if await self.peek() != char:
+            raise self.error(f"Expecting {char!r}")
+        self.pos += 1
+
+    async def value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Значение оборвалось на границе куска. Дочитываем так, чтобы
+                # непрочитанное как минимум удвоилось: иначе длинное значение
+                # разбиралось бы заново на каждом куске
+                if not await self.fill(2 * (len(self.buf) - self.pos) + 1):
+                    raise
+                continue
+            # Число в конце буфера могло быть обрезано: "12" из "125", "1" из
+            # "1.5", если кусок кончился на точке
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and _NUMBER_TAIL.fullmatch(self.buf, end)
+                and await self.fill(len(self.buf) - self.pos + 1)
+            ):
+                continue
+            self.pos = end
+            return value
+
+
+async def iter_array_items(
+    chunks: AsyncIterator[bytes], field: str
+) -> AsyncIterator[Any]:
+    """Elements of `obj[field]` for the JSON object in `chunks` (UTF-8).
+
+    Raises json.JSONDecodeError on malformed JSON (possibly after some
+    elements were yielded) and ArrayFieldMissing if the top level is not
+    an object or `field` is not an array in it.
+    """
+    reader = _Reader(chunks)
+    if await reader.peek() != "{":
+        raise ArrayFieldMissing(field)
+    reader.pos += 1
+
+    found = False
+    if await reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            key = await reader.value()
+            if not isinstance(key, str):
+                raise reader.error("Expecting property name enclosed in double quotes")
+            await reader.expect(":")
+            if key == field and await reader.peek() == "[":
+                found = True
+                reader.pos += 1
+                if await reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield await reader.value()
+                        sep = await reader.peek()
+                        reader.pos += 1
+                        if sep == "]":
+                            break
+                        if sep != ",":
+                            reader.pos -= 1
+                            raise reader.error("Expecting ',' delimiter")
+            else:
+                await reader.value()
+                if key == field:
+                    found = False
+            sep = await reader.peek()
+            reader.pos += 1
+            if sep == "}":
+                break
+            if sep != ",":
+                reader.pos -= 1
+                raise reader.error("Expecting ',' delimiter")
+
+    if await reader.peek() != "":
+        raise reader.error("Extra data")
+    if not found:
+        raise ArrayFieldMissing(field)
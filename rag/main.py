@@ -1,17 +1,41 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Any
 
 from openai import AsyncOpenAI
-from .config import settings
-
 
-def _make_client() -> AsyncOpenAI:
-    return AsyncOpenAI(
-        api_key=settings.RAG_YANDEX_API_KEY,
-        base_url="https://rest-assistant.api.cloud.yandex.net/v1",
-        project=settings.RAG_YANDEX_FOLDER_ID,
-    )
+from .answer_cache import AnswerCache, make_answer_cache_key, normalize_question
+from .backends import get_backend
+from .cache import TTLCache
+from .clients import YANDEX_ASSISTANT_BASE_URL, get_client
+from .config import settings
+from .context_packer import pack_context
+from .fusion import reciprocal_rank_fusion
+from .hits import LexicalSearch, SearchHit
+from .rewrite_gate import needs_rewrite
+
+# (chat_id, hash истории, вопрос) -> переформулированный запрос
+_rewrite_cache: TTLCache[tuple[int | None, str, str], str] = TTLCache(
+    maxsize=settings.RAG_REWRITE_CACHE_SIZE,
+    ttl=settings.RAG_REWRITE_CACHE_TTL,
+)
+
+rewrite_stats: dict[str, int] = {
+    "llm_calls": 0,
+    "skipped_no_history": 0,
+    "skipped_self_contained": 0,
+    "cache_hits": 0,
+}
+
+speculative_stats: dict[str, int] = {
+    "launched": 0,
+    "reused": 0,
+    "fused": 0,
+}
 
 
 def _iter_valid_turns(
@@ -44,12 +68,16 @@ def _iter_valid_turns(
     return valid_turns
 
 
-def _history_to_text(dialog_history: list[dict[str, Any]] | None) -> str:
+def _history_to_text(
+    dialog_history: list[dict[str, Any]] | None, summary: str | None = None
+) -> str:
     turns = _iter_valid_turns(dialog_history)
-    if not turns:
+    if not turns and not summary:
         return ""
 
     lines: list[str] = []
+    if summary:
+        lines.append(f"Краткое содержание более ранней части диалога:\n{summary}\n")
     for t in turns:
         speaker = "Пользователь" if t["role"] == "user" else "Ассистент"
         lines.append(f"{speaker}: {t['content']}")
@@ -57,8 +85,10 @@ def _history_to_text(dialog_history: list[dict[str, Any]] | None) -> str:
     return "\n".join(lines).strip()
 
 
-def _has_meaningful_history(dialog_history: list[dict[str, Any]] | None) -> bool:
-    return bool(_iter_valid_turns(dialog_history))
+def _has_meaningful_history(
+    dialog_history: list[dict[str, Any]] | None, summary: str | None = None
+) -> bool:
+    return bool(summary) or bool(_iter_valid_turns(dialog_history))
 
 
 async def _model_text(
@@ -77,15 +107,37 @@ async def _model_text(
     return (resp.output_text or "").strip()
 
 
+def _last_user_turn(dialog_history: list[dict[str, Any]] | None) -> str | None:
+    for t in reversed(_iter_valid_turns(dialog_history)):
+        if t["role"] == "user":
+            return t["content"]
+    return None
+
+
 async def _rewrite_query(
     client: AsyncOpenAI,
     question: str,
     dialog_history: list[dict[str, Any]] | None,
+    chat_id: int | None = None,
+    summary: str | None = None,
 ) -> str:
-    if not _has_meaningful_history(dialog_history):
+    if not _has_meaningful_history(dialog_history, summary):
+        rewrite_stats["skipped_no_history"] += 1
+        return question.strip()
+
+    if settings.RAG_REWRITE_GATING and not needs_rewrite(
+        question, _last_user_turn(dialog_history) or summary
+    ):
+        rewrite_stats["skipped_self_contained"] += 1
         return question.strip()
 
-    history_text = _history_to_text(dialog_history)
+    history_text = _history_to_text(dialog_history, summary)
+    history_hash = hashlib.sha256(history_text.encode("utf-8")).hexdigest()
+    cache_key = (chat_id, history_hash, normalize_question(question))
+    cached = _rewrite_cache.get(cache_key)
+    if cached is not None:
+        rewrite_stats["cache_hits"] += 1
+        return cached
 
     instructions = (
         "Твоя задача — переформулировать новый вопрос пользователя в самодостаточный "
@@ -102,6 +154,7 @@ async def _rewrite_query(
         f"НОВЫЙ ВОПРОС:\n{question}"
     )
 
+    rewrite_stats["llm_calls"] += 1
     rewritten = await _model_text(
         client=client,
         instructions=instructions,
@@ -109,84 +162,374 @@ async def _rewrite_query(
         temperature=0.0,
     )
 
-    return rewritten or question.strip()
+    result = rewritten or question.strip()
+    _rewrite_cache.set(cache_key, result)
+    return result
 
 
-def _build_context_from_hits(hits: list[Any]) -> str:
+def _build_context_from_hits(hits: list[SearchHit]) -> str:
     context_parts: list[str] = []
 
     for i, h in enumerate(hits, 1):
-        txt = h.content[0].text if getattr(h, "content", None) else ""
-        filename = getattr(h, "filename", "unknown")
-        score = getattr(h, "score", 0.0)
         context_parts.append(
-            f"Источник {i} (score={score:.4f}, файл={filename}):\n{txt}"
+            f"Источник {i} (score={h.score:.4f}, файл={h.filename}):\n{h.text}"
         )
 
     return "\n\n".join(context_parts)
 
 
-async def get_answer(
+_DEFAULT_PROMPT = (
+    "Ты ассистируешь научного сотрудника музейного комплекса Петергоф.\n"
+    "Отвечай строго ТОЛЬКО на основе текста в блоке КОНТЕКСТ.\n"
+    "Блок ИСТОРИЯ ДИАЛОГА используй только для понимания того, к чему относятся "
+    "местоимения, сокращённые ссылки и уточняющие вопросы.\n"
+    "Ничего не выдумывай. Если ответа нет в контексте — так и скажи.\n"
+    "В конце ответа обязательно укажи названия файлов и страницы, "
+    "на которые опирается твой ответ."
+)
+
+NO_CONTEXT_ANSWER = "В моей базе данных нет релевантной информации."
+
+
+@dataclass
+class _PreparedAnswer:
+    instructions: str
+    input_text: str
+    context: str
+
+
+@dataclass
+class _AnswerPlan:
+    cache_key: str
+    cached: tuple[str, str] | None = None
+    prepared: _PreparedAnswer | None = None
+
+
+async def _search(
+    vector_store_id: str,
+    query: str,
+    k: int,
+    score_threshold: float,
+) -> list[SearchHit]:
+    hits = await get_backend(vector_store_id).search(vector_store_id, query, k)
+    hits = [h for h in hits if h.score >= score_threshold]
+    hits.sort(key=lambda h: h.score, reverse=True)
+    return hits[:k]
+
+
+def _query_effectively_unchanged(original: str, rewritten: str) -> bool:
+    a = normalize_question(original)
+    b = normalize_question(rewritten)
+    if a == b:
+        return True
+
+    ta, tb = set(a.split()), set(b.split())
+    if not ta or not tb:
+        return False
+    return len(ta & tb) / len(ta | tb) >= settings.RAG_SPECULATIVE_REUSE_JACCARD
+
+
+async def _rewrite(
+    client: AsyncOpenAI,
     question: str,
+    dialog_history: list[dict[str, Any]] | None,
+    chat_id: int | None,
     vector_store_id: str,
-    dialog_history: list[dict[str, Any]] | None = None,
-    temp: float = 0.2,
-    k: int = 30,
-    score_threshold: float = 0.0,
-    prompt: str | None = None,
-) -> tuple[str, str]:
-    if prompt is None:
-        prompt = (
-            "Ты ассистируешь научного сотрудника музейного комплекса Петергоф.\n"
-            "Отвечай строго ТОЛЬКО на основе текста в блоке КОНТЕКСТ.\n"
-            "Блок ИСТОРИЯ ДИАЛОГА используй только для понимания того, к чему относятся "
-            "местоимения, сокращённые ссылки и уточняющие вопросы.\n"
-            "Ничего не выдумывай. Если ответа нет в контексте — так и скажи.\n"
-            "В конце ответа обязательно укажи названия файлов и страницы, "
-            "на которые опирается твой ответ."
+    k: int,
+    score_threshold: float,
+    summary: str | None,
+) -> tuple[str, list[SearchHit] | None]:
+    """Rewrite the question; in speculative mode search the raw one meanwhile.
+
+    Returns the standalone question and the speculative hits (None when
+    no speculative search was made).
+    """
+    if not (
+        settings.RAG_SPECULATIVE_SEARCH
+        and _has_meaningful_history(dialog_history, summary)
+    ):
+        standalone_question = await _rewrite_query(
+            client=client,
+            question=question,
+            dialog_history=dialog_history,
+            chat_id=chat_id,
+            summary=summary,
         )
+        return standalone_question, None
+
+    speculative_stats["launched"] += 1
+    standalone_question, speculative_hits = await asyncio.gather(
+        _rewrite_query(
+            client=client,
+            question=question,
+            dialog_history=dialog_history,
+            chat_id=chat_id,
+            summary=summary,
+        ),
+        _search(vector_store_id, question, k, score_threshold),
+    )
+    return standalone_question, speculative_hits
 
-    client = _make_client()
 
-    standalone_question = await _rewrite_query(
-        client=client,
-        question=question,
-        dialog_history=dialog_history,
+async def _vector_retrieve(
+    vector_store_id: str,
+    question: str,
+    standalone_question: str,
+    speculative_hits: list[SearchHit] | None,
+    k: int,
+    score_threshold: float,
+) -> list[SearchHit]:
+    if speculative_hits is None:
+        return await _search(vector_store_id, standalone_question, k, score_threshold)
+
+    if _query_effectively_unchanged(question, standalone_question):
+        speculative_stats["reused"] += 1
+        return speculative_hits
+
+    speculative_stats["fused"] += 1
+    rewritten_hits = await _search(
+        vector_store_id, standalone_question, k, score_threshold
+    )
+    fused = reciprocal_rank_fusion(
+        [rewritten_hits, speculative_hits], key=lambda h: h.key
     )
+    return fused[:k]
+
 
-    s = await client.vector_stores.search(
-        vector_store_id=vector_store_id,
-        query=standalone_question,
+async def _retrieve(
+    vector_store_id: str,
+    question: str,
+    standalone_question: str,
+    speculative_hits: list[SearchHit] | None,
+    k: int,
+    score_threshold: float,
+    count_fulltext: int,
+    lexical_search: LexicalSearch | None,
+) -> list[SearchHit]:
+    """Vector leg (top k) plus, when given, the full-text leg (top count_fulltext).
+
+    Both legs run concurrently and are merged with reciprocal-rank fusion.
+    """
+    vector_leg = _vector_retrieve(
+        vector_store_id,
+        question,
+        standalone_question,
+        speculative_hits,
+        k,
+        score_threshold,
     )
+    if lexical_search is None or count_fulltext <= 0:
+        return await vector_leg
 
-    hits = list(s.data or [])
-    hits = [
-        h
-        for h in hits
-        if getattr(h, "score", None) is not None and h.score >= score_threshold
-    ]
-    hits.sort(key=lambda h: h.score, reverse=True)
-    hits = hits[:k]
+    vector_hits, lexical_hits = await asyncio.gather(
+        vector_leg, lexical_search(standalone_question, count_fulltext)
+    )
+    return reciprocal_rank_fusion(
+        [vector_hits, lexical_hits[:count_fulltext]], key=lambda h: h.key
+    )
 
-    history_text = _history_to_text(dialog_history)
 
+def _prepare_answer(
+    question: str,
+    hits: list[SearchHit],
+    dialog_history: list[dict[str, Any]] | None,
+    prompt: str | None,
+    summary: str | None,
+) -> _PreparedAnswer | None:
+    """Build the generation input; None when there are no relevant hits."""
     if not hits:
-        return "В моей базе данных нет релевантной информации.", ""
+        return None
 
-    data_for_rag = _build_context_from_hits(hits)
+    history_text = _history_to_text(dialog_history, summary)
+    data_for_rag = _build_context_from_hits(pack_context(hits))
 
-    resp = await client.responses.create(
-        model=f"gpt://{settings.RAG_YANDEX_FOLDER_ID}/{settings.RAG_YANDEX_CLOUD_MODEL}",
-        instructions=prompt,
-        input=(
+    return _PreparedAnswer(
+        instructions=prompt if prompt is not None else _DEFAULT_PROMPT,
+        input_text=(
             f"ИСТОРИЯ ДИАЛОГА:\n{history_text or '[пусто]'}\n\n"
             f"КОНТЕКСТ:\n{data_for_rag}\n\n"
             f"ТЕКУЩИЙ ВОПРОС:\n{question}"
         ),
-        temperature=temp,
-        store=False,
+        context=data_for_rag,
+    )
+
+
+async def _plan_answer(
+    client: AsyncOpenAI,
+    question: str,
+    vector_store_id: str,
+    dialog_history: list[dict[str, Any]] | None,
+    temp: float,
+    k: int,
+    score_threshold: float,
+    prompt: str | None,
+    cache: AnswerCache | None,
+    chat_id: int | None,
+    count_fulltext: int,
+    lexical_search: LexicalSearch | None,
+    summary: str | None,
+) -> _AnswerPlan:
+    """Everything before generation: rewrite, cache lookup, retrieval."""
+    standalone_question, speculative_hits = await _rewrite(
+        client,
+        question,
+        dialog_history,
+        chat_id,
+        vector_store_id,
+        k,
+        score_threshold,
+        summary,
+    )
+
+    if lexical_search is None:
+        count_fulltext = 0
+    plan = _AnswerPlan(
+        cache_key=make_answer_cache_key(
+            vector_store_id,
+            standalone_question,
+            prompt,
+            temp,
+            variant=f"k={k};fulltext={count_fulltext}",
+        )
+    )
+    if cache is not None:
+        plan.cached = await cache.get(plan.cache_key)
+        if plan.cached is not None:
+            return plan
+
+    hits = await _retrieve(
+        vector_store_id,
+        question,
+        standalone_question,
+        speculative_hits,
+        k,
+        score_threshold,
+        count_fulltext,
+        lexical_search,
+    )
+    plan.prepared = _prepare_answer(question, hits, dialog_history, prompt, summary)
+    return plan
+
+
+async def get_answer(
+    question: str,
+    vector_store_id: str,
+    dialog_history: list[dict[str, Any]] | None = None,
+    temp: float = 0.2,
+    k: int = 30,
+    score_threshold: float = 0.0,
+    prompt: str | None = None,
+    cache: AnswerCache | None = None,
+    chat_id: int | None = None,
+    count_fulltext: int = 0,
+    lexical_search: LexicalSearch | None = None,
+    summary: str | None = None,
+) -> tuple[str, str]:
+    client = get_client(YANDEX_ASSISTANT_BASE_URL)
+
+    plan = await _plan_answer(
+        client,
+        question,
+        vector_store_id,
+        dialog_history,
+        temp,
+        k,
+        score_threshold,
+        prompt,
+        cache,
+        chat_id,
+        count_fulltext,
+        lexical_search,
+        summary,
     )
+    if plan.cached is not None:
+        return plan.cached
+
+    if plan.prepared is None:
+        answer, context = NO_CONTEXT_ANSWER, ""
+    else:
+        resp = await client.responses.create(
+            model=f"gpt://{settings.RAG_YANDEX_FOLDER_ID}/{settings.RAG_YANDEX_CLOUD_MODEL}",
+            instructions=plan.prepared.instructions,
+            input=plan.prepared.input_text,
+            temperature=temp,
+            store=False,
+        )
+        answer = (resp.output_text or "").strip()
+        context = plan.prepared.context
+
+    if cache is not None:
+        await cache.set(plan.cache_key, vector_store_id, answer, context)
 
-    answer = (resp.output_text or "").strip()
+    return answer, context
 
-    return answer, data_for_rag
+
+async def stream_answer(
+    question: str,
+    vector_store_id: str,
+    dialog_history: list[dict[str, Any]] | None = None,
+    temp: float = 0.2,
+    k: int = 30,
+    score_threshold: float = 0.0,
+    prompt: str | None = None,
+    cache: AnswerCache | None = None,
+    chat_id: int | None = None,
+    count_fulltext: int = 0,
+    lexical_search: LexicalSearch | None = None,
+    summary: str | None = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """Streaming variant of get_answer.
+
+    Yields ("context", text) once the context is built, then ("delta", text)
+    for every generated piece of the answer. A cached answer is yielded as a
+    single delta.
+    """
+    client = get_client(YANDEX_ASSISTANT_BASE_URL)
+
+    plan = await _plan_answer(
+        client,
+        question,
+        vector_store_id,
+        dialog_history,
+        temp,
+        k,
+        score_threshold,
+        prompt,
+        cache,
+        chat_id,
+        count_fulltext,
+        lexical_search,
+        summary,
+    )
+    if plan.cached is not None:
+        yield "context", plan.cached[1]
+        yield "delta", plan.cached[0]
+        return
+
+    prepared = plan.prepared
+    if prepared is None:
+        yield "context", ""
+        yield "delta", NO_CONTEXT_ANSWER
+        if cache is not None:
+            await cache.set(plan.cache_key, vector_store_id, NO_CONTEXT_ANSWER, "")
+        return
+
+    yield "context", prepared.context
+
+    stream = await client.responses.create(
+        model=f"gpt://{settings.RAG_YANDEX_FOLDER_ID}/{settings.RAG_YANDEX_CLOUD_MODEL}",
+        instructions=prepared.instructions,
+        input=prepared.input_text,
+        temperature=temp,
+        store=False,
+        stream=True,
+    )
+    parts: list[str] = []
+    async for event in stream:
+        if event.type == "response.output_text.delta" and event.delta:
+            parts.append(event.delta)
+            yield "delta", event.delta
+
+    if cache is not None:
+        answer = "".join(parts).strip()
+        await cache.set(plan.cache_key, vector_store_id, answer, prepared.context)
@@ -0,0 +1,204 @@
+"""One loop that waits for all vector stores being built in the process.
+
+Instead of a coroutine per build polling retrieve() every 3 seconds, builds
+are registered with build_poller.watch(); the poller checks all due stores
+of a backend with one build_statuses() call, backs off exponentially (with
+jitter, so workers do not poll in lockstep) and resolves a future when the
+build finishes. Finished builds feed a duration model used for ETAs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from .backends import VectorBackend, get_backend
+from .config import settings
+
+
+@dataclass
+class _Watch:
+    vector_store_id: str
+    file_count: int
+    future: asyncio.Future[str]
+    # None — сборку начали раньше (например, до рестарта), длительность неизвестна
+    started_at: float | None
+    interval: float
+    next_check: float = field(default=0.0)
+
+
+class BuildPoller:
+    """Shared waiter for in_progress vector stores, see module docstring."""
+
+    def __init__(self) -> None:
+        self._watches: dict[str, _Watch] = {}
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        # (число файлов, секунды) последних завершённых сборок
+        self._durations: deque[tuple[int, float]] = deque(
+            maxlen=settings.RAG_POLL_HISTORY
+        )
+        self.requests = 0
+        self.checks = 0
+        self.completed = 0
+        self.failed = 0
+
+    def watch(
+        self, vector_store_id: str, file_count: int, started: bool = True
+    ) -> asyncio.Future[str]:
+        """Future with the final status (completed or failed) of the build.
+
+        `started` — the build was started just now; pass False when resuming
+        a build started earlier, so its duration is not recorded. The future
+        is shared between watchers of one store: wrap it in asyncio.shield
+        before cancelling the wait.
+        """
+        existing = self._watches.get(vector_store_id)
+        if existing is not None:
+            return existing.future
+
+        now = time.monotonic()
+        interval = settings.RAG_POLL_INITIAL_INTERVAL
+        w = _Watch(
+            vector_store_id=vector_store_id,
+            file_count=file_count,
+            future=asyncio.get_running_loop().create_future(),
+            started_at=now if started else None,
+            interval=interval,
+            next_check=now + self._jitter(interval),
+        )
+        self._watches[vector_store_id] = w
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return w.future
+
+    def estimate(self, file_count: int) -> float | None:
+        """Expected build time in seconds for `file_count` files."""
+        if not self._durations:
+            return None
+        counts = [n for n, _ in self._durations]
+        seconds = [s for _, s in self._durations]
+
+        # Время сборки ≈ накладные расходы + время на файл; пока размеры
+        # сборок одинаковые, прямую не построить — считаем пропорционально
+        mean_n = sum(counts) / len(counts)
+        mean_s = sum(seconds) / len(seconds)
+        var_n = sum((n - mean_n) ** 2 for n in counts)
+        if var_n > 0:
+            slope = sum((n - mean_n) * (s - mean_s) for n, s in self._durations) / var_n
+            if slope > 0:
+                return max(0.0, mean_s + slope * (file_count - mean_n))
+        return sum(seconds) / max(1, sum(counts)) * file_count
+
+    def eta(self, vector_store_id: str) -> float | None:
+        """Seconds left until the watched build is expected to finish."""
+        w = self._watches.get(vector_store_id)
+        if w is None:
+            return None
+        total = self.estimate(w.file_count)
+        if total is None:
+            return None
+        if w.started_at is None:
+            return total
+        return max(0.0, total - (time.monotonic() - w.started_at))
+
+    @staticmethod
+    def _jitter(interval: float) -> float:
+        j = settings.RAG_POLL_JITTER
+        return interval * random.uniform(1 - j, 1 + j)
+
+    async def _run(self) -> None:
+        while self._watches:
+            # Забытые ожидания (future отменили) не опрашиваем
+            for vector_store_id, w in list(self._watches.items()):
+                if w.future.done():
+                    del self._watches[vector_store_id]
+
+            now = time.monotonic()
+            due = [w for w in self._watches.values() if w.next_check <= now]
+            if not due:
+                if not self._watches:
+                    break
+                delay = min(w.next_check for w in self._watches.values()) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            # Кто и так скоро на очереди, едет тем же запросом
+            soon = now + settings.RAG_POLL_INITIAL_INTERVAL
+            batch = [w for w in self._watches.values() if w.next_check <= soon]
+            by_backend: dict[VectorBackend, list[_Watch]] = {}
+            for w in batch:
+                by_backend.setdefault(get_backend(w.vector_store_id), []).append(w)
+            await asyncio.gather(
+                *(self._check(b, group) for b, group in by_backend.items())
+            )
+
+    async def _check(self, backend: VectorBackend, group: list[_Watch]) -> None:
+        ids = [w.vector_store_id for w in group]
+        self.requests += 1
+        self.checks += len(ids)
+        try:
+            statuses = await backend.build_statuses(ids)
+        except Exception as e:
+            print(f"poller: status check failed: {e}")
+            statuses = {}
+
+        now = time.monotonic()
+        for w in group:
+            status = statuses.get(w.vector_store_id, "in_progress")
+            if status == "in_progress":
+                w.interval = min(
+                    w.interval * settings.RAG_POLL_BACKOFF,
+                    settings.RAG_POLL_MAX_INTERVAL,
+                )
+                w.next_check = now + self._jitter(w.interval)
+                continue
+            self._finish(w, status, now)
+
+    def _finish(self, w: _Watch, status: str, now: float) -> None:
+        del self._watches[w.vector_store_id]
+        if status == "completed":
+            self.completed += 1
+        else:
+            self.failed += 1
+
+        if w.started_at is not None:
+            elapsed = now - w.started_at
+            if status == "completed":
+                self._durations.append((w.file_count, elapsed))
+            print(f"Vector store {w.vector_store_id}: {status} за {elapsed:.0f} с")
+        else:
+            print(f"Vector store {w.vector_store_id}: {status}")
+
+        if not w.future.done():
+            w.future.set_result(status)
+
+    def stats(self) -> dict[str, float | int | None]:
+        seconds_per_file = None
+        if self._durations:
+            seconds_per_file = round(
+                sum(s for _, s in self._durations)
+                / max(1, sum(n for n, _ in self._durations)),
+                2,
+            )
+        return {
+            "watching": len(self._watches),
+            "requests": self.requests,
+            "checks": self.checks,
+            "completed": self.completed,
+            "failed": self.failed,
+            "builds_recorded": len(self._durations),
+            "seconds_per_file": seconds_per_file,
+        }
+
+
+build_poller = BuildPoller()
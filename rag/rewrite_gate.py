@@ -0,0 +1,100 @@
+"""Cheap local check whether a follow-up question needs an LLM rewrite.
+
+The heuristic is deliberately conservative: when in doubt it asks for a
+rewrite, so the worst case is the old behaviour (one extra LLM call).
+"""
+
+from __future__ import annotations
+
+import re
+
+_TOKEN_RE = re.compile(r"\w+(?:-\w+)*")
+
+# Личные местоимения 3-го лица, указательные слова и наречия, которые
+# почти всегда ссылаются на что-то из предыдущих реплик.
+_ANAPHORA = frozenset(
+    """
+    он она оно они его её ее ему ей им ими их него неё нее нему ней ним ними них нём нем
+    этот эта это эти этого этой этому этим этих этом эту
+    тот та то те того той тому тем тех том ту
+    такой такая такое такие такого такой таким таких таком такую
+    там туда оттуда тут здесь сюда отсюда тогда затем потом позже ранее прежде выше ниже
+    ещё еще тоже также
+    """.split()
+)
+
+# Ссылки на элементы предыдущего ответа: «второй вариант», «последний» и т.п.
+_REFERENCE_PREFIXES = (
+    "перв",
+    "втор",
+    "трет",
+    "последн",
+    "предыдущ",
+    "следующ",
+    "упомянут",
+    "указанн",
+    "вышеупомян",
+    "вышеуказ",
+)
+
+# Частицы, с которых начинаются эллиптические уточнения: «А в каком году?»
+_CONTINUATIONS = frozenset("а и но ну ещё еще также тоже".split())
+
+_STOPWORDS = frozenset(
+    """
+    что кто где когда как какой какая какое какие каких каком каким почему зачем
+    сколько чей чья чьё чье чьи ли же бы был была было были быть есть
+    в во на по с со к ко о об от до из у за над под при про для без через
+    и а но или да не ни ну тоже также всё все весь вся
+    мне меня мой моя моё мое мои ты тебя вы вас я мы нас
+    расскажи расскажите скажи скажите подскажи подскажите покажи найди
+    """.split()
+)
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _content_words(tokens: list[str]) -> list[str]:
+    return [t for t in tokens if len(t) > 2 and t not in _STOPWORDS]
+
+
+def _has_reference(tokens: list[str]) -> bool:
+    for t in tokens:
+        if t in _ANAPHORA:
+            return True
+        if t.startswith(_REFERENCE_PREFIXES) and len(t) <= 12:
+            return True
+    return False
+
+
+def needs_rewrite(question: str, previous_turn: str | None) -> bool:
+    """Decide whether `question` depends on the dialog history.
+
+    - pronouns / deictic words → rewrite, unless the question itself
+      restates a content word of the previous turn and is long enough
+      to stand on its own;
+    - an elliptical follow-up («А в каком году?», «Почему?») → rewrite;
+    - otherwise the question is treated as self-contained.
+    """
+    if not previous_turn:
+        return False
+
+    tokens = _tokens(question)
+    if not tokens:
+        return False
+
+    content = _content_words(tokens)
+
+    if tokens[0] in _CONTINUATIONS and len(content) <= 3:
+        return True
+    if len(content) <= 1:
+        return True
+
+    if not _has_reference(tokens):
+        return False
+
+    previous = {t for t in _content_words(_tokens(previous_turn)) if len(t) > 3}
+    restates_previous = any(t in previous for t in content)
+    return not (restates_previous and len(content) >= 3)
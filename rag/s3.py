@@ -0,0 +1,428 @@
+"""Async S3 client on httpx with SigV4 signing.
+
+One long-lived AsyncS3 per credentials (see get_s3) keeps a pool of
+keep-alive connections; a semaphore bounds concurrent requests so a burst
+of ingestion does not open hundreds of sockets. Bodies are streamed, GETs
+can be ranged. Used by rag.upload_file and app.core.s3 instead of boto3
+calls in threads; presigning is pure computation and needs no client.
+
+Requests are signed here with hashlib/hmac; botocore (~130 ms to import)
+is loaded only for presigned URLs, which the upload trigger never makes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+import httpx
+
+from .config import settings
+
+_S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+# Предел DeleteObjects в S3 API
+DELETE_BATCH = 1000
+# Заголовки, которые прокси и клиент могут менять по дороге (как в botocore)
+_UNSIGNED_HEADERS = frozenset({"expect", "user-agent", "x-amzn-trace-id"})
+
+
+class S3Error(Exception):
+    def __init__(self, status_code: int, body: str) -> None:
+        super().__init__(f"S3 {status_code}: {body[:300]}")
+        self.status_code = status_code
+
+
+class AsyncS3:
+    def __init__(
+        self,
+        endpoint_url: str,
+        access_key: str,
+        secret_key: str,
+        region: str | None = None,
+    ) -> None:
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.region = region or settings.RAG_S3_REGION
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._signing_key: tuple[str, bytes] | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore = asyncio.Semaphore(settings.RAG_S3_CONCURRENCY)
+        self._latencies: deque[float] = deque(maxlen=1000)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.RAG_S3_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.RAG_S3_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RAG_S3_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def url(self, bucket: str, key: str) -> str:
+        return f"{self.endpoint_url}/{bucket}/{quote(key, safe='/~')}"
+
+    @staticmethod
+    def _query(params: dict[str, str]) -> str:
+        return "&".join(
+            f"{quote(k, safe='')}={quote(v, safe='')}" for k, v in params.items()
+        )
+
+    def _key_for(self, date: str) -> bytes:
+        # Ключ подписи зависит только от даты: считаем раз в сутки
+        if self._signing_key is None or self._signing_key[0] != date:
+            key = ("AWS4" + self._secret_key).encode()
+            for part in (date, self.region, "s3", "aws4_request"):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self._signing_key = (date, key)
+        return self._signing_key[1]
+
+    def _signed_headers(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> dict[str, str]:
+        """`headers` plus the SigV4 Authorization headers for the request."""
+        parts = urlsplit(url)
+        host = parts.netloc
+        if (parts.scheme, parts.port) in (("http", 80), ("https", 443)):
+            host = parts.hostname or host
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+
+        signed = dict(headers or {})
+        signed["X-Amz-Date"] = amz_date
+        signed["X-Amz-Content-SHA256"] = hashlib.sha256(body).hexdigest()
+
+        canonical_headers = {"host": host}
+        for name, value in signed.items():
+            if name.lower() not in _UNSIGNED_HEADERS:
+                canonical_headers[name.lower()] = " ".join(value.split())
+        header_names = sorted(canonical_headers)
+        query = sorted(
+            tuple(pair.partition("=")[::2]) for pair in parts.query.split("&") if pair
+        )
+        canonical_request = "\n".join(
+            [
+                method.upper(),
+                parts.path or "/",
+                "&".join(f"{k}={v}" for k, v in query),
+                "".join(f"{n}:{canonical_headers[n]}\n" for n in header_names),
+                ";".join(header_names),
+                signed["X-Amz-Content-SHA256"],
+            ]
+        )
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        signature = hmac.new(
+            self._key_for(date), string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+        signed["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self._access_key}/{scope}, "
+            f"SignedHeaders={';'.join(header_names)}, Signature={signature}"
+        )
+        return signed
+
+    def presign(
+        self,
+        method: str,
+        bucket: str,
+        key: str,
+        expires_in: int,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> str:
+        """Presigned URL; `headers` must then be sent by the client as is."""
+        from botocore.auth import S3SigV4QueryAuth
+        from botocore.awsrequest import AWSRequest
+        from botocore.credentials import Credentials
+
+        url = self.url(bucket, key)
+        if params:
+            url += "?" + self._query(params)
+        request = AWSRequest(method=method, url=url, headers=headers or {})
+        S3SigV4QueryAuth(
+            Credentials(self._access_key, self._secret_key),
+            "s3",
+            self.region,
+            expires=expires_in,
+        ).add_auth(request)
+        presigned: str = request.url
+        return presigned
+
+    @asynccontextmanager
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> AsyncIterator[httpx.Response]:
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            started = time.perf_counter()
+            try:
+                request = self.client.build_request(
+                    method,
+                    url,
+                    headers=self._signed_headers(method, url, headers, body),
+                    content=body or None,
+                )
+                response = await self.client.send(request, stream=True)
+                try:
+                    if response.status_code >= 300:
+                        text = (await response.aread()).decode("utf-8", "replace")
+                        raise S3Error(response.status_code, text)
+                    yield response
+                finally:
+                    await response.aclose()
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self._latencies.append(time.perf_counter() - started)
+                self.bytes_written += len(body)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        bucket: str,
+        key: str,
+        start: int | None = None,
+        end: int | None = None,
+        chunk_size: int = 64 * 1024,
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        """Body of an object (bytes start..end inclusive if given) in chunks."""
+        headers = {}
+        if start is not None or end is not None:
+            headers["Range"] = f"bytes={start or 0}-{'' if end is None else end}"
+
+        async with self._request("GET", self.url(bucket, key), headers) as response:
+
+            async def chunks() -> AsyncIterator[bytes]:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    self.bytes_read += len(chunk)
+                    yield chunk
+
+            yield chunks()
+
+    async def get_bytes(
+        self,
+        bucket: str,
+        key: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> bytes:
+        buf = bytearray()
+        async with self.stream(bucket, key, start, end) as chunks:
+            async for chunk in chunks:
+                buf += chunk
+        return bytes(buf)
+
+    async def put_bytes(
+        self, bucket: str, key: str, data: bytes, content_type: str | None = None
+    ) -> None:
+        headers = {"Content-Type": content_type} if content_type else {}
+        async with self._request("PUT", self.url(bucket, key), headers, data):
+            pass
+
+    async def list_keys(self, bucket: str, prefix: str = "") -> AsyncIterator[str]:
+        """Keys under `prefix`, page by page (ListObjectsV2)."""
+        async for key, _ in self.list_objects(bucket, prefix):
+            yield key
+
+    async def list_objects(
+        self, bucket: str, prefix: str = ""
+    ) -> AsyncIterator[tuple[str, datetime]]:
+        """(key, LastModified) under `prefix`, page by page (ListObjectsV2)."""
+        params = {"list-type": "2", "prefix": prefix}
+        while True:
+            url = f"{self.endpoint_url}/{bucket}?{self._query(params)}"
+            async with self._request("GET", url) as response:
+                result = ElementTree.fromstring(await response.aread())
+            for obj in result.iterfind(f"{_S3_NS}Contents"):
+                key = obj.findtext(f"{_S3_NS}Key")
+                modified = obj.findtext(f"{_S3_NS}LastModified")
+                if key and modified:
+                    yield key, datetime.fromisoformat(modified)
+            token = result.findtext(f"{_S3_NS}NextContinuationToken")
+            if result.findtext(f"{_S3_NS}IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    async def delete_objects(self, bucket: str, keys: list[str]) -> list[str]:
+        """DeleteObjects, DELETE_BATCH keys per request; returns failed keys."""
+        failed: list[str] = []
+        for i in range(0, len(keys), DELETE_BATCH):
+            batch = keys[i : i + DELETE_BATCH]
+            root = ElementTree.Element("Delete")
+            ElementTree.SubElement(root, "Quiet").text = "true"
+            for key in batch:
+                obj = ElementTree.SubElement(root, "Object")
+                ElementTree.SubElement(obj, "Key").text = key
+            body = ElementTree.tostring(root, encoding="utf-8", xml_declaration=True)
+            headers = {
+                "Content-Type": "application/xml",
+                "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode(),
+            }
+            try:
+                async with self._request(
+                    "POST", f"{self.endpoint_url}/{bucket}?delete", headers, body
+                ) as response:
+                    result = ElementTree.fromstring(await response.aread())
+            except (S3Error, httpx.HTTPError) as e:
+                print(f"s3: delete_objects failed: {e}")
+                failed.extend(batch)
+                continue
+            for err in result.iter(f"{_S3_NS}Error"):
+                key_el = err.find(f"{_S3_NS}Key")
+                if key_el is not None and key_el.text:
+                    failed.append(key_el.text)
+        return failed
+
+    def _upload_url(self, bucket: str, key: str, params: dict[str, str]) -> str:
+        return f"{self.url(bucket, key)}?{self._query(params)}"
+
+    async def create_multipart_upload(
+        self, bucket: str, key: str, content_type: str | None = None
+    ) -> str:
+        """CreateMultipartUpload; returns the UploadId."""
+        headers = {"Content-Type": content_type} if content_type else {}
+        url = self._upload_url(bucket, key, {"uploads": ""})
+        async with self._request("POST", url, headers) as response:
+            result = ElementTree.fromstring(await response.aread())
+        upload_id = result.findtext(f"{_S3_NS}UploadId")
+        if not upload_id:
+            raise S3Error(response.status_code, "no UploadId in response")
+        return upload_id
+
+    async def list_parts(
+        self, bucket: str, key: str, upload_id: str
+    ) -> list[tuple[int, str, int]]:
+        """(part number, ETag, size) of uploaded parts, page by page (ListParts)."""
+        params = {"uploadId": upload_id}
+        parts = []
+        while True:
+            url = self._upload_url(bucket, key, params)
+            async with self._request("GET", url) as response:
+                result = ElementTree.fromstring(await response.aread())
+            for part in result.iterfind(f"{_S3_NS}Part"):
+                parts.append(
+                    (
+                        int(part.findtext(f"{_S3_NS}PartNumber") or 0),
+                        part.findtext(f"{_S3_NS}ETag") or "",
+                        int(part.findtext(f"{_S3_NS}Size") or 0),
+                    )
+                )
+            marker = result.findtext(f"{_S3_NS}NextPartNumberMarker")
+            if result.findtext(f"{_S3_NS}IsTruncated") != "true" or not marker:
+                return parts
+            params["part-number-marker"] = marker
+
+    async def complete_multipart_upload(
+        self, bucket: str, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        """CompleteMultipartUpload from (part number, ETag) pairs."""
+        root = ElementTree.Element("CompleteMultipartUpload")
+        for number, etag in sorted(parts):
+            part = ElementTree.SubElement(root, "Part")
+            ElementTree.SubElement(part, "PartNumber").text = str(number)
+            ElementTree.SubElement(part, "ETag").text = etag
+        body = ElementTree.tostring(root, encoding="utf-8", xml_declaration=True)
+        url = self._upload_url(bucket, key, {"uploadId": upload_id})
+        headers = {"Content-Type": "application/xml"}
+        async with self._request("POST", url, headers, body) as response:
+            text = (await response.aread()).decode("utf-8", "replace")
+        # Ошибка сборки может прийти и с кодом 200 — в теле <Error>
+        if text.strip() and ElementTree.fromstring(text).tag == "Error":
+            raise S3Error(response.status_code, text)
+
+    async def abort_multipart_upload(
+        self, bucket: str, key: str, upload_id: str
+    ) -> None:
+        url = self._upload_url(bucket, key, {"uploadId": upload_id})
+        async with self._request("DELETE", url):
+            pass
+
+    def stats(self) -> dict[str, float | int | None]:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[int(p * (len(latencies) - 1))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "concurrency_limit": settings.RAG_S3_CONCURRENCY,
+            "max_connections": settings.RAG_S3_MAX_CONNECTIONS,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "latency_p50_ms": pct(0.5),
+            "latency_p95_ms": pct(0.95),
+        }
+
+
+_instances: dict[str, AsyncS3] = {}
+
+
+def get_s3(name: str, endpoint_url: str, access_key: str, secret_key: str) -> AsyncS3:
+    """Shared AsyncS3 registered under `name`, created on first use."""
+    s3 = _instances.get(name)
+    if s3 is None:
+        s3 = AsyncS3(endpoint_url, access_key, secret_key)
+        _instances[name] = s3
+    return s3
+
+
+def rag_s3() -> AsyncS3:
+    """Client for the ingestion bucket (RAG_* settings)."""
+    return get_s3(
+        "rag",
+        settings.RAG_S3_ENDPOINT_URL,
+        settings.RAG_ACCESS_KEY,
+        settings.RAG_SECRET_KEY,
+    )
+
+
+async def aclose_all() -> None:
+    for s3 in _instances.values():
+        await s3.aclose()
+
+
+def stats() -> dict[str, dict[str, float | int | None]]:
+    return {name: s3.stats() for name, s3 in _instances.items()}
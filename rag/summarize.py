@@ -0,0 +1,36 @@
+from typing import Any
+
+from .clients import YANDEX_ASSISTANT_BASE_URL, get_client
+from .config import settings
+
+_INSTRUCTIONS = (
+    "Ты ведёшь краткое содержание диалога научного сотрудника музейного "
+    "комплекса Петергоф с ассистентом.\n"
+    "Дополни текущее краткое содержание новыми репликами.\n"
+    "Сохрани темы, имена, даты, названия объектов и документов, о которых шла "
+    "речь, и выводы ассистента — всё, на что пользователь может сослаться позже.\n"
+    "Пиши сжато, без вступлений, не длиннее 15 предложений."
+)
+
+
+async def summarize_dialog(summary: str | None, turns: list[dict[str, Any]]) -> str:
+    """Fold `turns` ({"role", "content"}) into the rolling chat summary."""
+    lines = []
+    for t in turns:
+        speaker = "Пользователь" if t["role"] == "user" else "Ассистент"
+        lines.append(f"{speaker}: {t['content']}")
+
+    input_text = (
+        f"ТЕКУЩЕЕ КРАТКОЕ СОДЕРЖАНИЕ:\n{summary or '[пусто]'}\n\n"
+        f"НОВЫЕ РЕПЛИКИ:\n" + "\n".join(lines)
+    )
+
+    client = get_client(YANDEX_ASSISTANT_BASE_URL)
+    resp = await client.responses.create(
+        model=f"gpt://{settings.RAG_YANDEX_FOLDER_ID}/{settings.RAG_YANDEX_CLOUD_MODEL}",
+        instructions=_INSTRUCTIONS,
+        input=input_text,
+        temperature=0.0,
+        store=False,
+    )
+    return (resp.output_text or "").strip() or (summary or "")
@@ -0,0 +1,112 @@
+"""Entry point of the upload trigger (S3 event → rag.upload_file).
+
+The function instance is reused between invocations, so everything that
+is expensive is done once per instance: settings are parsed on import of
+rag.config, the S3 and Yandex clients live in module-level registries
+(rag.s3, rag.clients) and keep their connection pools, and the event loop
+they are bound to is kept here rather than recreated by asyncio.run.
+
+Import is kept light for the cold start: the OpenAI SDK is imported by
+upload_file in a thread while the OCR JSON is being read, botocore is not
+needed at all. benchmarks/test_trigger_coldstart.py watches both.
+
+Handler: rag.trigger.handler
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import traceback
+from typing import Any
+
+import httpx
+
+from .config import settings
+from .upload_file import upload_file
+
+_loop: asyncio.AbstractEventLoop | None = None
+_status_client: httpx.AsyncClient | None = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def _status_http() -> httpx.AsyncClient:
+    global _status_client
+    if _status_client is None:
+        _status_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0))
+    return _status_client
+
+
+def object_keys(event: dict[str, Any]) -> list[str]:
+    """Object keys of an Object Storage trigger event."""
+    keys = []
+    for message in event.get("messages") or []:
+        key = (message.get("details") or {}).get("object_id")
+        if key:
+            keys.append(key)
+    return keys
+
+
+async def report_status(key: str, status: str, **fields: Any) -> None:
+    """PATCH /files/by-key/status of the backend, if RAG_TRIGGER_STATUS_URL is set.
+
+    A failed report is logged and not raised: the chunks are already
+    uploaded, and the status can be fixed by a batch re-ingestion.
+    """
+    if not settings.RAG_TRIGGER_STATUS_URL:
+        return
+    headers = {}
+    if settings.RAG_TRIGGER_SERVICE_KEY:
+        headers["X-Service-Key"] = settings.RAG_TRIGGER_SERVICE_KEY
+    try:
+        response = await _status_http().patch(
+            settings.RAG_TRIGGER_STATUS_URL,
+            json={"system_key": key, "status": status, **fields},
+            headers=headers,
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"trigger: status {status} for {key} not reported: {e}")
+
+
+async def process_key(key: str) -> dict[str, Any]:
+    try:
+        result = await upload_file(
+            key,
+            window_chars=settings.RAG_TRIGGER_WINDOW_CHARS,
+            overlap_chars=settings.RAG_TRIGGER_OVERLAP_CHARS,
+        )
+    except Exception as e:
+        traceback.print_exc()
+        await report_status(key, "error", error_message=str(e)[:500])
+        return {"s3_key": key, "error": str(e)}
+
+    await report_status(
+        key,
+        "indexed",
+        rag_file_id=result["file_id"],
+        rag_upload_name=result["upload_name"],
+        rag_chunks_count=result["chunks_count"],
+        rag_window_chars=settings.RAG_TRIGGER_WINDOW_CHARS,
+        rag_overlap_chars=settings.RAG_TRIGGER_OVERLAP_CHARS,
+    )
+    return result
+
+
+async def handle_event(event: dict[str, Any]) -> list[dict[str, Any]]:
+    return list(await asyncio.gather(*(process_key(k) for k in object_keys(event))))
+
+
+def handler(event: dict[str, Any], context: Any = None) -> dict[str, Any]:
+    results = _event_loop().run_until_complete(handle_event(event))
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"results": results}, ensure_ascii=False),
+    }
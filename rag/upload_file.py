@@ -5,33 +5,43 @@ import io
 import json
 import os
 import re
-from typing import TYPE_CHECKING, Any, Dict, List, Tuple, cast
+import tempfile
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Iterable, Iterator
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Tuple, cast
 
-import boto3
-import openai
+from .config import settings
+from .json_stream import ArrayFieldMissing, iter_array_items
+from .s3 import rag_s3
 
 if TYPE_CHECKING:
-    from mypy_boto3_s3 import S3Client
-from openai import AsyncOpenAI
+    from openai import AsyncOpenAI
 
-from .config import settings
+# OpenAI SDK здесь не импортируется: модуль грузит триггер загрузки
+# (rag.trigger), и SDK нужен ему только к моменту загрузки JSONL
+# (клиент — из rag.clients.get_client)
 
 
-def make_s3_client() -> S3Client:
-    return boto3.client(
-        "s3",
-        endpoint_url=settings.RAG_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.RAG_ACCESS_KEY,
-        aws_secret_access_key=settings.RAG_SECRET_KEY,
-    )
+async def s3_get_bytes(key: str) -> bytes:
+    return await rag_s3().get_bytes(settings.RAG_BUCKET_NAME, key)
 
 
-async def s3_get_bytes(s3_client: S3Client, key: str) -> bytes:
-    def _sync() -> bytes:
-        obj = s3_client.get_object(Bucket=settings.RAG_BUCKET_NAME, Key=key)
-        return obj["Body"].read()
+def _ocr_item(item: Any) -> Tuple[int, str] | None:
+    """(page, text) of one element of OCR `data`, None if it has neither."""
+    if not isinstance(item, dict):
+        return None
+    if "page" not in item:
+        return None
 
-    return await asyncio.to_thread(_sync)
+    try:
+        page = int(item["page"])
+    except Exception:
+        return None
+
+    text = str(item.get("text", "") or "").strip()
+    if not text:
+        return None
+    return page, text
 
 
 def parse_pages_from_bytes(data: bytes, key: str) -> List[Dict[str, Any]]:
@@ -45,38 +55,59 @@ def parse_pages_from_bytes(data: bytes, key: str) -> List[Dict[str, Any]]:
             f"Неожиданный формат файла {key}. Ожидал dict с полем 'data' (list)."
         )
 
-    merged: List[Dict[str, Any]] = []
-
+    # Куски текста страницы собираем в список и склеиваем один раз
+    by_page: Dict[int, List[str]] = {}
     for item in obj["data"]:
-        if not isinstance(item, dict):
-            continue
-        if "page" not in item:
-            continue
+        parsed = _ocr_item(item)
+        if parsed is not None:
+            by_page.setdefault(parsed[0], []).append(parsed[1])
 
-        try:
-            page = int(item["page"])
-        except Exception:
-            continue
+    return [
+        {"page": page, "text": "\n".join(parts).strip()}
+        for page, parts in sorted(by_page.items())
+    ]
 
-        text = str(item.get("text", "") or "").strip()
-        if not text:
-            continue
 
-        if merged and merged[-1]["page"] == page:
-            merged[-1]["text"] = (merged[-1]["text"] + "\n" + text).strip()
-        else:
-            merged.append({"page": page, "text": text})
+class PagesOutOfOrder(Exception):
+    """OCR blocks of a page came after a later page: can't stream them."""
 
-    by_page: Dict[int, List[str]] = {}
-    for p in merged:
-        by_page.setdefault(p["page"], []).append(p["text"])
 
-    pages = [
-        {"page": page, "text": "\n".join(parts).strip()}
-        for page, parts in by_page.items()
-    ]
-    pages.sort(key=lambda x: cast(int, x["page"]))
-    return pages
+async def aiter_ocr_pages(
+    chunks: AsyncIterator[bytes], key: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """parse_pages_from_bytes over a byte stream, one page at a time.
+
+    Blocks of a page are joined as soon as the next page starts, so the
+    OCR must list pages in ascending order (it does); otherwise
+    PagesOutOfOrder is raised and the caller parses the whole object.
+    """
+    page: int | None = None
+    parts: List[str] = []
+    try:
+        async for item in iter_array_items(chunks, "data"):
+            parsed = _ocr_item(item)
+            if parsed is None:
+                continue
+            if parsed[0] == page:
+                parts.append(parsed[1])
+                continue
+            if page is not None:
+                if parsed[0] < page:
+                    raise PagesOutOfOrder(f"{key}: page {parsed[0]} after {page}")
+                yield {"page": page, "text": "\n".join(parts).strip()}
+            page, parts = parsed[0], [parsed[1]]
+    except ArrayFieldMissing:
+        raise ValueError(
+            f"Неожиданный формат файла {key}. Ожидал dict с полем 'data' (list)."
+        )
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Не удалось распарсить JSON из {key}: {e}")
+    if page is not None:
+        yield {"page": page, "text": "\n".join(parts).strip()}
+
+
+# Метка страницы в размеченном тексте: (начало, конец, номер страницы)
+PageMarker = Tuple[int, int, int]
 
 
 def build_marked_text(pages: List[Dict[str, Any]]) -> str:
@@ -88,34 +119,26 @@ def build_marked_text(pages: List[Dict[str, Any]]) -> str:
     return "\n".join(parts).strip() + "\n"
 
 
-def _extract_page_markers_with_pos(text: str) -> List[Tuple[int, int]]:
-    markers: List[Tuple[int, int]] = []
-    for m in settings.RAG_PAGE_MARK_RE.finditer(text):
-        markers.append((m.start(), int(m.group(1))))
-    return markers
+def _extract_page_markers(text: str) -> List[PageMarker]:
+    return [
+        (m.start(), m.end(), int(m.group(1)))
+        for m in settings.RAG_PAGE_MARK_RE.finditer(text)
+    ]
 
 
-def _pages_for_slice(markers: List[Tuple[int, int]], start: int, end: int) -> List[int]:
+def _pages_for_slice(markers: List[PageMarker], lo: int, hi: int) -> List[int]:
+    """Pages of markers[lo:hi] (those starting inside the window) or, if
+    there are none, the page of the last marker before the window."""
     pages_in: List[int] = []
     seen = set()
-
-    for pos, page in markers:
-        if start <= pos < end:
-            if page not in seen:
-                seen.add(page)
-                pages_in.append(page)
+    for _pos, _end, page in markers[lo:hi]:
+        if page not in seen:
+            seen.add(page)
+            pages_in.append(page)
 
     if pages_in:
         return pages_in
-
-    last_page = None
-    for pos, page in markers:
-        if pos < start:
-            last_page = page
-        else:
-            break
-
-    return [last_page] if last_page is not None else []
+    return [markers[lo - 1][2]] if lo > 0 else []
 
 
 def _pages_header(pages: List[int]) -> str:
@@ -126,29 +149,205 @@ def _pages_header(pages: List[int]) -> str:
     return f"PAGES: {pages[0]}-{pages[-1]}"
 
 
-def _strip_page_markers(fragment: str) -> str:
-    cleaned = settings.RAG_PAGE_MARK_REMOVE_RE.sub("\n", fragment)
+def _strip_page_markers(
+    text: str, start: int, end: int, markers: List[PageMarker], base: int = 0
+) -> str:
+    """Marked text [start:end] without the markers that lie wholly inside it.
+
+    `text` holds the marked text from offset `base` on.
+
+    Same result as substituting RAG_PAGE_MARK_REMOVE_RE with "\n": the
+    whitespace around each marker goes with it. A marker cut by the window
+    edge does not match that regex and stays as text.
+    """
+    pieces = []
+    cursor = start
+    for pos, mark_end, _page in markers:
+        if mark_end > end:
+            break
+        pieces.append(text[cursor - base : pos - base])
+        cursor = mark_end
+    pieces.append(text[cursor - base : end - base])
+
+    if len(pieces) == 1:
+        cleaned = pieces[0]
+    else:
+        cleaned = "\n".join(
+            [
+                pieces[0].rstrip(),
+                *(piece.strip() for piece in pieces[1:-1]),
+                pieces[-1].lstrip(),
+            ]
+        )
     # нормализуем лишние пустые строки
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    if "\n\n\n" in cleaned:
+        cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
     return cleaned.strip()
 
 
-def chunk_text_window_overlap(
-    marked_text: str,
-    window_chars: int,
-    overlap_chars: int,
-) -> List[Dict[str, str]]:
+def _check_window(window_chars: int, overlap_chars: int) -> int:
+    """Validate the window; returns its effective size."""
     if window_chars <= 0:
         raise ValueError("window_chars должен быть > 0")
     if overlap_chars < 0:
         raise ValueError("overlap_chars должен быть >= 0")
     if overlap_chars >= window_chars:
         raise ValueError("overlap_chars должен быть < window_chars")
+    return min(window_chars, settings.RAG_MAX_CHUNK_LEN)
+
+
+def _marker_pos(marker: PageMarker) -> int:
+    return marker[0]
+
+
+def _window_chunk(
+    text: str, start: int, end: int, markers: List[PageMarker], base: int = 0
+) -> Dict[str, str] | None:
+    """Chunk of the marked text [start:end], None if it has no text.
+
+    Markers are sorted by offset, so the ones inside the window are found
+    with bisect: O(log m) per window instead of a scan over all markers.
+    """
+    lo = bisect_left(markers, start, key=_marker_pos)
+    hi = bisect_left(markers, end, lo, key=_marker_pos)
+    cleaned_fragment = _strip_page_markers(text, start, end, markers[lo:hi], base)
+    if not cleaned_fragment:
+        return None
+
+    pages = _pages_for_slice(markers, lo, hi)
+    header = _pages_header(pages)
+
+    body = f"{header}\n{cleaned_fragment}".strip()
+
+    if len(body) > settings.RAG_MAX_CHUNK_LEN:
+        allowed = settings.RAG_MAX_CHUNK_LEN - len(header) - 1
+        trimmed = cleaned_fragment[: max(0, allowed)].rstrip()
+        body = f"{header}\n{trimmed}".strip()
+
+    return {"body": body}
+
+
+class StreamingChunker:
+    """chunk_pages fed one page at a time.
+
+    Holds the marked text only from the current window on, plus the last
+    marker before it, so memory does not grow with the document. A window
+    is emitted once text past its end is known not to be trailing
+    whitespace (the marked text is stripped at the end).
+    """
+
+    def __init__(self, window_chars: int, overlap_chars: int) -> None:
+        self.window_chars = _check_window(window_chars, overlap_chars)
+        self.step = self.window_chars - overlap_chars
+        self._text = ""  # размеченный текст с позиции _base
+        self._base = 0
+        self._markers: List[PageMarker] = []
+        self._last_solid = -1  # позиция последнего непробельного символа
+        self._start = 0
+        self._pages = 0
+
+    def feed(self, page: Dict[str, Any]) -> Iterator[Dict[str, str]]:
+        p = page["page"]
+        t = page["text"]
+        mark = f"[PAGE {p}]"
+        sep = "\n" if self._pages else ""
+        part = f"{sep}{mark}\n{t}\n"
+        offset = self._base + len(self._text)
+        if "[PAGE" in str(t):
+            # Похожие на метки строки в тексте страницы прежний чанкер
+            # тоже считал метками
+            self._markers.extend(
+                (offset + m.start(), offset + m.end(), int(m.group(1)))
+                for m in settings.RAG_PAGE_MARK_RE.finditer(part)
+            )
+        else:
+            pos = offset + len(sep)
+            self._markers.append((pos, pos + len(mark), int(p)))
+        self._pages += 1
+        self._text += part
+        solid = len(part.rstrip())
+        if solid:
+            self._last_solid = offset + solid - 1
+
+        while self._last_solid >= self._start + self.window_chars:
+            chunk = _window_chunk(
+                self._text,
+                self._start,
+                self._start + self.window_chars,
+                self._markers,
+                self._base,
+            )
+            if chunk is not None:
+                yield chunk
+            self._start += self.step
+        self._trim()
+
+    def close(self) -> Iterator[Dict[str, str]]:
+        self._text = self._text.rstrip() + "\n"
+        n = self._base + len(self._text)
+        while self._start < n:
+            end = min(self._start + self.window_chars, n)
+            chunk = _window_chunk(
+                self._text, self._start, end, self._markers, self._base
+            )
+            if chunk is not None:
+                yield chunk
+            if end == n:
+                break
+            self._start += self.step
+
+    def _trim(self) -> None:
+        if self._start > self._base:
+            self._text = self._text[self._start - self._base :]
+            self._base = self._start
+        # Последняя метка до окна нужна для заголовка PAGES
+        lo = bisect_left(self._markers, self._start, key=_marker_pos)
+        if lo > 1:
+            del self._markers[: lo - 1]
+
+
+def iter_chunks(
+    pages: Iterable[Dict[str, Any]],
+    window_chars: int,
+    overlap_chars: int,
+) -> Iterator[Dict[str, str]]:
+    chunker = StreamingChunker(window_chars, overlap_chars)
+    for page in pages:
+        yield from chunker.feed(page)
+    yield from chunker.close()
+
+
+async def aiter_chunks(
+    pages: AsyncIterator[Dict[str, Any]],
+    window_chars: int,
+    overlap_chars: int,
+) -> AsyncIterator[Dict[str, str]]:
+    chunker = StreamingChunker(window_chars, overlap_chars)
+    async for page in pages:
+        for chunk in chunker.feed(page):
+            yield chunk
+    for chunk in chunker.close():
+        yield chunk
+
 
-    window_chars = min(window_chars, settings.RAG_MAX_CHUNK_LEN)
+def chunk_pages(
+    pages: List[Dict[str, Any]],
+    window_chars: int,
+    overlap_chars: int,
+) -> List[Dict[str, str]]:
+    """Chunk parsed OCR pages (see parse_pages_from_bytes)."""
+    return list(iter_chunks(pages, window_chars, overlap_chars))
+
+
+def chunk_text_window_overlap(
+    marked_text: str,
+    window_chars: int,
+    overlap_chars: int,
+) -> List[Dict[str, str]]:
+    window_chars = _check_window(window_chars, overlap_chars)
     step = window_chars - overlap_chars
 
-    markers = _extract_page_markers_with_pos(marked_text)
+    markers = _extract_page_markers(marked_text)
 
     chunks: List[Dict[str, str]] = []
     n = len(marked_text)
@@ -157,21 +356,9 @@ def chunk_text_window_overlap(
     while start < n:
         end = min(start + window_chars, n)
 
-        raw_fragment = marked_text[start:end]
-        cleaned_fragment = _strip_page_markers(raw_fragment)
-
-        if cleaned_fragment:
-            pages = _pages_for_slice(markers, start, end)
-            header = _pages_header(pages)
-
-            body = f"{header}\n{cleaned_fragment}".strip()
-
-            if len(body) > settings.RAG_MAX_CHUNK_LEN:
-                allowed = settings.RAG_MAX_CHUNK_LEN - len(header) - 1
-                trimmed = cleaned_fragment[: max(0, allowed)].rstrip()
-                body = f"{header}\n{trimmed}".strip()
-
-            chunks.append({"body": body})
+        chunk = _window_chunk(marked_text, start, end, markers)
+        if chunk is not None:
+            chunks.append(chunk)
 
         if end == n:
             break
@@ -186,6 +373,19 @@ def chunks_to_jsonl_bytes(chunks: List[Dict[str, str]]) -> bytes:
     ).encode("utf-8")
 
 
+def chunks_jsonl_from_bytes(
+    data: bytes, key: str, window_chars: int, overlap_chars: int
+) -> Tuple[bytes, int]:
+    """JSONL of the chunks of an OCR JSON and their count, in one call.
+
+    The CPU-bound part of ingestion; module-level so that batch ingestion
+    (app.core.ingest) can run it in a process pool.
+    """
+    pages = parse_pages_from_bytes(data, key)
+    chunks = chunk_pages(pages, window_chars, overlap_chars)
+    return chunks_to_jsonl_bytes(chunks), len(chunks)
+
+
 def make_upload_name(original_filename: str) -> str:
     base = os.path.basename(original_filename)
     name, _ext = os.path.splitext(base)
@@ -198,54 +398,138 @@ async def upload_chunks_jsonl_bytes(
     upload_name: str,
     expires_seconds: int = 3600,
 ) -> str:
-    bio = io.BytesIO(jsonl_data)
-    bio.name = upload_name
+    return await upload_chunks_jsonl(
+        client, io.BytesIO(jsonl_data), upload_name, expires_seconds
+    )
+
 
+async def upload_chunks_jsonl(
+    client: AsyncOpenAI,
+    jsonl: IO[bytes],
+    upload_name: str,
+    expires_seconds: int = 3600,
+) -> str:
+    """Upload a JSONL file object; httpx reads it into the multipart body
+    piece by piece, so it is never loaded whole."""
     f = await client.files.create(
-        file=(upload_name, bio, "application/jsonlines"),
+        file=(upload_name, jsonl, "application/jsonlines"),
         purpose="assistants",
-        expires_after=openai.types.file_create_params.ExpiresAfter(
-            anchor="created_at",
-            seconds=expires_seconds,
-        ),
+        expires_after={"anchor": "created_at", "seconds": expires_seconds},
         extra_body={"format": "chunks"},
     )
     return cast(str, f.id)
 
 
-async def upload_file(
-    filename: str,
-    window_chars: int = 400,
-    overlap_chars: int = 50,
-) -> Dict[str, Any]:
-    s3_key = (
+def chunks_source_key(filename: str) -> str:
+    """S3 key of the OCR JSON for `filename` (bare name or full key)."""
+    return (
         filename
         if filename.startswith(settings.RAG_CHUNKS_PATH.rstrip("/") + "/")
         else f"{settings.RAG_CHUNKS_PATH.rstrip('/')}/{filename}"
     )
 
-    s3_client = make_s3_client()
-    client = AsyncOpenAI(
-        api_key=settings.RAG_YANDEX_API_KEY,
-        base_url="https://ai.api.cloud.yandex.net/v1",
-        project=settings.RAG_YANDEX_FOLDER_ID,
-    )
 
-    raw = await s3_get_bytes(s3_client, s3_key)
+async def aiter_s3_chunks(
+    s3_key: str,
+    window_chars: int = 400,
+    overlap_chars: int = 50,
+) -> AsyncIterator[Dict[str, str]]:
+    """Chunks of an OCR JSON in S3, read, parsed and chunked as a stream.
+
+    May raise PagesOutOfOrder after some chunks were yielded.
+    """
+    async with rag_s3().stream(
+        settings.RAG_BUCKET_NAME, s3_key, chunk_size=settings.RAG_INGEST_READ_BYTES
+    ) as body:
+        pages = aiter_ocr_pages(body, s3_key)
+        async for chunk in aiter_chunks(pages, window_chars, overlap_chars):
+            yield chunk
+
+
+async def _load_chunks_in_memory(
+    s3_key: str, window_chars: int, overlap_chars: int
+) -> List[Dict[str, str]]:
+    raw = await s3_get_bytes(s3_key)
     pages = parse_pages_from_bytes(raw, s3_key)
+    return chunk_pages(pages, window_chars, overlap_chars)
+
+
+async def load_chunks(
+    filename: str,
+    window_chars: int = 400,
+    overlap_chars: int = 50,
+) -> List[Dict[str, str]]:
+    """Read the OCR JSON from S3 and chunk it exactly as upload_file does."""
+    s3_key = chunks_source_key(filename)
+    try:
+        return [c async for c in aiter_s3_chunks(s3_key, window_chars, overlap_chars)]
+    except PagesOutOfOrder as e:
+        print(f"{e}: chunking in memory")
+        return await _load_chunks_in_memory(s3_key, window_chars, overlap_chars)
+
+
+async def spool_chunks_jsonl(
+    s3_key: str,
+    window_chars: int = 400,
+    overlap_chars: int = 50,
+) -> Tuple[IO[bytes], int]:
+    """JSONL of the chunks (as chunks_to_jsonl_bytes) in a temporary file.
+
+    The file stays in memory up to RAG_INGEST_SPOOL_BYTES and goes to disk
+    beyond that. Returns it rewound, with the number of chunks; the caller
+    closes it.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=settings.RAG_INGEST_SPOOL_BYTES)
+    count = 0
+    try:
+        try:
+            async for chunk in aiter_s3_chunks(s3_key, window_chars, overlap_chars):
+                out.write(json.dumps(chunk, ensure_ascii=False).encode("utf-8"))
+                out.write(b"\n")
+                count += 1
+        except PagesOutOfOrder as e:
+            print(f"{e}: chunking in memory")
+            chunks = await _load_chunks_in_memory(s3_key, window_chars, overlap_chars)
+            out.seek(0)
+            out.truncate()
+            out.write(chunks_to_jsonl_bytes(chunks))
+            count = len(chunks)
+        if count == 0:
+            out.write(b"\n")
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return cast(IO[bytes], out), count
+
+
+def _yandex_client() -> AsyncOpenAI:
+    from .clients import get_client
+
+    return get_client()
+
+
+async def upload_file(
+    filename: str,
+    window_chars: int = 400,
+    overlap_chars: int = 50,
+) -> Dict[str, Any]:
+    s3_key = chunks_source_key(filename)
 
-    marked = build_marked_text(pages)
-    chunks = chunk_text_window_overlap(marked, window_chars, overlap_chars)
-    jsonl_data = chunks_to_jsonl_bytes(chunks)
+    # При холодном старте импорт OpenAI SDK идёт в потоке, пока читается S3
+    client_future = asyncio.get_running_loop().run_in_executor(None, _yandex_client)
 
+    jsonl, chunks_count = await spool_chunks_jsonl(s3_key, window_chars, overlap_chars)
     upload_name = make_upload_name(s3_key)
-    file_id = await upload_chunks_jsonl_bytes(client, jsonl_data, upload_name)
+    with jsonl:
+        client = await client_future
+        file_id = await upload_chunks_jsonl(client, jsonl, upload_name)
 
-    print(f"OK: {s3_key} -> chunks={len(chunks)} -> file_id={file_id}")
+    print(f"OK: {s3_key} -> chunks={chunks_count} -> file_id={file_id}")
 
     return {
         "s3_key": s3_key,
         "file_id": file_id,
-        "chunks_count": len(chunks),
+        "chunks_count": chunks_count,
         "upload_name": upload_name,
     }
@@ -0,0 +1,10 @@
+import os
+
+# Обязательные настройки rag.config; тесты в сеть не ходят
+for _name in (
+    "RAG_YANDEX_API_KEY",
+    "RAG_YANDEX_FOLDER_ID",
+    "RAG_ACCESS_KEY",
+    "RAG_SECRET_KEY",
+):
+    os.environ.setdefault(_name, "test")
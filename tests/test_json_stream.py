@@ -0,0 +1,89 @@
+"""rag.json_stream against json.loads, with the stream cut everywhere."""
+
+import asyncio
+import json
+import random
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from rag.json_stream import ArrayFieldMissing, iter_array_items
+
+DOCUMENTS = [
+    b'{"data": [1.5]}',
+    b'{"meta": 2.5, "data": [1]}',
+    b'{"data": [1e10, -2.5E-3, 0, -0, 12345, 6.02e+23], "n": 7}',
+    b'{"data": [true, false, null, "x"], "tail": -1.0}',
+    '{"a": {"b": [1, {"c": "]}"}]}, "data": [{"page": 1, "text": "Опись\\n"},'
+    ' {"page": 2, "text": "\\u043b\\u0438\\u0441\\u0442 \\"2\\""}], "z": 3e2}'.encode(),
+    b' \n{ "data" : [ [ ] , { } , [1, [2.25]] ] } \n',
+    b'{"data": []}',
+    b'{"data": 1, "data": [3.75]}',
+]
+
+
+async def _chunks(data: bytes, sizes: list[int]) -> AsyncIterator[bytes]:
+    pos = 0
+    for size in sizes:
+        yield data[pos : pos + size]
+        pos += size
+    if pos < len(data):
+        yield data[pos:]
+
+
+async def _collect(data: bytes, sizes: list[int]) -> list[Any]:
+    return [item async for item in iter_array_items(_chunks(data, sizes), "data")]
+
+
+def _expected(data: bytes) -> list[Any]:
+    return list(json.loads(data)["data"])
+
+
+@pytest.mark.parametrize("data", DOCUMENTS)
+def test_split_at_every_offset(data: bytes) -> None:
+    expected = _expected(data)
+    for cut in range(len(data) + 1):
+        assert asyncio.run(_collect(data, [cut])) == expected, cut
+
+
+@pytest.mark.parametrize("data", DOCUMENTS)
+def test_byte_by_byte(data: bytes) -> None:
+    assert asyncio.run(_collect(data, [1] * len(data))) == _expected(data)
+
+
+def test_random_small_chunks() -> None:
+    rnd = random.Random(0)
+    for _ in range(300):
+        items = [
+            rnd.choice(
+                [
+                    rnd.randint(-(10**6), 10**6),
+                    rnd.uniform(-1e6, 1e6),
+                    rnd.random() * 10 ** rnd.randint(-30, 30),
+                    {"page": rnd.randint(1, 99), "text": "страница " * 3},
+                    [rnd.random(), None, True],
+                ]
+            )
+            for _ in range(rnd.randint(0, 6))
+        ]
+        doc = {"meta": rnd.uniform(-5, 5), "data": items, "after": rnd.random()}
+        data = json.dumps(doc, ensure_ascii=rnd.random() < 0.5).encode()
+        sizes = [rnd.randint(1, 7) for _ in range(len(data))]
+        assert asyncio.run(_collect(data, sizes)) == _expected(data)
+
+
+@pytest.mark.parametrize(
+    "data", [b"[1, 2]", b'{"other": []}', b'{"data": {"x": 1}}', b'{"data": "[]"}']
+)
+def test_missing_field(data: bytes) -> None:
+    with pytest.raises(ArrayFieldMissing):
+        asyncio.run(_collect(data, [3]))
+
+
+@pytest.mark.parametrize(
+    "data", [b'{"data": [1 2]}', b'{"data": [1,', b'{"data": []} x', b'{"data" [1]}']
+)
+def test_malformed(data: bytes) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        asyncio.run(_collect(data, [2]))
@@ -0,0 +1,78 @@
+"""rag.backends.local round trip with an offline embedder and chunk loader."""
+
+import asyncio
+import re
+from pathlib import Path
+from typing import Literal
+
+import pytest
+
+from rag.backends import get_backend, set_backend
+from rag.backends.base import LOCAL_STORE_PREFIX
+from rag.backends.local import LocalVectorBackend
+
+VOCABULARY = ["опись", "фонд", "лист", "приказ", "архив", "дело"]
+FILES = {
+    "a.chunks.jsonl": [
+        ("a.chunks.jsonl", "опись фонд опись"),
+        ("a.chunks.jsonl", "лист дело"),
+    ],
+    "b.chunks.jsonl": [("b.chunks.jsonl", "приказ архив приказ")],
+}
+
+
+async def _embed(texts: list[str], kind: Literal["doc", "query"]) -> list[list[float]]:
+    # Мешок слов по словарю: близость векторов — общие слова
+    vectors = []
+    for text in texts:
+        words = re.findall(r"\w+", text.lower())
+        vectors.append([float(words.count(w)) for w in VOCABULARY])
+    return vectors
+
+
+async def _load(file_id: str) -> list[tuple[str, str]]:
+    return FILES[file_id]
+
+
+def test_create_search_delete(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("rag.backends._backends", {})
+    set_backend("local", LocalVectorBackend(tmp_path, _embed, _load))
+
+    async def round_trip() -> None:
+        backend = get_backend(LOCAL_STORE_PREFIX)
+        store_id = await backend.start_create("test", list(FILES))
+        assert store_id.startswith(LOCAL_STORE_PREFIX)
+        assert get_backend(store_id) is backend
+        assert await backend.build_status(store_id) == "completed"
+
+        hits = await backend.search(store_id, "приказ", 2)
+        assert [h.text for h in hits][0] == "приказ архив приказ"
+        assert hits[0].filename == "b.chunks.jsonl"
+        assert hits[0].score == pytest.approx(2 / 5**0.5)
+        assert hits[0].score >= hits[1].score
+
+        hits = await backend.search(store_id, "опись", 10)
+        assert len(hits) == 3
+        assert hits[0].text == "опись фонд опись"
+
+        # Свежий экземпляр читает индекс с диска
+        reopened = LocalVectorBackend(tmp_path, _embed, _load)
+        assert [h.key for h in await reopened.search(store_id, "лист", 1)] == [
+            ("a.chunks.jsonl", "лист дело")
+        ]
+
+        await backend.delete(store_id)
+        assert await backend.build_status(store_id) == "failed"
+        assert not (tmp_path / store_id).exists()
+
+    asyncio.run(round_trip())
+
+
+def test_create_without_chunks(tmp_path: Path) -> None:
+    async def load_nothing(file_id: str) -> list[tuple[str, str]]:
+        return []
+
+    backend = LocalVectorBackend(tmp_path, _embed, load_nothing)
+    with pytest.raises(ValueError):
+        asyncio.run(backend.start_create("empty", ["empty.chunks.jsonl"]))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,198 @@
+"""rag.s3.AsyncS3 requests against an httpx.MockTransport."""
+
+import asyncio
+import base64
+import hashlib
+from collections.abc import Callable
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from xml.etree import ElementTree
+
+import botocore.auth
+import httpx
+import pytest
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
+from botocore.credentials import Credentials
+
+import rag.s3
+from rag.s3 import AsyncS3, S3Error
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def _s3(handler: Handler) -> AsyncS3:
+    s3 = AsyncS3("https://storage.example", "access", "secret", region="ru-central1")
+    s3._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return s3
+
+
+def _query(request: httpx.Request) -> dict[str, list[str]]:
+    return parse_qs(request.url.query.decode(), keep_blank_values=True)
+
+
+def test_multipart_round_trip() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        query = _query(request)
+        if request.method == "POST" and "uploads" in query:
+            return httpx.Response(
+                200,
+                text=f'<InitiateMultipartUploadResult xmlns="{_NS}">'
+                "<UploadId>up-1</UploadId></InitiateMultipartUploadResult>",
+            )
+        if request.method == "GET":
+            # Две страницы ListParts: вторая — после part-number-marker
+            if "part-number-marker" not in query:
+                parts, tail = [(1, 5)], "<IsTruncated>true</IsTruncated>"
+                tail += "<NextPartNumberMarker>1</NextPartNumberMarker>"
+            else:
+                parts, tail = [(2, 3)], "<IsTruncated>false</IsTruncated>"
+            body = "".join(
+                f'<Part><PartNumber>{n}</PartNumber><ETag>"e{n}"</ETag>'
+                f"<Size>{size}</Size></Part>"
+                for n, size in parts
+            )
+            return httpx.Response(
+                200,
+                text=f'<ListPartsResult xmlns="{_NS}">{body}{tail}</ListPartsResult>',
+            )
+        if request.method == "POST":
+            return httpx.Response(
+                200, text=f'<CompleteMultipartUploadResult xmlns="{_NS}"/>'
+            )
+        return httpx.Response(204)
+
+    s3 = _s3(handler)
+
+    async def run() -> None:
+        upload_id = await s3.create_multipart_upload(
+            "b", "incoming/a b.pdf", "application/pdf"
+        )
+        assert upload_id == "up-1"
+        assert await s3.list_parts("b", "incoming/a b.pdf", upload_id) == [
+            (1, '"e1"', 5),
+            (2, '"e2"', 3),
+        ]
+        await s3.complete_multipart_upload(
+            "b", "incoming/a b.pdf", upload_id, [(2, '"e2"'), (1, '"e1"')]
+        )
+        await s3.abort_multipart_upload("b", "incoming/a b.pdf", upload_id)
+
+    asyncio.run(run())
+
+    create, list1, list2, complete, abort = requests
+    assert create.url.raw_path == b"/b/incoming/a%20b.pdf?uploads="
+    assert create.headers["Content-Type"] == "application/pdf"
+    assert _query(list2)["part-number-marker"] == ["1"]
+    assert _query(complete)["uploadId"] == ["up-1"]
+    numbers = [
+        el.text for el in ElementTree.fromstring(complete.content).iter("PartNumber")
+    ]
+    assert numbers == ["1", "2"]
+    assert abort.method == "DELETE" and _query(abort)["uploadId"] == ["up-1"]
+    assert all("Authorization" in r.headers for r in requests)
+
+
+def test_complete_error_in_200_body() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text="<Error><Code>InvalidPart</Code></Error>")
+
+    s3 = _s3(handler)
+    with pytest.raises(S3Error, match="InvalidPart"):
+        asyncio.run(s3.complete_multipart_upload("b", "k", "up-1", [(1, '"e1"')]))
+
+
+_NOW = datetime(2026, 3, 14, 15, 9, 26, tzinfo=timezone.utc)
+_DELETE_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b"<Delete><Quiet>true</Quiet><Object><Key>a.json</Key></Object></Delete>"
+)
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz: object = None) -> "_FrozenDatetime":
+        return cls.fromtimestamp(_NOW.timestamp(), timezone.utc)
+
+
+def _requests(s3: AsyncS3) -> list[tuple[str, str, dict[str, str], bytes]]:
+    """(method, url, headers, body) of the requests AsyncS3 makes."""
+    token = "1ueGcxLPRx1Tr/XYExHnhbYLgveDs2J/wm36Hy4vbOwM=+"
+    return [
+        ("GET", s3.url("bucket", "result/json-files/a.json"), {}, b""),
+        (
+            "GET",
+            s3.url("bucket", "result/json-files/a.json"),
+            {"Range": "bytes=100-"},
+            b"",
+        ),
+        (
+            "GET",
+            f"{s3.endpoint_url}/bucket?"
+            + s3._query(
+                {"list-type": "2", "prefix": "result/", "continuation-token": token}
+            ),
+            {},
+            b"",
+        ),
+        (
+            "POST",
+            f"{s3.endpoint_url}/bucket?delete",
+            {
+                "Content-Type": "application/xml",
+                "Content-MD5": base64.b64encode(
+                    hashlib.md5(_DELETE_BODY).digest()
+                ).decode(),
+            },
+            _DELETE_BODY,
+        ),
+        ("GET", s3.url("bucket", "incoming/опись фонда №1 (копия).pdf"), {}, b""),
+        (
+            "POST",
+            s3.url("bucket", "incoming/a b.pdf") + "?" + s3._query({"uploads": ""}),
+            {"Content-Type": "application/pdf"},
+            b"",
+        ),
+        (
+            "PUT",
+            s3.url("bucket", "chunks/~x+y.jsonl"),
+            {"X-Amz-Meta-Note": "  two   spaces "},
+            b'{"a": 1}\n',
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "endpoint_url",
+    ["https://storage.yandexcloud.net", "http://localhost:9000"],
+)
+def test_signature_matches_botocore(
+    endpoint_url: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(rag.s3, "datetime", _FrozenDatetime)
+    monkeypatch.setattr(
+        botocore.auth,
+        "get_current_datetime",
+        lambda: _NOW.replace(tzinfo=None),
+    )
+    s3 = AsyncS3(endpoint_url, "access", "secret", region="ru-central1")
+
+    for method, url, headers, body in _requests(s3):
+        ours = s3._signed_headers(method, url, headers, body)
+        request = AWSRequest(
+            method=method,
+            url=url,
+            headers={k: v for k, v in ours.items() if k != "Authorization"},
+            data=body,
+        )
+        # Подписываем тело всегда, как и AsyncS3
+        request.context["client_config"] = Config(s3={"payload_signing_enabled": True})
+        botocore.auth.S3SigV4Auth(
+            Credentials("access", "secret"), "s3", "ru-central1"
+        ).add_auth(request)
+        assert ours["X-Amz-Date"] == request.headers["X-Amz-Date"], url
+        assert ours["Authorization"] == request.headers["Authorization"], url